@@ -1,272 +1,515 @@
 # analysis script for tourism and weather data
 # hopverkefni 1
+#
+# Usage:
+#   python analasys.py              # stats + figures (figures render in parallel)
+#   python analasys.py --no-plots   # stats only
+#   python analasys.py --force      # re-render figures even if unchanged
+#   python analasys.py --jobs 1     # render figures one by one in this process
+#   python analasys.py --features   # also fit the regression with lagged/rolling features (features.py)
+#   python analasys.py --features lag1_,rollmean3_,sunshine   # ... only columns with these prefixes
+#   python analasys.py --backend duckdb:../2026csv/vg.duckdb    # group-by queries run in the database
+#                                                               # (load it first with backends.py load)
+#   python analasys.py --save-model # also write the regression to forecast_model.json
+#   python analasys.py --no-plots --out-of-core                 # stream the join one month at a time
+#   python analasys.py --no-plots --out-of-core --check         # ... and compare with the in-memory cells
+#   python analasys.py --no-plots --out-of-core --weather-table weather_stations \
+#       --passenger-table passengers_by_nationality             # every station x nationality row
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy import stats
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
-
-plt.rcParams['figure.figsize'] = (12, 8)
-
-print("WEATHER IMPACT ON TOURISM IN ICELAND")
-print("=====================================")
-
-# load data
-passengers = pd.read_csv('../2026csv/passengers_clean.csv')
-weather = pd.read_csv('../2026csv/weather_clean.csv')
-
-# merge on year and month
-df = pd.merge(passengers, weather, on=['year', 'month', 'date'])
-df['date'] = pd.to_datetime(df['date'])
-
-print("\nDataset info:")
-print("Total months: " + str(len(df)))
-print("From " + str(df['date'].min()) + " to " + str(df['date'].max()))
-
-# basic stats
-print("\nPassenger stats:")
-print("Mean: " + str(round(df['passengers'].mean())))
-print("Min: " + str(df['passengers'].min()))
-print("Max: " + str(df['passengers'].max()))
-
-print("\nWeather stats:")
-print("Mean temp: " + str(round(df['mean_temp'].mean(), 1)) + " C")
-print("Mean precipitation: " + str(round(df['precipitation'].mean(), 1)) + " mm")
-
-# 1. time series plot
-fig, axes = plt.subplots(2, 1, figsize=(14, 10))
-
-axes[0].plot(df['date'], df['passengers'], linewidth=2, color='steelblue')
-axes[0].set_title('Tourist Arrivals in Iceland (2012-2022)')
-axes[0].set_ylabel('Number of Passengers')
-axes[0].grid(True)
-
-ax2 = axes[1]
-ax2.plot(df['date'], df['mean_temp'], label='Mean Temperature', linewidth=2, color='orangered')
-ax2.set_ylabel('Temperature (C)')
-
-ax3 = ax2.twinx()
-ax3.bar(df['date'], df['precipitation'], alpha=0.3, color='steelblue', width=20)
-ax3.set_ylabel('Precipitation (mm)')
-
-axes[1].set_title('Weather in Iceland (2012-2022)')
-axes[1].set_xlabel('Date')
-axes[1].grid(True)
-
-plt.tight_layout()
-plt.savefig('1_time_series.png', dpi=300)
-print("\nSaved: 1_time_series.png")
-plt.close()
-
-# 2. seasonal analysis
-def get_season(month):
-    if month in [12, 1, 2]:
-        return 'Winter'
-    elif month in [3, 4, 5]:
-        return 'Spring'
-    elif month in [6, 7, 8]:
-        return 'Summer'
-    else:
-        return 'Fall'
-
-df['season'] = df['month'].apply(get_season)
-
-monthly_avg = df.groupby('month').agg({
-    'passengers': 'mean',
-    'mean_temp': 'mean',
-    'precipitation': 'mean'
-}).reset_index()
-
-fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-
-axes[0, 0].bar(monthly_avg['month'], monthly_avg['passengers'], color='steelblue')
-axes[0, 0].set_title('Average Monthly Tourist Arrivals')
-axes[0, 0].set_xlabel('Month')
-axes[0, 0].set_ylabel('Passengers')
-
-axes[0, 1].plot(monthly_avg['month'], monthly_avg['mean_temp'], marker='o', color='orangered')
-axes[0, 1].set_title('Average Monthly Temperature')
-axes[0, 1].set_xlabel('Month')
-axes[0, 1].set_ylabel('Temperature (C)')
-axes[0, 1].grid(True)
-
-seasonal_avg = df.groupby('season').agg({
-    'passengers': 'mean',
-    'mean_temp': 'mean'
-}).reindex(['Winter', 'Spring', 'Summer', 'Fall'])
 
-axes[1, 0].bar(seasonal_avg.index, seasonal_avg['passengers'], color=['lightblue', 'lightgreen', 'gold', 'orange'])
-axes[1, 0].set_title('Average Seasonal Tourist Arrivals')
-axes[1, 0].set_ylabel('Passengers')
+import backends
+import cube as agg_cube
+import forecast
+import instrument
+import join
+import store
 
-axes[1, 1].bar(seasonal_avg.index, seasonal_avg['mean_temp'], color=['lightblue', 'lightgreen', 'gold', 'orange'])
-axes[1, 1].set_title('Average Seasonal Temperature')
-axes[1, 1].set_ylabel('Temperature (C)')
+FIGURE_DIR = os.path.dirname(os.path.abspath(__file__))
+FIGURE_CACHE = os.path.join(FIGURE_DIR, '.figure_cache.json')
+DPI = 300
 
-plt.tight_layout()
-plt.savefig('2_seasonal_patterns.png', dpi=300)
-print("Saved: 2_seasonal_patterns.png")
-plt.close()
-
-print("\nSeasonal averages:")
-for season in ['Winter', 'Spring', 'Summer', 'Fall']:
-    s = df[df['season'] == season]
-    print(season + ": " + str(round(s['passengers'].mean())) + " passengers, " + str(round(s['mean_temp'].mean(), 1)) + " C")
-
-# 3. correlation
 weather_vars = ['mean_temp', 'max_temp', 'min_temp', 'precipitation']
-correlation_data = df[['passengers'] + weather_vars]
-correlations = correlation_data.corr()['passengers'].drop('passengers')
-
-print("\n\nCorrelations with passengers:")
-for var in weather_vars:
-    print(var + ": " + str(round(correlations[var], 3)))
-
-# heatmap
-fig, ax = plt.subplots(figsize=(10, 8))
-sns.heatmap(correlation_data.corr(), annot=True, fmt='.3f', cmap='coolwarm', center=0)
-plt.title('Correlation Matrix')
-plt.tight_layout()
-plt.savefig('3_correlation_heatmap.png', dpi=300)
-print("\nSaved: 3_correlation_heatmap.png")
-plt.close()
-
-# 4. scatter plots
-fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-
-# temp vs passengers
-axes[0, 0].scatter(df['mean_temp'], df['passengers'], alpha=0.6)
-axes[0, 0].set_xlabel('Mean Temperature (C)')
-axes[0, 0].set_ylabel('Passengers')
-axes[0, 0].set_title('Temperature vs Tourism (r=' + str(round(correlations["mean_temp"], 3)) + ')')
-z = np.polyfit(df['mean_temp'], df['passengers'], 1)
-p = np.poly1d(z)
-axes[0, 0].plot(df['mean_temp'], p(df['mean_temp']), "r--", linewidth=2)
-
-# precip vs passengers
-axes[0, 1].scatter(df['precipitation'], df['passengers'], alpha=0.6)
-axes[0, 1].set_xlabel('Precipitation (mm)')
-axes[0, 1].set_ylabel('Passengers')
-axes[0, 1].set_title('Precipitation vs Tourism (r=' + str(round(correlations["precipitation"], 3)) + ')')
-z = np.polyfit(df['precipitation'], df['passengers'], 1)
-p = np.poly1d(z)
-axes[0, 1].plot(df['precipitation'], p(df['precipitation']), "r--", linewidth=2)
-
-# max temp
-axes[1, 0].scatter(df['max_temp'], df['passengers'], alpha=0.6)
-axes[1, 0].set_xlabel('Max Temperature (C)')
-axes[1, 0].set_ylabel('Passengers')
-axes[1, 0].set_title('Max Temp vs Tourism (r=' + str(round(correlations["max_temp"], 3)) + ')')
-z = np.polyfit(df['max_temp'], df['passengers'], 1)
-p = np.poly1d(z)
-axes[1, 0].plot(df['max_temp'], p(df['max_temp']), "r--", linewidth=2)
-
-# min temp
-axes[1, 1].scatter(df['min_temp'], df['passengers'], alpha=0.6)
-axes[1, 1].set_xlabel('Min Temperature (C)')
-axes[1, 1].set_ylabel('Passengers')
-axes[1, 1].set_title('Min Temp vs Tourism (r=' + str(round(correlations["min_temp"], 3)) + ')')
-z = np.polyfit(df['min_temp'], df['passengers'], 1)
-p = np.poly1d(z)
-axes[1, 1].plot(df['min_temp'], p(df['min_temp']), "r--", linewidth=2)
-
-plt.tight_layout()
-plt.savefig('4_scatter_plots.png', dpi=300)
-print("Saved: 4_scatter_plots.png")
-plt.close()
-
-# 5. statistical tests
-print("\n\nStatistical tests (Pearson):")
-for var in weather_vars:
-    r, p_value = stats.pearsonr(df[var], df['passengers'])
-    print(var + ": r=" + str(round(r, 3)) + ", p=" + str(round(p_value, 4)))
-
-# 6. regression
-X = df[weather_vars].values
-y = df['passengers'].values
-
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-
-model = LinearRegression()
-model.fit(X_scaled, y)
-
-y_pred = model.predict(X_scaled)
-r2 = model.score(X_scaled, y)
-
-# adjusted r2
-n = len(y)
-p = len(weather_vars)
-adj_r2 = 1 - (1 - r2) * (n - 1) / (n - p - 1)
-
-print("\n\nRegression results:")
-print("R2: " + str(round(r2, 4)))
-print("Adjusted R2: " + str(round(adj_r2, 4)))
-print("RMSE: " + str(round(np.sqrt(np.mean((y - y_pred)**2)))))
-
-print("\nCoefficients:")
-for i in range(len(weather_vars)):
-    print(weather_vars[i] + ": " + str(round(model.coef_[i])))
-
-# regression plot
-fig, axes = plt.subplots(1, 2, figsize=(14, 6))
-
-axes[0].scatter(y, y_pred, alpha=0.6)
-axes[0].plot([y.min(), y.max()], [y.min(), y.max()], 'r--', lw=2)
-axes[0].set_xlabel('Actual Passengers')
-axes[0].set_ylabel('Predicted Passengers')
-axes[0].set_title('Actual vs Predicted (R2=' + str(round(r2, 3)) + ')')
-axes[0].grid(True)
-
-residuals = y - y_pred
-axes[1].scatter(y_pred, residuals, alpha=0.6)
-axes[1].axhline(y=0, color='r', linestyle='--')
-axes[1].set_xlabel('Predicted Passengers')
-axes[1].set_ylabel('Residuals')
-axes[1].set_title('Residual Plot')
-axes[1].grid(True)
-
-plt.tight_layout()
-plt.savefig('5_regression_analysis.png', dpi=300)
-print("\nSaved: 5_regression_analysis.png")
-plt.close()
-
-# 7. monthly breakdown
-print("\n\nMonthly analysis:")
+seasons = ['Winter', 'Spring', 'Summer', 'Fall']
+# feature columns (name prefixes) used by --features without a value
+DEFAULT_FEATURES = 'lag1_mean_temp,lag2_mean_temp,lag3_mean_temp,rollmean3_mean_temp,yoy_mean_temp,sunshine,humidity,wind_speed,pressure'
 months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-for month in range(1, 13):
-    month_data = df[df['month'] == month]
-    if len(month_data) > 2:
-        corr, _ = stats.pearsonr(month_data['mean_temp'], month_data['passengers'])
-        print(months[month-1] + ": avg passengers=" + str(round(month_data['passengers'].mean())) + ", avg temp=" + str(round(month_data['mean_temp'].mean(), 1)) + ", corr=" + str(round(corr, 3)))
-
-# 8. yearly stats
-print("\n\nYearly totals:")
-yearly = df.groupby('year').agg({'passengers': 'sum', 'mean_temp': 'mean'})
-for year in yearly.index:
-    print(str(year) + ": " + str(yearly.loc[year, 'passengers']) + " passengers, avg temp " + str(round(yearly.loc[year, 'mean_temp'], 1)) + " C")
-
-# summary
-print("\n\n========== SUMMARY ==========")
-print("\nMain findings:")
-print("1. Temperature correlation: " + str(round(correlations['mean_temp'], 3)))
-print("2. Precipitation correlation: " + str(round(correlations['precipitation'], 3)))
-
-summer = df[df['season'] == 'Summer']['passengers'].mean()
-winter = df[df['season'] == 'Winter']['passengers'].mean()
-print("3. Summer has " + str(round(summer/winter, 1)) + "x more tourists than winter")
-print("4. Weather explains " + str(round(r2*100, 1)) + "% of tourism variation")
-
-print("\nConclusion:")
-if correlations['mean_temp'] > 0.5:
-    print("Weather has a significant effect on tourism in Iceland.")
-    print("Warmer temperatures = more tourists")
-elif correlations['mean_temp'] > 0.3:
-    print("Weather has a moderate effect on tourism.")
-else:
-    print("Weather has a weak direct effect on tourism.")
-
-print("\nDone!")
+
+
+def load_data(weather_table='weather_clean', passenger_table='passengers_clean'):
+    # load data (Parquet store if built, otherwise the clean CSV files)
+    passengers = store.load_table(passenger_table)
+    weather = store.load_table(weather_table)
+
+    # join on the month key (year*12 + month - 1), see join.py
+    df = join.join(passengers, weather)
+    return df
+
+
+def stream_cells(weather_table='weather_clean', passenger_table='passengers_clean'):
+    # out-of-core: the joined rows are never all in memory. One year of each
+    # table is read from the store and joined one month at a time; every
+    # month becomes its cube cells, and the cells (sums, squares, cross-products,
+    # min/max) are merged at the end. Each cell sees the same rows in the same
+    # order as in load_data(), so the cells are identical to the in-memory ones.
+    for table in (weather_table, passenger_table):
+        if not store.has_table(table):
+            raise SystemExit("--out-of-core reads the Parquet store, build it first (python store.py): " + table)
+    years = sorted(set(store.table_years(weather_table)) & set(store.table_years(passenger_table)))
+    parts = []
+    rows = 0
+    for year in years:
+        passengers = store.load_table(passenger_table, start_year=year, end_year=year)
+        weather = store.load_table(weather_table, start_year=year, end_year=year)
+        for month, passengers_month in passengers.groupby('month', sort=True):
+            joined = join.join(passengers_month, weather[weather['month'] == month])
+            if len(joined):
+                parts.append(agg_cube.compute_cells(joined))
+                rows += len(joined)
+    return agg_cube.merge_cells(parts), len(parts), rows
+
+
+def check_cells(streamed, weather_table, passenger_table):
+    # self-check of --out-of-core: the streamed cells must equal the in-memory ones exactly
+    in_memory = agg_cube.compute_cells(load_data(weather_table, passenger_table))
+    try:
+        pd.testing.assert_frame_equal(streamed, in_memory[streamed.columns], check_exact=True)
+    except AssertionError as error:
+        print("\nOut-of-core check FAILED:")
+        print(error)
+        raise SystemExit(1)
+    print("Out-of-core check: " + str(len(streamed)) + " cells identical to the in-memory path")
+
+
+def fit_regression(X, y):
+    # StandardScaler + LinearRegression, returns (model, scaler, predictions, r2, adjusted r2)
+    from sklearn.linear_model import LinearRegression
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    model = LinearRegression()
+    model.fit(X_scaled, y)
+    y_pred = model.predict(X_scaled)
+    r2 = model.score(X_scaled, y)
+    n, p = X.shape
+    adj_r2 = 1 - (1 - r2) * (n - 1) / (n - p - 1)
+    return model, scaler, y_pred, r2, adj_r2
+
+
+def feature_regression(df, prefixes, table='weather_features'):
+    # Same model with the feature columns starting with one of prefixes added ('all' = every feature)
+    features = store.load_table(table).drop(columns=weather_vars)
+    extra = [c for c in features.columns if c not in ('year', 'month')]
+    if prefixes != ['all']:
+        extra = [c for c in extra if c.startswith(tuple(prefixes))]
+    data = pd.merge(df, features, on=['year', 'month'])
+    columns = weather_vars + extra
+    data = data.dropna(subset=columns)
+
+    print("\n\nRegression with lagged features:")
+    print("Features: " + str(len(columns)) + ", months: " + str(len(data)))
+    if len(data) <= len(columns) + 1:
+        print("Not enough months for " + str(len(columns)) + " features")
+        return
+    _, _, _, r2, adj_r2 = fit_regression(data[columns].values, data['passengers'].values)
+    print("R2: " + str(round(r2, 4)))
+    print("Adjusted R2: " + str(round(adj_r2, 4)))
+
+
+# ---------- figures ----------
+# Each plot_* function only gets the data it draws, so it can run in a worker
+# process and its inputs can be hashed for the figure cache.
+# matplotlib/seaborn are imported by the first figure, so --no-plots never loads them.
+
+def pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.rcParams['figure.figsize'] = (12, 8)
+    return plt
+
+
+def plot_time_series(path, date, passengers, mean_temp, precipitation):
+    plt = pyplot()
+    fig, axes = plt.subplots(2, 1, figsize=(14, 10))
+
+    axes[0].plot(date, passengers, linewidth=2, color='steelblue')
+    axes[0].set_title('Tourist Arrivals in Iceland (2012-2022)')
+    axes[0].set_ylabel('Number of Passengers')
+    axes[0].grid(True)
+
+    ax2 = axes[1]
+    ax2.plot(date, mean_temp, label='Mean Temperature', linewidth=2, color='orangered')
+    ax2.set_ylabel('Temperature (C)')
+
+    ax3 = ax2.twinx()
+    ax3.bar(date, precipitation, alpha=0.3, color='steelblue', width=20)
+    ax3.set_ylabel('Precipitation (mm)')
+
+    axes[1].set_title('Weather in Iceland (2012-2022)')
+    axes[1].set_xlabel('Date')
+    axes[1].grid(True)
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=DPI)
+    plt.close()
+
+
+def plot_seasonal(path, monthly_avg, seasonal_avg):
+    plt = pyplot()
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+
+    axes[0, 0].bar(monthly_avg['month'], monthly_avg['passengers'], color='steelblue')
+    axes[0, 0].set_title('Average Monthly Tourist Arrivals')
+    axes[0, 0].set_xlabel('Month')
+    axes[0, 0].set_ylabel('Passengers')
+
+    axes[0, 1].plot(monthly_avg['month'], monthly_avg['mean_temp'], marker='o', color='orangered')
+    axes[0, 1].set_title('Average Monthly Temperature')
+    axes[0, 1].set_xlabel('Month')
+    axes[0, 1].set_ylabel('Temperature (C)')
+    axes[0, 1].grid(True)
+
+    axes[1, 0].bar(seasonal_avg.index, seasonal_avg['passengers'], color=['lightblue', 'lightgreen', 'gold', 'orange'])
+    axes[1, 0].set_title('Average Seasonal Tourist Arrivals')
+    axes[1, 0].set_ylabel('Passengers')
+
+    axes[1, 1].bar(seasonal_avg.index, seasonal_avg['mean_temp'], color=['lightblue', 'lightgreen', 'gold', 'orange'])
+    axes[1, 1].set_title('Average Seasonal Temperature')
+    axes[1, 1].set_ylabel('Temperature (C)')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=DPI)
+    plt.close()
+
+
+def plot_correlation(path, corr_matrix):
+    import seaborn as sns
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(10, 8))
+    sns.heatmap(corr_matrix, annot=True, fmt='.3f', cmap='coolwarm', center=0)
+    plt.title('Correlation Matrix')
+    plt.tight_layout()
+    plt.savefig(path, dpi=DPI)
+    plt.close()
+
+
+def plot_scatter(path, data, correlations, fits):
+    plt = pyplot()
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+
+    panels = [
+        (axes[0, 0], 'mean_temp', 'Mean Temperature (C)', 'Temperature vs Tourism'),
+        (axes[0, 1], 'precipitation', 'Precipitation (mm)', 'Precipitation vs Tourism'),
+        (axes[1, 0], 'max_temp', 'Max Temperature (C)', 'Max Temp vs Tourism'),
+        (axes[1, 1], 'min_temp', 'Min Temperature (C)', 'Min Temp vs Tourism'),
+    ]
+    for ax, var, xlabel, title in panels:
+        ax.scatter(data[var], data['passengers'], alpha=0.6)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel('Passengers')
+        ax.set_title(title + ' (r=' + str(round(correlations[var], 3)) + ')')
+        slope, intercept = fits[var]
+        ax.plot(data[var], slope * data[var] + intercept, "r--", linewidth=2)
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=DPI)
+    plt.close()
+
+
+def plot_regression(path, y, y_pred, r2):
+    plt = pyplot()
+    fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+
+    axes[0].scatter(y, y_pred, alpha=0.6)
+    axes[0].plot([y.min(), y.max()], [y.min(), y.max()], 'r--', lw=2)
+    axes[0].set_xlabel('Actual Passengers')
+    axes[0].set_ylabel('Predicted Passengers')
+    axes[0].set_title('Actual vs Predicted (R2=' + str(round(r2, 3)) + ')')
+    axes[0].grid(True)
+
+    residuals = y - y_pred
+    axes[1].scatter(y_pred, residuals, alpha=0.6)
+    axes[1].axhline(y=0, color='r', linestyle='--')
+    axes[1].set_xlabel('Predicted Passengers')
+    axes[1].set_ylabel('Residuals')
+    axes[1].set_title('Residual Plot')
+    axes[1].grid(True)
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=DPI)
+    plt.close()
+
+
+def render(task):
+    # Worker entry point: task is (filename, plot function, keyword arguments)
+    filename, func, kwargs = task
+    func(os.path.join(FIGURE_DIR, filename), **kwargs)
+    return filename
+
+
+def task_hash(task):
+    # Hash of the plot function's source, its inputs and the render settings,
+    # so editing a plot function re-renders its figure
+    filename, func, kwargs = task
+    h = hashlib.sha256()
+    h.update(pickle.dumps((filename, func.__name__, inspect.getsource(func), DPI, sorted(kwargs.items())),
+                          protocol=4))
+    return h.hexdigest()
+
+
+def render_figures(tasks, jobs=None, force=False):
+    """
+    Render the figure tasks in a process pool, skipping unchanged figures.
+
+    A figure is unchanged when its PNG exists and the hash of its inputs
+    matches the one stored in .figure_cache.json from the previous run.
+    """
+    cache = {}
+    if os.path.exists(FIGURE_CACHE):
+        with open(FIGURE_CACHE) as f:
+            cache = json.load(f)
+
+    hashes = {task[0]: task_hash(task) for task in tasks}
+    todo = []
+    for task in tasks:
+        filename = task[0]
+        if not force and cache.get(filename) == hashes[filename] and os.path.exists(os.path.join(FIGURE_DIR, filename)):
+            print("Unchanged: " + filename)
+        else:
+            todo.append(task)
+
+    if jobs == 1 or len(todo) <= 1:
+        done = [render(task) for task in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs or min(len(todo), os.cpu_count() or 1)) as pool:
+            done = list(pool.map(render, todo))
+
+    for filename in done:
+        cache[filename] = hashes[filename]
+        print("Saved: " + filename)
+
+    with open(FIGURE_CACHE, 'w') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Weather impact on tourism in Iceland")
+    parser.add_argument('--no-plots', action='store_true', help="print the statistics only")
+    parser.add_argument('--force', action='store_true', help="re-render figures even if unchanged")
+    parser.add_argument('--features', nargs='?', const=DEFAULT_FEATURES, default=None,
+                        help="also fit the regression with features.py columns: comma separated "
+                             "name prefixes or 'all' (default: " + DEFAULT_FEATURES + ")")
+    parser.add_argument('--backend', help="compute the aggregates in a database loaded by backends.py: "
+                                               "azure, sqlite:PATH or duckdb[:PATH]")
+    parser.add_argument('--jobs', type=int, default=None, help="figure render processes (default: one per figure)")
+    parser.add_argument('--out-of-core', action='store_true',
+                        help="stream the join month by month from the Parquet store (statistics only)")
+    parser.add_argument('--check', action='store_true',
+                        help="with --out-of-core: also compute the cells in memory and compare them")
+    parser.add_argument('--save-model', action='store_true',
+                        help="write the regression to 2026csv/forecast_model.json (replaces forecast.py updates)")
+    parser.add_argument('--weather-table', default='weather_clean', help="clean weather table to join")
+    parser.add_argument('--passenger-table', default='passengers_clean', help="clean passenger table to join")
+    args = parser.parse_args(argv)
+    if args.out_of_core and (not args.no_plots or args.features or args.backend):
+        parser.error("--out-of-core computes the statistics only: use it with --no-plots, "
+                     "without --features and --backend")
+    if args.check and not args.out_of_core:
+        parser.error("--check compares --out-of-core with the in-memory path")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("WEATHER IMPACT ON TOURISM IN ICELAND")
+    print("=====================================")
+
+    missing = []
+    if args.backend:
+        # group-by pushed down to the database; rows are only fetched for the figures/features
+        backend = backends.open_backend(args.backend)
+        with instrument.stage('group-by') as s:
+            cube = backend.cube_cells()
+            s.rows = len(cube)
+        with instrument.stage('merge') as s:
+            df = backend.joined_rows() if not args.no_plots or args.features else None
+            s.rows = None if df is None else len(df)
+        backend.close()
+        cells_source = "aggregated by " + backend.name
+    elif args.out_of_core:
+        df = None
+        with instrument.stage('group-by') as s:
+            cube, partitions, rows = stream_cells(args.weather_table, args.passenger_table)
+            s.rows = rows
+        cells_source = "streamed from " + str(partitions) + " month partitions"
+        if args.check:
+            check_cells(cube, args.weather_table, args.passenger_table)
+    else:
+        with instrument.stage('merge') as s:
+            df = load_data(args.weather_table, args.passenger_table)
+            s.rows = len(df)
+        missing = join.describe_missing(df)
+        # per (year, month) sums, squares and cross-products, updated for changed months only
+        with instrument.stage('group-by') as s:
+            cube = agg_cube.update_cube(df)
+            s.rows = len(cube)
+        cells_source = str(cube.attrs['recomputed']) + " recomputed"
+
+    # every group-by below is computed from the cells (see cube.py)
+    overall = agg_cube.rollup(cube)
+    overall_mean = agg_cube.means(overall).iloc[0]
+    by_month = agg_cube.rollup(cube, 'month')
+    by_season = agg_cube.rollup(cube, 'season').reindex(seasons)
+    by_year = agg_cube.rollup(cube, 'year')
+    first, last = cube.index.min(), cube.index.max()
+
+    print("\nDataset info:")
+    print("Total months: " + str(overall['n'].iloc[0]))
+    print("From " + str(pd.Timestamp(first[0], first[1], 1)) + " to " + str(pd.Timestamp(last[0], last[1], 1)))
+    print("Aggregate cells: " + str(len(cube)) + " (" + cells_source + ")")
+    for line in missing:
+        print("Missing months: " + line)
+
+    # basic stats
+    print("\nPassenger stats:")
+    print("Mean: " + str(round(overall_mean['passengers'])))
+    print("Min: " + str(overall['min_passengers'].iloc[0]))
+    print("Max: " + str(overall['max_passengers'].iloc[0]))
+
+    print("\nWeather stats:")
+    print("Mean temp: " + str(round(overall_mean['mean_temp'], 1)) + " C")
+    print("Mean precipitation: " + str(round(overall_mean['precipitation'], 1)) + " mm")
+
+    # 2. seasonal analysis
+    monthly_avg = agg_cube.means(by_month)[['passengers', 'mean_temp', 'precipitation']].reset_index()
+    seasonal_avg = agg_cube.means(by_season)[['passengers', 'mean_temp']]
+
+    print("\nSeasonal averages:")
+    for season in seasons:
+        print(season + ": " + str(round(seasonal_avg.loc[season, 'passengers'])) + " passengers, " + str(round(seasonal_avg.loc[season, 'mean_temp'], 1)) + " C")
+
+    # 3. correlation
+    corr_matrix = agg_cube.corr_matrix(overall, ['passengers'] + weather_vars)
+    correlations = corr_matrix['passengers'].drop('passengers')
+
+    print("\n\nCorrelations with passengers:")
+    for var in weather_vars:
+        print(var + ": " + str(round(correlations[var], 3)))
+
+    # 5. statistical tests (r, p and the scatter plot fit lines, from the sums)
+    with instrument.stage('stats'):
+        tests = {var: agg_cube.regression(overall, var, 'passengers').iloc[0] for var in weather_vars}
+    fits = {}
+    print("\n\nStatistical tests (Pearson):")
+    for var in weather_vars:
+        r, p_value = tests[var]['r'], tests[var]['p']
+        fits[var] = (float(tests[var]['slope']), float(tests[var]['intercept']))
+        print(var + ": r=" + str(round(r, 3)) + ", p=" + str(round(p_value, 4)))
+
+    # 6. regression: normal equations from the sums (same fit as StandardScaler +
+    # LinearRegression on the rows), saved for forecast.py with --save-model
+    with instrument.stage('regression'):
+        keys = [forecast.month_key(y, m) for y, m in cube.index]
+        model = forecast.Forecaster(weather_vars, *agg_cube.normal_equations(overall, weather_vars, 'passengers'),
+                                    months=keys)
+        if args.save_model:
+            model.save()
+    r2 = model.r2()
+    n = model.n
+    p = len(weather_vars)
+    adj_r2 = 1 - (1 - r2) * (n - 1) / (n - p - 1)
+    coef, _ = model.scaled_coef()
+
+    print("\n\nRegression results:")
+    print("R2: " + str(round(r2, 4)))
+    print("Adjusted R2: " + str(round(adj_r2, 4)))
+    print("RMSE: " + str(round(model.rmse())))
+
+    print("\nCoefficients:")
+    for i in range(len(weather_vars)):
+        print(weather_vars[i] + ": " + str(round(coef[i])))
+
+    if args.features:
+        feature_regression(df, args.features.split(','))
+
+    # 7. monthly breakdown
+    print("\n\nMonthly analysis:")
+    monthly_mean = agg_cube.means(by_month)
+    monthly_corr = agg_cube.corr(by_month, 'mean_temp', 'passengers')
+    for month in by_month.index:
+        if by_month.loc[month, 'n'] > 2:
+            print(months[month-1] + ": avg passengers=" + str(round(monthly_mean.loc[month, 'passengers'])) + ", avg temp=" + str(round(monthly_mean.loc[month, 'mean_temp'], 1)) + ", corr=" + str(round(monthly_corr[month], 3)))
+
+    # 8. yearly stats
+    print("\n\nYearly totals:")
+    yearly_mean = agg_cube.means(by_year)
+    for year in by_year.index:
+        print(str(year) + ": " + str(by_year.loc[year, 'sum_passengers']) + " passengers, avg temp " + str(round(yearly_mean.loc[year, 'mean_temp'], 1)) + " C")
+
+    # summary
+    print("\n\n========== SUMMARY ==========")
+    print("\nMain findings:")
+    print("1. Temperature correlation: " + str(round(correlations['mean_temp'], 3)))
+    print("2. Precipitation correlation: " + str(round(correlations['precipitation'], 3)))
+
+    summer = seasonal_avg.loc['Summer', 'passengers']
+    winter = seasonal_avg.loc['Winter', 'passengers']
+    print("3. Summer has " + str(round(summer/winter, 1)) + "x more tourists than winter")
+    print("4. Weather explains " + str(round(r2*100, 1)) + "% of tourism variation")
+
+    print("\nConclusion:")
+    if correlations['mean_temp'] > 0.5:
+        print("Weather has a significant effect on tourism in Iceland.")
+        print("Warmer temperatures = more tourists")
+    elif correlations['mean_temp'] > 0.3:
+        print("Weather has a moderate effect on tourism.")
+    else:
+        print("Weather has a weak direct effect on tourism.")
+
+    # figures 1-5
+    if not args.no_plots:
+        print("\nFigures:")
+        tasks = [
+            ('1_time_series.png', plot_time_series, {
+                'date': df['date'].to_numpy(),
+                'passengers': df['passengers'].to_numpy(),
+                'mean_temp': df['mean_temp'].to_numpy(),
+                'precipitation': df['precipitation'].to_numpy(),
+            }),
+            ('2_seasonal_patterns.png', plot_seasonal, {
+                'monthly_avg': monthly_avg,
+                'seasonal_avg': seasonal_avg,
+            }),
+            ('3_correlation_heatmap.png', plot_correlation, {
+                'corr_matrix': corr_matrix,
+            }),
+            ('4_scatter_plots.png', plot_scatter, {
+                'data': df[['passengers'] + weather_vars],
+                'correlations': correlations,
+                'fits': fits,
+            }),
+            ('5_regression_analysis.png', plot_regression, {
+                'y': df['passengers'].to_numpy(),
+                'y_pred': model.predict(df[weather_vars].to_numpy()),
+                'r2': r2,
+            }),
+        ]
+        with instrument.stage('plot') as s:
+            render_figures(tasks, jobs=args.jobs, force=args.force)
+            s.rows = len(tasks)
+
+    print("\nDone!")
+
+
+if __name__ == '__main__':
+    main()
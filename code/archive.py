@@ -0,0 +1,375 @@
+"""
+Memory-mapped archive of the IMO monthly station records.
+
+cleanWeather.py has to parse the whole text dump to get one station's
+series. The archive keeps every measure of the dump (t through f, see
+COLUMNS) as a fixed-width float32 grid per column, one file each:
+
+    2026csv/archive/meta.json        columns, first month, months, station slots
+    2026csv/archive/<column>.f32     float32[months, capacity], row = month, slot = station
+
+Row r is month first + r (months since year 0, as year*12 + month - 1), so
+the offset of (station, year, month) is computed from the index in meta.json
+(station -> slot, year -> row), nothing is searched. Missing records are NaN.
+
+- series(station, column): one station's whole history, a strided view
+- cross_section(year, month, column): all stations for one month, a contiguous view
+- append: new months are added to the end of every file, revised months are
+  written in place, new stations take free slots; nothing is rewritten.
+  Only a station beyond the slot capacity needs a rebuild (capacity leaves
+  room for as many new stations as there were at build time).
+
+Readers map the files read-only; an Archive pickles as its path, so worker
+processes (pair_analysis.py --archive) reopen the same pages instead of
+receiving copies. meta.json is replaced after the data is written, so a
+reader opened during an append sees the old months.
+
+Usage:
+    python archive.py build --input ../2026csv/vedur.csv
+    python archive.py append --input new_months.csv
+    python archive.py info
+    python archive.py series 1 t --start-year 1950 --end-year 1951
+    python archive.py month 1950 7 t
+    python archive.py benchmark --stations 500
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import store
+from cleanWeather import COLUMNS as CLEAN_NAMES
+from cleanWeather import sniff_header
+
+ARCHIVE_DIR = os.path.join(store.CSV_DIR, 'archive')
+
+KEYS = ['stöð', 'ár', 'mán']
+COLUMNS = ['t', 'tx', 'txx', 'txxD1', 'tn', 'tnn', 'tnnD1', 'rh', 'r', 'rx', 'rxD1', 'p', 'n', 'sun', 'f']
+
+# Clean names (mean_temp, ...) accepted for the raw columns
+ALIASES = {clean: raw for raw, clean in CLEAN_NAMES.items() if raw in COLUMNS}
+
+DTYPE = np.dtype('<f4')
+CHUNKSIZE = 100_000
+
+
+def read_dump(input_file, chunksize=CHUNKSIZE):
+    """Chunks of a weather.txt/vedur.csv dump with the key and archive columns."""
+    sep, skip, names = sniff_header(input_file)
+    return pd.read_csv(input_file, sep=sep, skiprows=skip + 1, header=None, names=names,
+                       usecols=KEYS + COLUMNS, skipinitialspace=True, chunksize=chunksize,
+                       dtype={'stöð': 'int32', 'ár': 'int32', 'mán': 'int32', **{c: 'float32' for c in COLUMNS}})
+
+
+class Archive:
+    """Read access to an archive directory; the column grids are np.memmap views."""
+
+    def __init__(self, path=ARCHIVE_DIR):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.columns = meta['columns']
+        self.first = meta['first']
+        self.n_months = meta['months']
+        self.capacity = meta['capacity']
+        self.stations = np.array(meta['stations'], dtype=np.int64)
+        self.slots = {int(s): i for i, s in enumerate(self.stations)}
+        self._grids = {}
+
+    def __reduce__(self):
+        # Workers reopen the files by path instead of receiving the data
+        return (Archive, (self.path,))
+
+    # ---------- index ----------
+
+    def slot(self, station):
+        try:
+            return self.slots[int(station)]
+        except KeyError:
+            raise KeyError(f"Station {station} is not in the archive") from None
+
+    def row(self, year, month=1):
+        r = int(year) * 12 + int(month) - 1 - self.first
+        if not 0 <= r < self.n_months:
+            raise IndexError(f"{year}-{month:02d} is outside the archive")
+        return r
+
+    def offset(self, station, year, month=1):
+        """(row, slot) of a station's month in every column grid."""
+        return self.row(year, month), self.slot(station)
+
+    @property
+    def first_month(self):
+        return self.first // 12, self.first % 12 + 1
+
+    @property
+    def last_month(self):
+        last = self.first + self.n_months - 1
+        return last // 12, last % 12 + 1
+
+    # ---------- data ----------
+
+    def grid(self, column):
+        """float32[months, capacity] of a column (raw or clean name), memory-mapped read-only."""
+        column = ALIASES.get(column, column)
+        if column not in self._grids:
+            if column not in self.columns:
+                raise KeyError(f"No column {column} in the archive (columns: {', '.join(self.columns)})")
+            if self.n_months == 0:
+                return np.empty((0, self.capacity), dtype=DTYPE)
+            self._grids[column] = np.memmap(os.path.join(self.path, column + '.f32'), dtype=DTYPE, mode='r',
+                                            shape=(self.n_months, self.capacity))
+        return self._grids[column]
+
+    def series(self, station, column, start_year=None, end_year=None):
+        """One station's monthly values for start_year..end_year (default: everything), a view."""
+        start = 0 if start_year is None else max(int(start_year) * 12 - self.first, 0)
+        stop = self.n_months if end_year is None else min(int(end_year) * 12 + 12 - self.first, self.n_months)
+        return self.grid(column)[start:stop, self.slot(station)]
+
+    def cross_section(self, year, month, column):
+        """Every station's value for one month (ordered like .stations), a view."""
+        return self.grid(column)[self.row(year, month), :len(self.stations)]
+
+    def matrix(self, station, columns, month_keys):
+        """float64[len(month_keys), len(columns)] of one station on a month axis (NaN outside the archive)."""
+        rows = np.asarray(month_keys) - self.first
+        inside = (rows >= 0) & (rows < self.n_months)
+        out = np.full((len(rows), len(columns)), np.nan)
+        slot = self.slot(station)
+        for j, column in enumerate(columns):
+            out[inside, j] = self.grid(column)[rows[inside], slot]
+        # float32 back to the one decimal of the source
+        return out.round(store.FLOAT_DECIMALS)
+
+    def frame(self, station, columns=None, start_year=None, end_year=None):
+        """A station's records as a DataFrame (a copy), months without any value dropped."""
+        columns = columns or self.columns
+        data = {c: np.asarray(self.series(station, c, start_year, end_year)) for c in columns}
+        start = 0 if start_year is None else max(int(start_year) * 12 - self.first, 0)
+        keys = self.first + start + np.arange(len(next(iter(data.values()))))
+        df = pd.DataFrame({'year': keys // 12, 'month': keys % 12 + 1, **data})
+        return df[df[columns].notna().any(axis=1)].reset_index(drop=True)
+
+
+# ---------- writing ----------
+
+def write_meta(path, meta):
+    # Replace meta.json in one step, readers see the old or the new index
+    tmp = os.path.join(path, 'meta.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp, os.path.join(path, 'meta.json'))
+
+
+def create(path, first, capacity, stations=(), columns=COLUMNS):
+    os.makedirs(path, exist_ok=True)
+    for column in columns:
+        open(os.path.join(path, column + '.f32'), 'wb').close()
+    write_meta(path, {'columns': list(columns), 'first': int(first), 'months': 0,
+                      'capacity': int(capacity), 'stations': [int(s) for s in stations]})
+
+
+def append(df, path=ARCHIVE_DIR):
+    """
+    Add records (raw columns stöð, ár, mán and any of COLUMNS) to an archive.
+
+    Months after the last one are appended to the files, earlier months are
+    overwritten in place. Returns (months appended, records written).
+    """
+    archive = Archive(path)
+    keys = (df['ár'].to_numpy(dtype=np.int64) * 12 + df['mán'].to_numpy(dtype=np.int64) - 1)
+    rows = keys - archive.first
+    if len(rows) and rows.min() < 0:
+        y, m = archive.first_month
+        raise ValueError(f"Records before {y}-{m:02d} need a rebuild (python archive.py build)")
+
+    stations = [int(s) for s in archive.stations]
+    for station in pd.unique(df['stöð']):
+        if int(station) not in archive.slots:
+            stations.append(int(station))
+    if len(stations) > archive.capacity:
+        raise ValueError(f"{len(stations)} stations do not fit the {archive.capacity} slots, rebuild the archive")
+    slots = {s: i for i, s in enumerate(stations)}
+    slot = df['stöð'].map(slots).to_numpy(dtype=np.int64)
+
+    n_old = archive.n_months
+    n_new = max(int(rows.max()) + 1 - n_old, 0) if len(rows) else 0
+    old = rows < n_old
+    for column in archive.columns:
+        if column not in df.columns:
+            continue
+        values = df[column].to_numpy(dtype=DTYPE)
+        file = os.path.join(path, column + '.f32')
+        if old.any():
+            grid = np.memmap(file, dtype=DTYPE, mode='r+', shape=(n_old, archive.capacity))
+            grid[rows[old], slot[old]] = values[old]
+            grid.flush()
+            del grid
+        if n_new:
+            block = np.full((n_new, archive.capacity), np.nan, dtype=DTYPE)
+            block[rows[~old] - n_old, slot[~old]] = values[~old]
+            with open(file, 'ab') as f:
+                f.write(block.tobytes())
+
+    write_meta(path, {'columns': archive.columns, 'first': archive.first, 'months': n_old + n_new,
+                      'capacity': archive.capacity, 'stations': stations})
+    return n_new, len(df)
+
+
+def build(input_file, path=ARCHIVE_DIR, chunksize=CHUNKSIZE):
+    """Archive of a whole dump: first pass for the stations and first month, then the records chunk by chunk."""
+    first, stations = None, set()
+    for chunk in read_dump(input_file, chunksize):
+        key = int((chunk['ár'] * 12 + chunk['mán'] - 1).min())
+        first = key if first is None else min(first, key)
+        stations.update(int(s) for s in chunk['stöð'].unique())
+    if first is None:
+        raise ValueError(f"No records in {input_file}")
+
+    # Room for as many new stations again, in whole cache lines of float32
+    capacity = -(-2 * len(stations) // 16) * 16
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    create(path, first, capacity, sorted(stations))
+    records = 0
+    for chunk in read_dump(input_file, chunksize):
+        records += append(chunk, path)[1]
+    return records
+
+
+# ---------- commands ----------
+
+def cmd_build(args):
+    start = time.perf_counter()
+    records = build(args.input, args.archive)
+    print_info(Archive(args.archive), f"{records} records in {time.perf_counter() - start:.3f} s")
+
+
+def cmd_append(args):
+    start = time.perf_counter()
+    months = records = 0
+    for chunk in read_dump(args.input):
+        added, written = append(chunk, args.archive)
+        months += added
+        records += written
+    print_info(Archive(args.archive), f"appended {months} months, wrote {records} records "
+                                      f"in {time.perf_counter() - start:.3f} s")
+
+
+def cmd_info(args):
+    print_info(Archive(args.archive))
+
+
+def cmd_series(args):
+    archive = Archive(args.archive)
+    df = archive.frame(args.station, [args.column], args.start_year, args.end_year)
+    print(df.to_string(index=False))
+
+
+def cmd_month(args):
+    archive = Archive(args.archive)
+    values = archive.cross_section(args.year, args.month, args.column)
+    df = pd.DataFrame({'station': archive.stations, ALIASES.get(args.column, args.column): values})
+    print(df.dropna().to_string(index=False))
+
+
+def print_info(archive, note=''):
+    (y0, m0), (y1, m1) = archive.first_month, archive.last_month
+    size = archive.n_months * archive.capacity * DTYPE.itemsize * len(archive.columns)
+    print(f"Archive '{archive.path}'" + (f": {note}" if note else ''))
+    print(f"  {len(archive.stations)} stations ({archive.capacity} slots), {archive.n_months} months "
+          f"{y0}-{m0:02d} to {y1}-{m1:02d}, {len(archive.columns)} columns, {size / 2 ** 20:.1f} MB")
+
+
+def cmd_benchmark(args):
+    # Synthetic dump with many stations: parse-the-dump vs archive slices
+    import bench
+    from cleanWeather import clean_weather
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = os.path.join(tmp, 'weather.txt')
+        rows = bench.generate_weather(dump, args.stations)
+        path = os.path.join(tmp, 'archive')
+        start = time.perf_counter()
+        build(dump, path)
+        build_s = time.perf_counter() - start
+
+        station = args.stations // 2
+        start = time.perf_counter()
+        clean_weather(dump, os.path.join(tmp, 'one.csv'), stations=[station], start_year=None, end_year=None,
+                      parquet=False)
+        parse_s = time.perf_counter() - start
+
+        repeat = 1000
+        archive = Archive(path)
+        y, m = archive.last_month
+        start = time.perf_counter()
+        for _ in range(repeat):
+            archive.series(station, 't').mean()
+        series_s = (time.perf_counter() - start) / repeat
+        start = time.perf_counter()
+        for _ in range(repeat):
+            archive.cross_section(y, m, 't').mean()
+        month_s = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        cold = Archive(path)
+        cold.series(station, 't').mean()
+        open_s = time.perf_counter() - start
+
+    print(f"{args.stations} stations, {rows:,} records")
+    print(f"  build archive:                  {build_s:10.3f} s")
+    print(f"  one station from the text dump: {parse_s:10.3f} s")
+    print(f"  open archive + one station:     {open_s * 1e3:10.3f} ms")
+    print(f"  one station's series:           {series_s * 1e6:10.2f} us")
+    print(f"  all stations for one month:     {month_s * 1e6:10.2f} us")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Memory-mapped archive of the IMO monthly station records")
+    parser.add_argument('--archive', default=ARCHIVE_DIR, help="archive directory (default: 2026csv/archive)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_cmd = commands.add_parser('build', help="(re)build the archive from a dump")
+    build_cmd.add_argument('--input', default=os.path.join(store.CSV_DIR, 'vedur.csv'))
+    build_cmd.set_defaults(func=cmd_build)
+
+    append_cmd = commands.add_parser('append', help="add new or revised months from a dump")
+    append_cmd.add_argument('--input', required=True)
+    append_cmd.set_defaults(func=cmd_append)
+
+    commands.add_parser('info', help="stations, months and size").set_defaults(func=cmd_info)
+
+    series = commands.add_parser('series', help="one station's history")
+    series.add_argument('station', type=int)
+    series.add_argument('column', help="raw (t) or clean (mean_temp) column name")
+    series.add_argument('--start-year', type=int)
+    series.add_argument('--end-year', type=int)
+    series.set_defaults(func=cmd_series)
+
+    month = commands.add_parser('month', help="all stations for one month")
+    month.add_argument('year', type=int)
+    month.add_argument('month', type=int)
+    month.add_argument('column')
+    month.set_defaults(func=cmd_month)
+
+    benchmark = commands.add_parser('benchmark', help="text dump vs archive on synthetic stations")
+    benchmark.add_argument('--stations', type=int, default=500)
+    benchmark.set_defaults(func=cmd_benchmark)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Storage backends for the Passengers/Weather tables.
+
+One interface over three engines, chosen with a backend string:
+
+    azure          Azure SQL through ODBC (.env credentials, see load_to_azure.py)
+    sqlite:PATH    embedded SQLite file
+    duckdb:PATH    embedded DuckDB file (default: 2026csv/vg.duckdb)
+
+Every backend creates the tables with the DDL of load_to_azure.py (id column,
+the columns of TABLE_COLUMNS, unique index on year, month), bulk loads the
+clean data and answers the analysis aggregates in SQL:
+
+- DuckDB reads the clean CSV files or the Parquet store itself
+  (read_csv / read_parquet), no rows pass through Python.
+- SQLite gets the columns parsed by pyarrow and inserted with executemany.
+- Azure uses the batched/TVP inserts of load_to_azure.py.
+
+cube_cells() returns the same per (year, month) sums, squares, cross-products
+and min/max as cube.compute_cells(), computed by one GROUP BY over the joined
+tables, so analasys.py --backend only pulls those cells into pandas.
+
+Usage:
+    python backends.py load duckdb:../2026csv/vg.duckdb --source parquet
+    python backends.py load sqlite:test.db
+    python backends.py cells duckdb:../2026csv/vg.duckdb
+"""
+
+import argparse
+import os
+import time
+
+import pandas as pd
+
+import cube
+import schema
+import store
+from load_to_azure import (SQLITE_CREATE_KEYS, SQLITE_CREATE_PASSENGERS, SQLITE_CREATE_WEATHER,
+                           TABLE_COLUMNS, TABLE_SOURCES, create_tables)
+
+DEFAULT_DUCKDB = os.path.join(store.CSV_DIR, 'vg.duckdb')
+
+# TABLE_COLUMNS types -> DuckDB types, for the casts of the file readers
+DUCKDB_TYPES = {'INT': 'INTEGER', 'DATE': 'DATE', 'FLOAT': 'DOUBLE'}
+
+
+class Backend:
+    """Base class; subclasses set name and implement connect() and _load()."""
+
+    name = None
+
+    def __init__(self, path=None):
+        self.path = path
+        self.conn = self.connect()
+
+    def connect(self):
+        raise NotImplementedError
+
+    def execute(self, sql, params=()):
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        return cursor
+
+    def query(self, sql):
+        """Result of sql as a DataFrame."""
+        cursor = self.execute(sql)
+        columns = [d[0] for d in cursor.description]
+        return pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+
+    def create_tables(self):
+        # The loader's DDL, so a table loaded here has the same schema as one from load_to_azure.py
+        for table in TABLE_COLUMNS:
+            self.execute(self.drop_sql(table))
+        create_tables(self.conn, self.conn.cursor(), sqlite=self.name == 'sqlite')
+
+    def drop_sql(self, table):
+        return f"DROP TABLE IF EXISTS {table}"
+
+    def bulk_load(self, table, source='csv', csv_dir=store.CSV_DIR):
+        """Load the clean data of table from its CSV file or the Parquet store, return the row count."""
+        name = TABLE_SOURCES[table][0]
+        columns = [column for column, _ in TABLE_COLUMNS[table]]
+        if source == 'parquet':
+            path = store.table_path(name)
+        else:
+            path = os.path.join(csv_dir, name + '.csv')
+        self._load(table, columns, path, source)
+        self.conn.commit()
+        return int(self.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0])
+
+    def _load(self, table, columns, path, source):
+        raise NotImplementedError
+
+    def cube_cells(self):
+        """Per (year, month) cells like cube.compute_cells(), aggregated by the engine."""
+        # Integer products are widened first (passengers^2 overflows a 32-bit INT)
+        def value(v):
+            return f"CAST({v} AS BIGINT)" if v == 'passengers' else v
+        aggregates = ['COUNT(*) AS n']
+        aggregates += [f"SUM({v}) AS sum_{v}" for v in cube.VARS]
+        aggregates += [f"SUM({value(v)} * {v}) AS sq_{v}" for v in cube.VARS]
+        aggregates += [f"SUM({value(a)} * {value(b)}) AS cross_{a}_{b}" for a, b in cube.PAIRS]
+        aggregates += [f"MIN({v}) AS min_{v}" for v in cube.VARS]
+        aggregates += [f"MAX({v}) AS max_{v}" for v in cube.VARS]
+        joined = ("SELECT p.year, p.month, p.passengers, "
+                  + ', '.join(f"w.{v}" for v in cube.VARS if v != 'passengers')
+                  + " FROM Passengers p JOIN Weather w ON p.year = w.year AND p.month = w.month")
+        sql = (f"SELECT year, month, {', '.join(aggregates)} FROM ({joined}) j "
+               f"GROUP BY year, month ORDER BY year, month")
+        cells = self.query(sql)
+        # Engines return Decimal/object for some sums; use the cube's dtypes
+        for column in cells.columns:
+            if column in ('year', 'month', 'n') or column.endswith('passengers') and not column.startswith('cross'):
+                cells[column] = cells[column].astype('int64')
+            else:
+                cells[column] = cells[column].astype('float64')
+        return cells.set_index(cube.KEYS)
+
+    def joined_rows(self, columns=('year', 'month', 'date', 'passengers',
+                                   'mean_temp', 'max_temp', 'min_temp', 'precipitation')):
+        """Joined rows (only needed when rows are plotted)."""
+        select = ', '.join(('p.' if c in ('year', 'month', 'date', 'passengers') else 'w.') + c for c in columns)
+        df = self.query(f"SELECT {select} FROM Passengers p JOIN Weather w "
+                        f"ON p.year = w.year AND p.month = w.month ORDER BY p.year, p.month")
+        if 'date' in df.columns:
+            # Engines return dates as text or their own types, rebuild them from the keys
+            df['date'] = schema.month_start(df['year'], df['month'])
+        return store.widen(schema.apply(df))
+
+    def close(self):
+        self.conn.close()
+
+
+class SQLiteBackend(Backend):
+    name = 'sqlite'
+
+    def connect(self):
+        import sqlite3
+        return sqlite3.connect(self.path)
+
+    def _load(self, table, columns, path, source):
+        import pyarrow.compute as pc
+        import pyarrow.csv as pv
+
+        if source == 'parquet':
+            import pyarrow.dataset as ds
+            data = ds.dataset(path, format='parquet', partitioning=store.PARTITIONING).to_table(columns=columns)
+        else:
+            data = pv.read_csv(path).select(columns)
+        # Dates as 'YYYY-MM-DD' text, floats with the source precision
+        arrays = []
+        for column, sql_type in TABLE_COLUMNS[table]:
+            array = data.column(column)
+            if sql_type == 'DATE':
+                array = pc.strftime(array, format='%Y-%m-%d')
+            elif sql_type == 'FLOAT':
+                array = pc.round(pc.cast(array, 'float64'), store.FLOAT_DECIMALS)
+            arrays.append(array.to_pylist())
+        placeholders = ', '.join('?' * len(columns))
+        self.conn.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                              zip(*arrays))
+
+
+class DuckDBBackend(Backend):
+    name = 'duckdb'
+
+    def connect(self):
+        import duckdb
+        return duckdb.connect(self.path or DEFAULT_DUCKDB)
+
+    def execute(self, sql, params=()):
+        return self.conn.execute(sql, params)
+
+    def query(self, sql):
+        return self.conn.execute(sql).df()
+
+    def create_tables(self):
+        # The loader's SQLite DDL with two DuckDB differences: there is no AUTOINCREMENT, the id
+        # comes from a sequence, and FLOAT is 4 bytes (8 bytes in SQL Server and SQLite)
+        for table, ddl in (('Passengers', SQLITE_CREATE_PASSENGERS), ('Weather', SQLITE_CREATE_WEATHER)):
+            self.execute(self.drop_sql(table))
+            self.execute(f"CREATE OR REPLACE SEQUENCE {table}_id")
+            ddl = ddl.replace('id INTEGER PRIMARY KEY AUTOINCREMENT',
+                              f"id INTEGER PRIMARY KEY DEFAULT nextval('{table}_id')")
+            self.execute(ddl.replace(' FLOAT', ' DOUBLE'))
+        self.execute(SQLITE_CREATE_KEYS)
+        self.conn.commit()
+
+    def _load(self, table, columns, path, source):
+        # The engine parses the files itself; the path is a parameter, not part of the SQL text
+        if source == 'parquet':
+            reader = "read_parquet(?, hive_partitioning = true, union_by_name = true)"
+            path = os.path.join(path, '**', '*.parquet')
+        else:
+            reader = "read_csv(?, header = true)"
+        casts = []
+        for column, sql_type in TABLE_COLUMNS[table]:
+            if sql_type == 'FLOAT':
+                # float32 store values back to the one decimal of the source
+                casts.append(f"ROUND(CAST({column} AS DOUBLE), {store.FLOAT_DECIMALS}) AS {column}")
+            else:
+                casts.append(f"CAST({column} AS {DUCKDB_TYPES[sql_type]}) AS {column}")
+        self.execute(f"INSERT INTO {table} ({', '.join(columns)}) SELECT {', '.join(casts)} FROM {reader}", [path])
+
+
+class AzureBackend(Backend):
+    name = 'azure'
+
+    def connect(self):
+        from load_to_azure import connect
+        return connect()
+
+    def drop_sql(self, table):
+        return f"IF OBJECT_ID('{table}', 'U') IS NOT NULL DROP TABLE {table}"
+
+    def _load(self, table, columns, path, source):
+        from load_to_azure import insert_rows, read_rows
+        _, _, insert_sql, _, _ = TABLE_SOURCES[table]
+        csv_dir = os.path.dirname(path) if source == 'csv' else None
+        insert_rows(self.conn, self.conn.cursor(), insert_sql, read_rows(table, source, csv_dir))
+
+
+BACKENDS = {'sqlite': SQLiteBackend, 'duckdb': DuckDBBackend, 'azure': AzureBackend}
+
+
+def open_backend(spec):
+    """Backend for 'azure', 'sqlite:PATH' or 'duckdb[:PATH]'."""
+    name, _, path = spec.partition(':')
+    if name not in BACKENDS:
+        raise SystemExit(f"Unknown backend: {spec} (use azure, sqlite:PATH or duckdb[:PATH])")
+    if name == 'sqlite' and not path:
+        raise SystemExit("sqlite needs a file: sqlite:PATH")
+    return BACKENDS[name](path or None)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load or query the Passengers/Weather tables on a backend")
+    parser.add_argument('command', choices=['load', 'cells'])
+    parser.add_argument('backend', help="azure, sqlite:PATH or duckdb[:PATH]")
+    parser.add_argument('--source', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--csv-dir', default=store.CSV_DIR)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    backend = open_backend(args.backend)
+    if args.command == 'load':
+        backend.create_tables()
+        for table in TABLE_COLUMNS:
+            start = time.perf_counter()
+            count = backend.bulk_load(table, args.source, args.csv_dir)
+            print(f"{table}: {count} rows loaded into {backend.name} in {time.perf_counter() - start:.3f} s")
+    else:
+        start = time.perf_counter()
+        cells = backend.cube_cells()
+        print(cells.head().to_string())
+        print(f"{len(cells)} cells in {time.perf_counter() - start:.3f} s")
+    backend.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Batched correlation and simple regression.
+
+Computes Pearson r, its two-sided p-value and the OLS slope/intercept of
+y on x for every (group, variable) pair at once. Per-group sums come from
+np.bincount, so G groups x k variables cost a handful of NumPy calls
+instead of G*k calls to scipy.stats.pearsonr / np.polyfit.
+
+Usage:
+    python batch_stats.py --benchmark               # 1000 groups
+    python batch_stats.py --benchmark --groups 5000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+# Relative size of a centered sum of squares below which the column is constant
+FLAT = 1e-10
+
+
+def from_moments(n, mean_x, mean_y, cxx, cyy, cxy):
+    """
+    r, p, slope and intercept from centered sums (arrays broadcast together).
+
+    cxx = sum((x - mean_x)**2), cyy = sum((y - mean_y)**2),
+    cxy = sum((x - mean_x) * (y - mean_y)). Same p-value as scipy.stats.pearsonr
+    (t-distribution with n - 2 degrees of freedom, via the incomplete beta).
+    A constant x gives NaN for everything, a constant y NaN for r and p
+    (like pearsonr). Two rows give r = +-1 with p = 1, as pearsonr does.
+    """
+    from scipy import special
+
+    n = np.asarray(n, dtype=float)
+    # A constant column leaves rounding noise in the centered sums (a lot of it
+    # when they come from raw sums), not an exact zero
+    flat_x = cxx <= FLAT * n * mean_x ** 2
+    flat_y = cyy <= FLAT * n * mean_y ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = cxy / np.sqrt(cxx * cyy)
+        r = np.where(flat_x | flat_y, np.nan, np.clip(r, -1.0, 1.0))
+        slope = np.where(flat_x, np.nan, cxy / cxx)
+        intercept = mean_y - slope * mean_x
+
+        dof = n - 2
+        t_sq = r * r * dof / ((1.0 - r) * (1.0 + r))
+        p = special.betainc(0.5 * dof, 0.5, dof / (dof + t_sq))
+        p = np.where(np.abs(r) == 1.0, 0.0, p)
+        p = np.where(dof > 0, p, np.where(dof == 0, 1.0, np.nan))
+        p = np.where(np.isnan(r), np.nan, p)
+    return {'n': n, 'r': r, 'p': p, 'slope': slope, 'intercept': intercept}
+
+
+def from_sums(n, sum_x, sum_y, sq_x, sq_y, cross):
+    """Same as from_moments() for raw sums (e.g. the cells of cube.py)."""
+    n = np.asarray(n, dtype=float)
+    mean_x = sum_x / n
+    mean_y = sum_y / n
+    return from_moments(n, mean_x, mean_y,
+                        sq_x - sum_x * mean_x,
+                        sq_y - sum_y * mean_y,
+                        cross - sum_x * mean_y)
+
+
+def pearson(x, y, groups=None):
+    """
+    Correlation and regression of y on every column of x, per group.
+
+    x: (n, k) array, y: (n,) array, groups: (n,) labels or None for one group.
+    Returns (labels, stats) where every stats[...] array has shape (G, k).
+    Two passes (means, then centered sums) keep the sums numerically stable.
+    """
+    x = np.asarray(x, dtype=float)
+    if x.ndim == 1:
+        x = x[:, None]
+    y = np.asarray(y, dtype=float)
+    n_rows, k = x.shape
+
+    if groups is None:
+        labels = np.array([0])
+        codes = np.zeros(n_rows, dtype=np.intp)
+    else:
+        labels, codes = np.unique(np.asarray(groups), return_inverse=True)
+    n_groups = len(labels)
+
+    counts = np.bincount(codes, minlength=n_groups).astype(float)
+    mean_y = np.bincount(codes, weights=y, minlength=n_groups) / counts
+
+    # Column j of group g goes into bin g*k + j
+    cells = (codes[:, None] * k + np.arange(k)).ravel()
+    size = n_groups * k
+    mean_x = (np.bincount(cells, weights=x.ravel(), minlength=size).reshape(n_groups, k)
+              / counts[:, None])
+
+    dx = x - mean_x[codes]
+    dy = (y - mean_y[codes])[:, None]
+    cxx = np.bincount(cells, weights=(dx * dx).ravel(), minlength=size).reshape(n_groups, k)
+    cxy = np.bincount(cells, weights=(dx * dy).ravel(), minlength=size).reshape(n_groups, k)
+    cyy = np.bincount(codes, weights=(dy * dy).ravel(), minlength=n_groups)[:, None]
+
+    return labels, from_moments(counts[:, None], mean_x, mean_y[:, None], cxx, cyy, cxy)
+
+
+def benchmark(n_groups=1000, rows=132, k=4, seed=0):
+    from scipy import stats
+
+    rng = np.random.default_rng(seed)
+    groups = np.repeat(np.arange(n_groups), rows)
+    x = rng.normal(size=(n_groups * rows, k))
+    y = x @ rng.normal(size=k) + rng.normal(size=n_groups * rows)
+
+    start = time.perf_counter()
+    loop_r = np.empty((n_groups, k))
+    loop_slope = np.empty((n_groups, k))
+    for g in range(n_groups):
+        rows_g = slice(g * rows, (g + 1) * rows)
+        for j in range(k):
+            loop_r[g, j], _ = stats.pearsonr(x[rows_g, j], y[rows_g])
+            loop_slope[g, j] = np.polyfit(x[rows_g, j], y[rows_g], 1)[0]
+    loop_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, result = pearson(x, y, groups)
+    batch_s = time.perf_counter() - start
+
+    print(f"{n_groups} groups x {k} variables x {rows} rows")
+    print(f"  pearsonr + polyfit loop: {loop_s:.4f} s")
+    print(f"  batched:                 {batch_s:.4f} s ({loop_s / batch_s:.0f}x)")
+    print(f"  max |r diff|:     {np.max(np.abs(loop_r - result['r'])):.2e}")
+    print(f"  max |slope diff|: {np.max(np.abs(loop_slope - result['slope'])):.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched Pearson/OLS against per-group scipy calls")
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--groups', type=int, default=1000)
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.groups)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
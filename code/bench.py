@@ -0,0 +1,266 @@
+"""
+Benchmark suite for the cleaning, analysis and loading stages.
+
+Synthetic inputs are generated in the real raw formats at a given scale:
+
+    farþegar.csv  title line, blank line, ';' header "Ríkisfang";"2002M03";...
+                  and one row per nationality (scale x the real rows)
+    weather.txt   title line, tab separated IMO header and one block of
+                  months per station (scale x the real rows)
+
+Values are the real series with noise, so the cleaners see realistic data.
+Each stage then runs in a fresh process on those files:
+
+    generate          write the synthetic raw files
+    clean_passengers  cleanPassengers.read_raw + reshape_long
+    clean_weather     cleanWeather.clean_weather, all stations
+    analysis          join with the first nationality, per-station batched
+                      Pearson/OLS, aggregate cube cells and the scaled regression
+    load              load_to_azure.insert_rows into SQLite (batch mode)
+
+For every stage the wall time, rows processed and peak RSS (and its growth
+over the process after imports) are written to bench_output.txt in the
+repository root as fixed-width lines, so two runs can be compared with diff.
+
+Usage:
+    python bench.py                         # scales 10, 1000, 100000
+    python bench.py --scales 10,1000
+    python bench.py --scales 1000 --stages clean_weather,analysis
+"""
+
+import argparse
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+OUTPUT_FILE = os.path.join(BASE_DIR, 'bench_output.txt')
+REAL_PASSENGERS = os.path.join(BASE_DIR, '2026csv', 'farþegar.csv')
+REAL_WEATHER = os.path.join(BASE_DIR, 'weather.txt')
+
+STAGES = ['generate', 'clean_passengers', 'clean_weather', 'analysis', 'load']
+DEFAULT_SCALES = [10, 1000, 100000]
+
+# Rows generated per write, bounds the generator's memory at any scale
+GENERATE_CHUNK = 200_000
+
+
+# ---------- synthetic data ----------
+
+def generate_passengers(path, scale, seed=0):
+    """farþegar.csv with scale x the real nationality rows."""
+    with open(REAL_PASSENGERS, encoding='utf-8-sig') as f:
+        title, blank, header = f.readline(), f.readline(), f.readline()
+        real = [line.rstrip('\n').split(';') for line in f if line.strip()]
+    values = np.array([[int(v) for v in row[1:]] for row in real], dtype=float)
+
+    rng = np.random.default_rng(seed)
+    rows_per_chunk = max(1, GENERATE_CHUNK // values.shape[1])
+    written = 0
+    with open(path, 'w', encoding='utf-8-sig') as out:
+        out.write(title + blank + header)
+        n_rows = scale * len(real)
+        while written < n_rows:
+            count = min(rows_per_chunk, n_rows - written)
+            base = values[np.arange(written, written + count) % len(real)]
+            factor = rng.uniform(0.001, 1.0, size=(count, 1))
+            noise = rng.normal(1.0, 0.05, size=base.shape)
+            cells = np.maximum(base * factor * noise, 0).round().astype(np.int64)
+            names = [f'"Land {i}"' for i in range(written, written + count)]
+            lines = [name + ';' + ';'.join(map(str, row)) for name, row in zip(names, cells.tolist())]
+            out.write('\n'.join(lines) + '\n')
+            written += count
+    return written
+
+
+def generate_weather(path, scale, seed=0):
+    """weather.txt with scale stations, each a noisy copy of the real station."""
+    with open(REAL_WEATHER, encoding='utf-8') as f:
+        title, header = f.readline(), f.readline()
+    names = [name.strip() for name in header.rstrip('\n').split('\t')]
+    real = pd.read_csv(REAL_WEATHER, sep='\t', skiprows=2, header=None, names=names, skipinitialspace=True)
+
+    measures = [c for c in names if c not in ('stöð', 'ár', 'mán') and real[c].dtype.kind == 'f']
+    rng = np.random.default_rng(seed)
+    stations_per_chunk = max(1, GENERATE_CHUNK // len(real))
+    written = 0
+    with open(path, 'w', encoding='utf-8') as out:
+        out.write(title.replace('stöð 1 - Reykjavík', 'synthetic stations') + header)
+        for first in range(1, scale + 1, stations_per_chunk):
+            stations = np.arange(first, min(first + stations_per_chunk, scale + 1))
+            chunk = pd.concat([real] * len(stations), ignore_index=True)
+            chunk['stöð'] = np.repeat(stations, len(real))
+            noise = rng.normal(0, 0.5, size=(len(chunk), len(measures)))
+            chunk[measures] = (chunk[measures].to_numpy() + noise).round(1)
+            chunk.to_csv(out, sep='\t', header=False, index=False, float_format='%.1f')
+            written += len(chunk)
+    return written
+
+
+# ---------- stages ----------
+
+def stage_paths(workdir):
+    return {
+        'passengers_raw': os.path.join(workdir, 'farþegar.csv'),
+        'weather_raw': os.path.join(workdir, 'weather.txt'),
+        'passengers': os.path.join(workdir, 'passengers_by_nationality.csv'),
+        'weather': os.path.join(workdir, 'weather_clean.csv'),
+        'db': os.path.join(workdir, 'bench.db'),
+    }
+
+
+def run_generate(paths, scale):
+    return generate_passengers(paths['passengers_raw'], scale) + generate_weather(paths['weather_raw'], scale)
+
+
+def run_clean_passengers(paths, scale):
+    from cleanPassengers import read_raw, reshape_long
+    df_long = reshape_long(read_raw(paths['passengers_raw']))
+    df_long.to_csv(paths['passengers'], index=False)
+    return len(df_long)
+
+
+def run_clean_weather(paths, scale):
+    from cleanWeather import clean_weather
+    total, _, _ = clean_weather(paths['weather_raw'], paths['weather'], stations=None,
+                                keep_station=True, parquet=False)
+    return total
+
+
+def run_analysis(paths, scale):
+    import batch_stats
+    import cube
+    import join
+    import schema
+    from analasys import fit_regression, weather_vars
+    from store import widen
+
+    passengers = schema.read_csv(paths['passengers'], ['nationality', 'year', 'month', 'passengers'])
+    passengers = widen(passengers[passengers['nationality'] == passengers['nationality'].iloc[0]])
+    weather = widen(schema.read_csv(paths['weather']))
+    df = join.join(weather, passengers[['year', 'month', 'passengers']])
+
+    batch_stats.pearson(df[weather_vars].to_numpy(), df['passengers'].to_numpy(), df['station'].to_numpy())
+    cube.compute_cells(df)
+    fit_regression(df[weather_vars].values, df['passengers'].values)
+    return len(df)
+
+
+def run_load(paths, scale):
+    import sqlite3
+    from load_to_azure import (SQL_INSERT_PASSENGER, SQL_INSERT_WEATHER, SQLITE_CREATE_PASSENGERS,
+                               SQLITE_CREATE_WEATHER, insert_rows, read_passenger_rows, read_weather_rows)
+
+    # No unique (year, month) keys: the synthetic tables repeat months per nationality/station
+    if os.path.exists(paths['db']):
+        os.remove(paths['db'])
+    conn = sqlite3.connect(paths['db'])
+    cursor = conn.cursor()
+    cursor.execute(SQLITE_CREATE_PASSENGERS)
+    cursor.execute(SQLITE_CREATE_WEATHER)
+    total = insert_rows(conn, cursor, SQL_INSERT_PASSENGER, read_passenger_rows(paths['passengers']))
+    total += insert_rows(conn, cursor, SQL_INSERT_WEATHER, read_weather_rows(paths['weather']))
+    conn.close()
+    return total
+
+
+STAGE_FUNCS = {
+    'generate': run_generate,
+    'clean_passengers': run_clean_passengers,
+    'clean_weather': run_clean_weather,
+    'analysis': run_analysis,
+    'load': run_load,
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(stage, workdir, scale):
+    # Runs in a fresh process: import the stage's modules first, so the
+    # memory growth is the stage's own work (sklearn too, analasys imports it lazily)
+    import analasys, batch_stats, cleanPassengers, cleanWeather, cube, load_to_azure, schema  # noqa: F401
+    import sklearn.linear_model, sklearn.preprocessing  # noqa: F401
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    rows = STAGE_FUNCS[stage](stage_paths(workdir), scale)
+    seconds = time.perf_counter() - start
+    peak = peak_rss_mb()
+    return {'rows': rows, 'seconds': seconds, 'peak_mb': peak, 'delta_mb': peak - baseline}
+
+
+def run_isolated(stage, workdir, scale):
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        return pool.apply(measure, (stage, workdir, scale))
+
+
+# ---------- report ----------
+
+def header_lines():
+    return [
+        f"# python {platform.python_version()}, numpy {np.__version__}, pandas {pd.__version__}, "
+        f"{os.cpu_count()} CPUs, {platform.machine()}",
+        f"{'scale':>8}  {'stage':<18}{'rows':>14}{'seconds':>11}{'rows/s':>14}{'peak_mb':>10}{'delta_mb':>10}",
+    ]
+
+
+def format_line(scale, stage, result):
+    rate = result['rows'] / result['seconds'] if result['seconds'] > 0 else 0
+    return (f"{scale:>8}  {stage:<18}{result['rows']:>14}{result['seconds']:>11.3f}{rate:>14.0f}"
+            f"{result['peak_mb']:>10.1f}{result['delta_mb']:>10.1f}")
+
+
+def parse_list(value, cast=str):
+    return [cast(v) for v in value.split(',') if v.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cleaning, analysis and loading on synthetic data")
+    parser.add_argument('--scales', type=lambda v: parse_list(v, int), default=DEFAULT_SCALES,
+                        help="comma separated multiples of the real data (default: 10,1000,100000)")
+    parser.add_argument('--stages', type=parse_list, default=STAGES,
+                        help="comma separated stages (generate always runs): " + ', '.join(STAGES))
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    parser.add_argument('--keep', metavar='DIR', help="write the synthetic files to DIR and keep them")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = ['generate'] + [s for s in STAGES if s in args.stages and s != 'generate']
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"Unknown stages: {', '.join(sorted(unknown))} (stages: {', '.join(STAGES)})")
+
+    lines = header_lines()
+    for line in lines:
+        print(line)
+    for scale in args.scales:
+        workdir = os.path.join(args.keep, f"scale_{scale}") if args.keep else tempfile.mkdtemp(prefix='bench_')
+        os.makedirs(workdir, exist_ok=True)
+        try:
+            for stage in stages:
+                line = format_line(scale, stage, run_isolated(stage, workdir, scale))
+                print(line, flush=True)
+                lines.append(line)
+        finally:
+            if not args.keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
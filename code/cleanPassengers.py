@@ -1,58 +1,150 @@
+import os
+import sys
+import time
+
+import numpy as np
 import pandas as pd
 
-# Read the raw passenger data (semicolon separated, wide format)
-input_file = '2026csv/farþegar.csv'
-df = pd.read_csv(input_file, sep=';', skiprows=2, encoding='utf-8-sig')
+import instrument
+import schema
+import store
+
+CSV_DIR = os.path.join(os.path.dirname(__file__), '..', '2026csv')
+TOTAL_ROW = 'Útlendingar alls'
+START_YEAR = 2012
+END_YEAR = 2022
+
 
-# The first column is "Ríkisfang", rest are months like "2002M03"
-# Row contains "Útlendingar alls" with passenger counts
+def read_raw(input_file):
+    # Read the raw passenger data (semicolon separated, wide format)
+    # The first column is "Ríkisfang", rest are months like "2002M03"
+    # Counts are parsed straight to float32 (exact below 2**24), missing cells ("..") become NaN
+    header = pd.read_csv(input_file, sep=';', skiprows=2, encoding='utf-8-sig', nrows=0).columns
+    dtypes = {col: 'float32' for col in header if col != 'Ríkisfang'}
+    return pd.read_csv(input_file, sep=';', skiprows=2, encoding='utf-8-sig', dtype=dtypes, na_values=['..'])
 
-# Get the passenger row (Útlendingar alls)
-passenger_row = df[df['Ríkisfang'] == 'Útlendingar alls'].iloc[0]
 
-# Extract month columns (all except 'Ríkisfang')
-month_columns = [col for col in df.columns if col != 'Ríkisfang']
+def reshape_long(df):
+    """
+    Wide to long for every nationality row in one pass.
 
-# Transform from wide to long format
-data = []
-for month_col in month_columns:
-    # Parse year and month from "2012M01" format
-    year = int(month_col[:4])
-    month = int(month_col[5:7])
-    passengers = passenger_row[month_col]
+    Same result as df.melt(id_vars='Ríkisfang'), but the "YYYYMmm" headers are
+    parsed once per column (not once per cell) and repeated with numpy.
+    Returns columns nationality, year, month, date, passengers.
+    """
+    month_columns = df.columns[df.columns != 'Ríkisfang']
+    years = month_columns.str.slice(0, 4).astype(schema.DTYPES['year']).to_numpy()
+    months = month_columns.str.slice(5, 7).astype(schema.DTYPES['month']).to_numpy()
 
-    data.append({
-        'year': year,
-        'month': month,
-        'passengers': passengers
+    values = df[month_columns].to_numpy(dtype='float32', na_value=np.nan)
+    n_rows, n_cols = values.shape
+
+    df_long = pd.DataFrame({
+        'nationality': np.repeat(df['Ríkisfang'].to_numpy(), n_cols),
+        'year': np.tile(years, n_rows),
+        'month': np.tile(months, n_rows),
+        'passengers': values.ravel(),
     })
 
-# Create DataFrame
-df_clean = pd.DataFrame(data)
+    # Missing cells ("..") are dropped, the rest are whole numbers
+    df_long = schema.apply(df_long.dropna(subset=['passengers']))
+
+    # Add date column (first day of each month), built from the numbers directly
+    df_long['date'] = schema.month_start(df_long['year'], df_long['month'])
+    return df_long[['nationality', 'year', 'month', 'date', 'passengers']].reset_index(drop=True)
+
+
+def reshape_loop(df, nationality=TOTAL_ROW):
+    # Original row-by-row transform for a single nationality, kept for the benchmark
+    passenger_row = df[df['Ríkisfang'] == nationality].iloc[0]
+    month_columns = [col for col in df.columns if col != 'Ríkisfang']
+    data = []
+    for month_col in month_columns:
+        data.append({
+            'year': int(month_col[:4]),
+            'month': int(month_col[5:7]),
+            'passengers': passenger_row[month_col]
+        })
+    return pd.DataFrame(data)
+
+
+def select_total(df_long):
+    # Get the passenger row (Útlendingar alls) for START_YEAR-END_YEAR, sorted by year and month
+    df_filtered = df_long[(df_long['nationality'] == TOTAL_ROW) &
+                          (df_long['year'] >= START_YEAR) & (df_long['year'] <= END_YEAR)]
+    df_filtered = df_filtered.sort_values(['year', 'month']).reset_index(drop=True)
+    return df_filtered[['year', 'month', 'date', 'passengers']]
+
+
+def benchmark(df, n_rows=300, repeat=3):
+    # Scale the export up to n_rows nationality rows and time both transforms
+    big = pd.concat([df] * (n_rows // len(df) + 1), ignore_index=True).iloc[:n_rows].copy()
+    big['Ríkisfang'] = [f"{name} {i}" for i, name in enumerate(big['Ríkisfang'])]
+    n_cells = n_rows * (len(big.columns) - 1)
+
+    loop_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name in big['Ríkisfang']:
+            reshape_loop(big, name)
+        loop_times.append(time.perf_counter() - start)
+
+    vector_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        reshape_long(big)
+        vector_times.append(time.perf_counter() - start)
+
+    loop_best = min(loop_times)
+    vector_best = min(vector_times)
+    print(f"Benchmark: {n_rows} nationality rows x {len(big.columns) - 1} months = {n_cells:,} cells")
+    print(f"  loop:       {loop_best:.4f} s")
+    print(f"  vectorized: {vector_best:.4f} s")
+    print(f"  speedup:    {loop_best / vector_best:.1f}x")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    input_file = os.path.join(CSV_DIR, 'farþegar.csv')
+    with instrument.stage('parse') as s:
+        df = read_raw(input_file)
+        s.rows = len(df)
+
+    if '--benchmark' in argv:
+        benchmark(df)
+        return
+
+    with instrument.stage('reshape') as s:
+        df_long = reshape_long(df)
+        s.rows = len(df_long)
 
-# Filter to 2012-2022
-df_filtered = df_clean[(df_clean['year'] >= 2012) & (df_clean['year'] <= 2022)]
+    # Save every nationality row
+    long_file = os.path.join(CSV_DIR, 'passengers_by_nationality.csv')
+    with instrument.stage('write') as s:
+        df_long.to_csv(long_file, index=False)
+        store.write_table(df_long, 'passengers_by_nationality')
+        s.rows = len(df_long)
+    print(f"Passenger data for all nationalities saved to '{long_file}'")
+    print(f"Nationalities: {df_long['nationality'].nunique()}, total rows: {len(df_long)}")
 
-# Sort by year and month
-df_filtered = df_filtered.sort_values(['year', 'month']).reset_index(drop=True)
+    # Get the passenger row (Útlendingar alls) and filter to 2012-2022
+    df_filtered = select_total(df_long)
 
-# Add date column (first day of each month)
-df_filtered['date'] = pd.to_datetime(
-    df_filtered['year'].astype(str) + '-' +
-    df_filtered['month'].astype(str).str.zfill(2) + '-01'
-)
+    # Save to CSV
+    output_file = os.path.join(CSV_DIR, 'passengers_clean.csv')
+    with instrument.stage('write') as s:
+        df_filtered.to_csv(output_file, index=False)
+        store.write_table(df_filtered, 'passengers_clean')
+        s.rows = len(df_filtered)
 
-# Reorder columns
-df_filtered = df_filtered[['year', 'month', 'date', 'passengers']]
+    print(f"Clean passenger data saved to '{output_file}'")
+    print(f"Total rows: {len(df_filtered)}")
+    print(f"Date range: {df_filtered['year'].min()}-{df_filtered['month'].min():02d} to {df_filtered['year'].max()}-{df_filtered['month'].max():02d}")
+    print(f"\nFirst 5 rows:")
+    print(df_filtered.head())
+    print(f"\nLast 5 rows:")
+    print(df_filtered.tail())
 
-# Save to CSV
-output_file = '2026csv/passengers_clean.csv'
-df_filtered.to_csv(output_file, index=False)
 
-print(f"Clean passenger data saved to '{output_file}'")
-print(f"Total rows: {len(df_filtered)}")
-print(f"Date range: {df_filtered['year'].min()}-{df_filtered['month'].min():02d} to {df_filtered['year'].max()}-{df_filtered['month'].max():02d}")
-print(f"\nFirst 5 rows:")
-print(df_filtered.head())
-print(f"\nLast 5 rows:")
-print(df_filtered.tail())
+if __name__ == '__main__':
+    main()
@@ -1,42 +1,203 @@
+"""
+Clean the IMO monthly weather data (weather.txt or vedur.csv).
+
+The input is streamed in chunks: only the needed columns are parsed, rows are
+filtered by station and year while reading, and each chunk is appended to the
+output file, so memory use does not grow with the size of the input.
+Each chunk is also appended to the Parquet store (see store.py) under the
+output file's name. The stored table is removed first, so after a run with
+--no-parquet or with no matching rows the readers use the new CSV.
+
+Usage:
+    python cleanWeather.py                                   # station 1, 2012-2022
+    python cleanWeather.py --input ../2026csv/vedur.csv --stations all --keep-station \\
+        --start-year 1949 --output ../2026csv/weather_stations_clean.csv
+"""
+
+import argparse
+import os
+
 import pandas as pd
 
-# Read the raw weather data (tab-separated, skip header line)
-input_file = 'weather.txt'
-df = pd.read_csv(input_file, sep='\t', skiprows=1)
+import instrument
+import schema
+import store
+
+BASE_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+# Raw column -> clean column
+# stöð (station), ár (year), mán (month), t (mean temp),
+# tx (max temp), tn (min temp), r (precipitation),
+# sun (sunshine hours), rh (relative humidity), f (wind speed), p (pressure)
+COLUMNS = {
+    'stöð': 'station',
+    'ár': 'year',
+    'mán': 'month',
+    't': 'mean_temp',
+    'tx': 'max_temp',
+    'tn': 'min_temp',
+    'r': 'precipitation',
+    'sun': 'sunshine',
+    'rh': 'humidity',
+    'f': 'wind_speed',
+    'p': 'pressure',
+}
+
+# Written only with --extra (the default output keeps the original columns)
+EXTRA_COLUMNS = ['sunshine', 'humidity', 'wind_speed', 'pressure']
+
+# Parse types of the raw columns, from the clean column types in schema.py
+DTYPES = {raw: schema.parse_dtypes([clean])[clean] for raw, clean in COLUMNS.items()}
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def sniff_header(input_file):
+    """
+    Find the header line of a weather dump.
+
+    weather.txt is tab separated with a title line above the header,
+    vedur.csv is comma separated with the header on the first line.
+    Returns (separator, number of lines before the header, column names).
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        for skip, line in enumerate(f):
+            sep = '\t' if '\t' in line else ','
+            names = [name.strip() for name in line.rstrip('\r\n').split(sep)]
+            if names[0] == 'stöð':
+                return sep, skip, names
+    raise ValueError(f"No header line with 'stöð' found in {input_file}")
+
+
+def read_chunks(input_file, chunksize=DEFAULT_CHUNKSIZE):
+    # Parse only the columns we keep, with fixed dtypes (no type inference)
+    sep, skip, names = sniff_header(input_file)
+    return pd.read_csv(
+        input_file,
+        sep=sep,
+        skiprows=skip + 1,
+        header=None,
+        names=names,
+        usecols=list(COLUMNS),
+        dtype=DTYPES,
+        skipinitialspace=True,
+        chunksize=chunksize,
+    )
+
+
+def clean_chunk(chunk, stations=None, start_year=None, end_year=None):
+    # Filter to the requested stations and years
+    mask = pd.Series(True, index=chunk.index)
+    if stations is not None:
+        mask &= chunk['stöð'].isin(stations)
+    if start_year is not None:
+        mask &= chunk['ár'] >= start_year
+    if end_year is not None:
+        mask &= chunk['ár'] <= end_year
+
+    df_clean = schema.apply(chunk[mask].rename(columns=COLUMNS))
+
+    # Add date column (first day of each month)
+    df_clean['date'] = schema.month_start(df_clean['year'], df_clean['month'])
+    return df_clean
+
+
+def clean_weather(input_file, output_file, stations=(1,), start_year=2012, end_year=2022,
+                  keep_station=False, chunksize=DEFAULT_CHUNKSIZE, parquet=True, extra=False):
+    """
+    Stream input_file into output_file chunk by chunk.
+
+    The raw dumps are ordered by station, year and month, so the output keeps
+    that order without a global sort. Returns (rows written, first, last) where
+    first/last are (year, month) tuples or None if nothing matched.
+    """
+    columns = ['year', 'month', 'date', 'mean_temp', 'max_temp', 'min_temp', 'precipitation']
+    if keep_station:
+        columns = ['station'] + columns
+    if extra:
+        columns = columns + EXTRA_COLUMNS
+
+    table_name = os.path.splitext(os.path.basename(output_file))[0]
+    # The CSV is rewritten, an older store of the table would be read instead of it.
+    # Without parquet or without matching rows the table stays out of the store.
+    store.drop_table(table_name)
+
+    total = 0
+    first = last = None
+    header = True
+    with open(output_file, 'w', newline='') as out:
+        for chunk in read_chunks(input_file, chunksize):
+            df_clean = clean_chunk(chunk, stations, start_year, end_year)
+            if df_clean.empty:
+                continue
+            df_clean = df_clean[columns]
+            df_clean.to_csv(out, index=False, header=header)
+            if parquet:
+                store.write_table(df_clean, table_name, append=not header)
+            header = False
+
+            total += len(df_clean)
+            if first is None:
+                first = (int(df_clean['year'].iloc[0]), int(df_clean['month'].iloc[0]))
+            last = (int(df_clean['year'].iloc[-1]), int(df_clean['month'].iloc[-1]))
+
+    if header:
+        # Nothing matched, still write the header so readers get the columns
+        with open(output_file, 'w', newline='') as out:
+            out.write(','.join(columns) + '\n')
+    return total, first, last
+
 
-# Strip whitespace from column names
-df.columns = df.columns.str.strip()
+def parse_stations(value):
+    if value == 'all':
+        return None
+    return [int(s) for s in value.split(',')]
 
-# Columns: stöð (station), ár (year), mán (month), t (mean temp),
-#          tx (max temp), tn (min temp), r (precipitation)
 
-# Filter to 2012-2022
-df = df[(df['ár'] >= 2012) & (df['ár'] <= 2022)]
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Clean IMO monthly weather data")
+    parser.add_argument('--input', default=os.path.join(BASE_DIR, 'weather.txt'),
+                        help="weather.txt (tab) or vedur.csv (comma) dump")
+    parser.add_argument('--output', default=os.path.join(BASE_DIR, '2026csv', 'weather_clean.csv'))
+    parser.add_argument('--stations', type=parse_stations, default=[1],
+                        help="comma separated station ids or 'all' (default: 1)")
+    parser.add_argument('--start-year', type=int, default=2012)
+    parser.add_argument('--end-year', type=int, default=2022)
+    parser.add_argument('--keep-station', action='store_true',
+                        help="write the station id as the first column")
+    parser.add_argument('--extra', action='store_true',
+                        help="also write sunshine, humidity, wind_speed and pressure")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f"rows parsed per chunk (default: {DEFAULT_CHUNKSIZE})")
+    parser.add_argument('--no-parquet', action='store_true',
+                        help="only write the CSV file, not the Parquet store")
+    return parser.parse_args(argv)
 
-# Select and rename relevant columns
-df_clean = df[['ár', 'mán', 't', 'tx', 'tn', 'r']].copy()
-df_clean.columns = ['year', 'month', 'mean_temp', 'max_temp', 'min_temp', 'precipitation']
 
-# Sort by year and month
-df_clean = df_clean.sort_values(['year', 'month']).reset_index(drop=True)
+def main(argv=None):
+    args = parse_args(argv)
+    with instrument.stage('clean') as s:
+        total, first, last = clean_weather(
+            args.input, args.output,
+            stations=args.stations,
+            start_year=args.start_year,
+            end_year=args.end_year,
+            keep_station=args.keep_station,
+            chunksize=args.chunksize,
+            parquet=not args.no_parquet,
+            extra=args.extra,
+        )
+        s.rows = total
 
-# Add date column (first day of each month)
-df_clean['date'] = pd.to_datetime(
-    df_clean['year'].astype(str) + '-' +
-    df_clean['month'].astype(str).str.zfill(2) + '-01'
-)
+    print(f"Clean weather data saved to '{args.output}'")
+    print(f"Total rows: {total}")
+    if first is not None:
+        print(f"Date range: {first[0]}-{first[1]:02d} to {last[0]}-{last[1]:02d}")
 
-# Reorder columns
-df_clean = df_clean[['year', 'month', 'date', 'mean_temp', 'max_temp', 'min_temp', 'precipitation']]
+        df_clean = pd.read_csv(args.output, nrows=5)
+        print(f"\nFirst 5 rows:")
+        print(df_clean)
 
-# Save to CSV
-output_file = '2026csv/weather_clean.csv'
-df_clean.to_csv(output_file, index=False)
 
-print(f"Clean weather data saved to '{output_file}'")
-print(f"Total rows: {len(df_clean)}")
-print(f"Date range: {df_clean['year'].min()}-{df_clean['month'].min():02d} to {df_clean['year'].max()}-{df_clean['month'].max():02d}")
-print(f"\nFirst 5 rows:")
-print(df_clean.head())
-print(f"\nLast 5 rows:")
-print(df_clean.tail())
+if __name__ == '__main__':
+    main()
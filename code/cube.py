@@ -0,0 +1,188 @@
+"""
+Precomputed aggregate cube for the analysis statistics.
+
+One cell per (year, month) holds, for the analysis variables, the row count,
+sums, sums of squares, min/max and the cross-product sums of every pair.
+These are all additive, so any group-by (month, season, year or everything)
+is a sum over cells, and means, variances and Pearson correlations follow
+from the sums in O(groups) instead of another pass over the rows.
+
+The cube is saved to 2026csv/analysis_cube.parquet together with a hash
+of each cell's input rows. On the next run only cells whose rows changed
+(or are new) are recomputed; the rest are read back from disk.
+"""
+
+import os
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+import batch_stats
+
+CUBE_FILE = os.path.join(os.path.dirname(__file__), '..', '2026csv', 'analysis_cube.parquet')
+
+KEYS = ['year', 'month']
+VARS = ['passengers', 'mean_temp', 'max_temp', 'min_temp', 'precipitation']
+PAIRS = list(combinations(VARS, 2))
+
+SEASONS = {12: 'Winter', 1: 'Winter', 2: 'Winter',
+           3: 'Spring', 4: 'Spring', 5: 'Spring',
+           6: 'Summer', 7: 'Summer', 8: 'Summer',
+           9: 'Fall', 10: 'Fall', 11: 'Fall'}
+
+
+def sum_columns():
+    # Additive columns of a cell (everything except min/max and the hash)
+    return (['n'] + ['sum_' + v for v in VARS] + ['sq_' + v for v in VARS]
+            + ['cross_' + a + '_' + b for a, b in PAIRS])
+
+
+def cell_hashes(df):
+    # Order-independent hash of each cell's rows (sum of row hashes, wrapping uint64)
+    row_hash = pd.util.hash_pandas_object(df[KEYS + VARS], index=False)
+    return row_hash.groupby([df['year'], df['month']]).sum().rename('cell_hash')
+
+
+def compute_cells(df):
+    """Cell statistics for every (year, month) in df, one group-by pass."""
+    data = df[KEYS].copy()
+    data['n'] = 1
+    for v in VARS:
+        data['sum_' + v] = df[v]
+        data['sq_' + v] = df[v] * df[v]
+    for a, b in PAIRS:
+        data['cross_' + a + '_' + b] = df[a] * df[b]
+
+    grouped = data.groupby(KEYS)
+    cells = grouped[sum_columns()].sum()
+    for v in VARS:
+        cells['min_' + v] = df.groupby(KEYS)[v].min()
+        cells['max_' + v] = df.groupby(KEYS)[v].max()
+    return cells
+
+
+def merge_cells(parts):
+    """
+    Combine cell tables computed from disjoint sets of rows.
+
+    Sums add up and min/max combine, so cells of partitions that share a
+    (year, month) give the cells of the partitions' rows taken together.
+    """
+    cells = pd.concat(parts)
+    if not cells.index.has_duplicates:
+        return cells.sort_index()
+    agg = {col: 'sum' for col in sum_columns()}
+    for v in VARS:
+        agg['min_' + v] = 'min'
+        agg['max_' + v] = 'max'
+    return cells.groupby(level=KEYS).agg(agg)
+
+
+def update_cube(df, path=CUBE_FILE):
+    """
+    Bring the saved cube up to date with df and return it.
+
+    Cells are matched by the hash of their rows: unchanged cells are reused,
+    changed and new cells are recomputed from their rows only, and cells
+    that no longer have rows are dropped.
+    """
+    hashes = cell_hashes(df)
+
+    cube = None
+    if os.path.exists(path):
+        cube = pd.read_parquet(path).set_index(KEYS)
+        cube = cube[cube.index.isin(hashes.index)]
+        stale = hashes.index[~hashes.index.isin(cube.index)
+                             | (cube['cell_hash'].reindex(hashes.index) != hashes).to_numpy()]
+    else:
+        stale = hashes.index
+
+    if len(stale) or cube is None:
+        cell_keys = pd.MultiIndex.from_arrays([df['year'], df['month']])
+        fresh = compute_cells(df[cell_keys.isin(stale)])
+        fresh['cell_hash'] = hashes.reindex(fresh.index)
+        if cube is None:
+            cube = fresh
+        else:
+            cube = pd.concat([cube.drop(index=stale, errors='ignore'), fresh])
+        cube = cube.sort_index()
+        cube.reset_index().to_parquet(path, index=False)
+
+    cube.attrs['recomputed'] = len(stale)
+    return cube
+
+
+def rollup(cube, by=None):
+    """
+    Sum cells into groups: by=None (everything), 'year', 'month' or 'season'.
+
+    Returns one row per group with the additive columns and min/max.
+    """
+    cells = cube.reset_index()
+    if by is None:
+        key = pd.Series('all', index=cells.index)
+    elif by == 'season':
+        key = cells['month'].map(SEASONS)
+    else:
+        key = cells[by]
+
+    agg = {col: 'sum' for col in sum_columns()}
+    for v in VARS:
+        agg['min_' + v] = 'min'
+        agg['max_' + v] = 'max'
+    return cells.groupby(key.rename(by or 'all')).agg(agg)
+
+
+def means(groups):
+    """Mean of every variable per group."""
+    return pd.DataFrame({v: groups['sum_' + v] / groups['n'] for v in VARS})
+
+
+def corr(groups, a, b):
+    """Pearson r between a and b per group, from the sums."""
+    return regression(groups, a, b)['r']
+
+
+def regression(groups, x, y):
+    """r, p-value, slope and intercept of y on x per group (DataFrame), from the sums."""
+    a, b = (x, y) if (x, y) in PAIRS else (y, x)
+    result = batch_stats.from_sums(groups['n'].to_numpy(),
+                                   groups['sum_' + x].to_numpy(), groups['sum_' + y].to_numpy(),
+                                   groups['sq_' + x].to_numpy(), groups['sq_' + y].to_numpy(),
+                                   groups['cross_' + a + '_' + b].to_numpy())
+    return pd.DataFrame(result, index=groups.index)
+
+
+def normal_equations(groups, xs, y):
+    """
+    Z'Z, Z'y and y'y of the regression of y on xs (Z = [1, xs]) for a single-group rollup.
+
+    Same inputs as fitting on the rows, from the cell sums only.
+    """
+    row = groups.iloc[0]
+
+    def cross(a, b):
+        if a == b:
+            return row['sq_' + a]
+        return row['cross_' + a + '_' + b] if (a, b) in PAIRS else row['cross_' + b + '_' + a]
+
+    k = len(xs) + 1
+    zz = np.empty((k, k))
+    zz[0, 0] = row['n']
+    for i, a in enumerate(xs):
+        zz[0, i + 1] = zz[i + 1, 0] = row['sum_' + a]
+        for j, b in enumerate(xs):
+            zz[i + 1, j + 1] = cross(a, b)
+    zy = np.array([row['sum_' + y]] + [cross(a, y) for a in xs], dtype=float)
+    return zz, zy, float(row['sq_' + y])
+
+
+def corr_matrix(groups, variables=VARS):
+    """Correlation matrix of variables for a single-group rollup (like DataFrame.corr())."""
+    matrix = pd.DataFrame(1.0, index=variables, columns=variables)
+    for a, b in combinations(variables, 2):
+        r = float(corr(groups, a, b).iloc[0])
+        matrix.loc[a, b] = r
+        matrix.loc[b, a] = r
+    return matrix
@@ -0,0 +1,396 @@
+"""
+Change-data capture for the monthly raw exports.
+
+farþegar.csv (Hagstofa) and weather.txt (IMO) are re-exported in full every
+month. This stage compares a new export with a snapshot of the previously
+ingested one and passes on only the cells that are new or were revised:
+
+- farþegar.csv: one hash per month column (over the nationalities and their
+  values). Columns whose hash is unchanged are not reshaped at all; the
+  changed ones go through cleanPassengers.reshape_long and are compared
+  with the snapshot's per-cell hashes.
+- weather.txt: the rows are streamed through cleanWeather.clean_chunk and
+  compared with the snapshot's hash per (station, year, month) row.
+
+A new cell has a key that is not in the snapshot, a revised cell (a restated
+figure) has a different hash, a removed cell is only in the snapshot. The
+delta is written in the clean formats to 2026csv/delta/, with delta.json
+listing the new, revised and removed (year, month) cells. It is then merged
+into the clean CSV files and the Parquet store (only the years it touches
+are rewritten) and the snapshot is replaced. Load it with
+
+    python load_to_azure.py --delta [--sqlite PATH]
+
+which upserts only the delta rows, verifies only their months and marks the
+delta consumed. Until then, further delta.py runs merge their changes into
+the pending delta instead of replacing it. The aggregate cube of analasys.py already recomputes changed months only. The
+first run has no snapshot and sees every cell as new.
+
+Usage:
+    python delta.py                     # detect, apply to the clean data, save the snapshot
+    python delta.py --dry-run           # only report the changed cells
+    python delta.py --passengers new/farþegar.csv --weather new/weather.txt
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import cleanPassengers
+import cleanWeather
+import instrument
+import schema
+import store
+
+CSV_DIR = store.CSV_DIR
+SNAPSHOT_DIR = os.path.join(CSV_DIR, 'snapshots')
+DELTA_DIR = os.path.join(CSV_DIR, 'delta')
+MANIFEST = 'delta.json'
+
+PASSENGER_KEYS = ['nationality', 'year', 'month']
+WEATHER_KEYS = ['station', 'year', 'month']
+WEATHER_VALUES = [c for c in cleanWeather.COLUMNS.values() if c not in WEATHER_KEYS]
+
+# The clean weather table as cleanWeather.py writes it by default
+WEATHER_DEFAULTS = cleanWeather.parse_args([])
+WEATHER_COLUMNS = ['year', 'month', 'date', 'mean_temp', 'max_temp', 'min_temp', 'precipitation']
+
+
+# ---------- hashing ----------
+
+def row_hashes(df, columns):
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def column_hashes(wide):
+    """{month column: hash of the nationalities and the column's values} of the raw passenger export."""
+    names = pd.util.hash_pandas_object(wide['Ríkisfang'], index=False).to_numpy().tobytes()
+    result = {}
+    for column in wide.columns[1:]:
+        h = hashlib.sha1(names)
+        h.update(wide[column].to_numpy(dtype='float32', na_value=np.nan).tobytes())
+        result[column] = h.hexdigest()
+    return result
+
+
+def column_month(column):
+    # "2002M03" -> (2002, 3)
+    return int(column[:4]), int(column[5:7])
+
+
+def key_frame(df, keys):
+    # Plain key columns, so snapshot and export keys compare by value
+    return pd.DataFrame({k: df[k].astype(str if k == 'nationality' else 'int64').to_numpy() for k in keys})
+
+
+def compare(new, old, keys):
+    """
+    Match the rows of new with the snapshot rows old on keys.
+
+    Returns (positions in old, -1 for new keys; new mask; revised mask).
+    """
+    index = pd.MultiIndex.from_frame(key_frame(old, keys))
+    positions = index.get_indexer(pd.MultiIndex.from_frame(key_frame(new, keys)))
+    return positions, *changes(positions, old['hash'].to_numpy(), new['hash'].to_numpy())
+
+
+def changes(positions, old_hash, new_hash):
+    # (new mask, revised mask) from the matched snapshot positions
+    is_new = positions < 0
+    is_revised = np.zeros(len(positions), dtype=bool)
+    is_revised[~is_new] = old_hash[positions[~is_new]] != new_hash[~is_new]
+    return is_new, is_revised
+
+
+def month_cells(df):
+    # Sorted unique (year, month) cells of df
+    return sorted({(int(y), int(m)) for y, m in zip(df['year'], df['month'])})
+
+
+# ---------- snapshot ----------
+
+def empty_cells(keys):
+    return pd.DataFrame({**{k: pd.Series(dtype=str if k == 'nationality' else 'int64') for k in keys},
+                         'hash': pd.Series(dtype='uint64')})
+
+
+def load_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    path = os.path.join(snapshot_dir, 'snapshot.json')
+    if not os.path.exists(path):
+        return {'passenger_columns': {},
+                'passengers': empty_cells(PASSENGER_KEYS),
+                'weather': empty_cells(WEATHER_KEYS)}
+    with open(path) as f:
+        snapshot = json.load(f)
+    snapshot['passengers'] = pd.read_parquet(os.path.join(snapshot_dir, 'passengers.parquet'))
+    snapshot['weather'] = pd.read_parquet(os.path.join(snapshot_dir, 'weather.parquet'))
+    return snapshot
+
+
+def save_snapshot(passengers, weather, snapshot_dir=SNAPSHOT_DIR):
+    os.makedirs(snapshot_dir, exist_ok=True)
+    key_frame(passengers['cells'], PASSENGER_KEYS).assign(hash=passengers['cells']['hash'].to_numpy()) \
+        .to_parquet(os.path.join(snapshot_dir, 'passengers.parquet'), index=False)
+    key_frame(weather['cells'], WEATHER_KEYS).assign(hash=weather['cells']['hash'].to_numpy()) \
+        .to_parquet(os.path.join(snapshot_dir, 'weather.parquet'), index=False)
+    with open(os.path.join(snapshot_dir, 'snapshot.json'), 'w') as f:
+        json.dump({'passenger_columns': passengers['columns']}, f, indent=1)
+
+
+# ---------- detection ----------
+
+def detect_passengers(raw_file, snapshot):
+    """Changed cells of a farþegar.csv export; only the changed month columns are reshaped."""
+    wide = cleanPassengers.read_raw(raw_file)
+    columns = column_hashes(wide)
+    old_columns = snapshot['passenger_columns']
+    changed = [c for c in columns if old_columns.get(c) != columns[c]]
+    dropped = [c for c in old_columns if c not in columns]
+
+    cells = cleanPassengers.reshape_long(wide[['Ríkisfang'] + changed])
+    cells['hash'] = row_hashes(cells, ['passengers'])
+
+    # Only the snapshot cells of changed or dropped columns can differ
+    old = snapshot['passengers']
+    months = {y * 12 + m - 1 for y, m in map(column_month, changed + dropped)}
+    in_scope = (old['year'] * 12 + old['month'] - 1).isin(months).to_numpy()
+    scope = old[in_scope].reset_index(drop=True)
+
+    positions, is_new, is_revised = compare(cells, scope, PASSENGER_KEYS)
+    matched = np.zeros(len(scope), dtype=bool)
+    matched[positions[positions >= 0]] = True
+
+    kept = old[~in_scope]
+    return {
+        'rows': cells[is_new | is_revised].drop(columns='hash').reset_index(drop=True),
+        'new': cells[is_new],
+        'revised': cells[is_revised],
+        'removed': scope[~matched],
+        'columns': columns,
+        'changed_columns': len(changed),
+        'cells': pd.concat([key_frame(kept, PASSENGER_KEYS).assign(hash=kept['hash'].to_numpy()),
+                            key_frame(cells, PASSENGER_KEYS).assign(hash=cells['hash'].to_numpy())],
+                           ignore_index=True),
+    }
+
+
+def detect_weather(raw_file, snapshot):
+    """Changed rows of a weather export, streamed chunk by chunk."""
+    old = snapshot['weather']
+    index = pd.MultiIndex.from_frame(key_frame(old, WEATHER_KEYS))
+    old_hash = old['hash'].to_numpy()
+    matched = np.zeros(len(old), dtype=bool)
+
+    changed, new_keys, revised_keys, hashes = [], [], [], []
+    for chunk in cleanWeather.read_chunks(raw_file):
+        df = cleanWeather.clean_chunk(chunk)
+        df['hash'] = row_hashes(df, WEATHER_VALUES)
+        positions = index.get_indexer(pd.MultiIndex.from_frame(key_frame(df, WEATHER_KEYS)))
+        is_new, is_revised = changes(positions, old_hash, df['hash'].to_numpy())
+        matched[positions[~is_new]] = True
+
+        changed.append(df[is_new | is_revised].drop(columns='hash'))
+        new_keys.append(df.loc[is_new, WEATHER_KEYS])
+        revised_keys.append(df.loc[is_revised, WEATHER_KEYS])
+        hashes.append(key_frame(df, WEATHER_KEYS).assign(hash=df['hash'].to_numpy()))
+
+    def stack(frames, keys):
+        return pd.concat(frames, ignore_index=True) if frames else empty_cells(keys).drop(columns='hash')
+
+    return {
+        'rows': stack(changed, WEATHER_KEYS),
+        'new': stack(new_keys, WEATHER_KEYS),
+        'revised': stack(revised_keys, WEATHER_KEYS),
+        'removed': old[~matched],
+        'cells': pd.concat(hashes, ignore_index=True) if hashes else empty_cells(WEATHER_KEYS),
+    }
+
+
+# ---------- clean tables ----------
+
+def clean_tables(passengers, weather):
+    """
+    {clean table: (delta rows, removed keys, key columns)} in the cleaners' formats.
+
+    The filters are the cleaners' defaults: the Útlendingar alls row for
+    passengers_clean, station 1 for weather_clean, 2012-2022 for both.
+    """
+    years = (cleanPassengers.START_YEAR, cleanPassengers.END_YEAR)
+    removed = passengers['removed']
+    total_removed = removed[(removed['nationality'] == cleanPassengers.TOTAL_ROW) &
+                            removed['year'].between(*years)]
+
+    w = WEATHER_DEFAULTS
+    rows = weather['rows']
+    in_clean = rows['year'].between(w.start_year, w.end_year)
+    gone = weather['removed']
+    gone = gone[gone['year'].between(w.start_year, w.end_year)]
+    if w.stations is not None:
+        in_clean &= rows['station'].astype('int64').isin(w.stations)
+        gone = gone[gone['station'].isin(w.stations)]
+
+    return {
+        'passengers_by_nationality': (passengers['rows'], removed, PASSENGER_KEYS),
+        'passengers_clean': (cleanPassengers.select_total(passengers['rows']), total_removed, ['year', 'month']),
+        'weather_clean': (rows.loc[in_clean, WEATHER_COLUMNS].reset_index(drop=True), gone, ['year', 'month']),
+    }
+
+
+def merge_clean(name, rows, removed, keys, csv_dir=CSV_DIR):
+    """Replace/append rows and drop removed keys in a clean CSV file and its Parquet years."""
+    path = os.path.join(csv_dir, name + '.csv')
+    current = schema.read_csv(path) if os.path.exists(path) else rows.iloc[:0]
+    replaced = pd.concat([key_frame(rows, keys), key_frame(removed, keys)], ignore_index=True)
+    drop = pd.MultiIndex.from_frame(key_frame(current, keys)).isin(pd.MultiIndex.from_frame(replaced))
+
+    merged = pd.concat([current[~drop], rows[current.columns]], ignore_index=True)
+    order = keys
+    if 'nationality' in keys:
+        # Nationalities keep the order of the export, new ones go last
+        names = merged['nationality'].astype(str)
+        merged['nationality'] = pd.Categorical(names, categories=pd.unique(names))
+        order = ['nationality', 'year', 'month']
+    merged = schema.apply(merged.sort_values(order, kind='stable').reset_index(drop=True))
+    merged.to_csv(path, index=False)
+
+    years = sorted({int(y) for y in replaced['year']})
+    if store.has_table(name):
+        store.write_years(merged, name, years)
+    else:
+        store.write_table(merged, name)
+    return len(merged), years
+
+
+# ---------- report ----------
+
+def summary(name, result, extra=''):
+    print(f"{name}: {len(result['new'])} new, {len(result['revised'])} revised, "
+          f"{len(result['removed'])} removed cells{extra}")
+    for label in ('new', 'revised', 'removed'):
+        cells = month_cells(result[label])
+        if cells:
+            shown = ', '.join(f"{y}-{m:02d}" for y, m in cells[:12]) + (' ...' if len(cells) > 12 else '')
+            print(f"  {label:<8} {len(cells)} months: {shown}")
+
+
+def pending_manifest(delta_dir=DELTA_DIR):
+    """The manifest of a delta that load_to_azure.py --delta has not loaded yet, or None."""
+    path = os.path.join(delta_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    manifest = load_manifest(delta_dir)
+    return None if manifest.get('consumed') else manifest
+
+
+def combine(old_rows, old_removed, rows, removed, keys):
+    # Pending delta + newer delta: the newer rows and removals win for the same keys
+    newer = pd.MultiIndex.from_frame(pd.concat([key_frame(rows, keys), key_frame(removed, keys)],
+                                               ignore_index=True))
+    old_removed = key_frame(pd.DataFrame(old_removed, columns=keys), keys)
+    keep_rows = ~pd.MultiIndex.from_frame(key_frame(old_rows, keys)).isin(newer)
+    keep_removed = ~pd.MultiIndex.from_frame(old_removed).isin(newer)
+    rows = pd.concat([old_rows[keep_rows], rows[old_rows.columns]], ignore_index=True)
+    removed = pd.concat([old_removed[keep_removed], key_frame(removed, keys)], ignore_index=True)
+    return rows.sort_values(keys, kind='stable').reset_index(drop=True), removed
+
+
+def write_delta(passengers, weather, tables, delta_dir=DELTA_DIR):
+    """
+    Write the delta files and manifest.
+
+    A delta that has not been loaded yet is not replaced: the new changes are
+    merged into it, so a second delta.py run before the load loses nothing.
+    Returns True when a pending delta was merged.
+    """
+    pending = pending_manifest(delta_dir)
+    manifest = {'tables': {}, 'consumed': False}
+    for source, result in (('passengers', passengers), ('weather', weather)):
+        cells = {label: month_cells(result[label]) for label in ('new', 'revised', 'removed')}
+        if pending:
+            cells = {label: sorted({tuple(c) for c in pending[source][label]} | set(cells[label]))
+                     for label in cells}
+        manifest[source] = cells
+    for name, (rows, removed, keys) in tables.items():
+        if pending:
+            old_rows = schema.read_csv(os.path.join(delta_dir, name + '.csv'))
+            rows, removed = combine(old_rows, pending['tables'][name]['removed'], rows, removed, keys)
+        manifest['tables'][name] = {'rows': len(rows), 'keys': keys,
+                                    'removed': key_frame(removed, keys).values.tolist()}
+        tables[name] = (rows, removed, keys)
+
+    if os.path.isdir(delta_dir):
+        shutil.rmtree(delta_dir)
+    os.makedirs(delta_dir)
+    for name, (rows, _, _) in tables.items():
+        rows.to_csv(os.path.join(delta_dir, name + '.csv'), index=False)
+    with open(os.path.join(delta_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return pending is not None
+
+
+def load_manifest(delta_dir=DELTA_DIR):
+    with open(os.path.join(delta_dir, MANIFEST)) as f:
+        return json.load(f)
+
+
+def mark_consumed(delta_dir=DELTA_DIR):
+    # Called by load_to_azure.py --delta once the delta is loaded and verified
+    manifest = load_manifest(delta_dir)
+    manifest['consumed'] = True
+    with open(os.path.join(delta_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=1)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Detect and apply new/revised months of the raw exports")
+    parser.add_argument('--passengers', default=os.path.join(CSV_DIR, 'farþegar.csv'),
+                        help="new Hagstofa export (default: 2026csv/farþegar.csv)")
+    parser.add_argument('--weather', default=WEATHER_DEFAULTS.input,
+                        help="new IMO export (default: weather.txt)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="report the delta, do not write it or update the snapshot")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    snapshot = load_snapshot()
+
+    with instrument.stage('detect passengers') as s:
+        passengers = detect_passengers(args.passengers, snapshot)
+        s.rows = len(passengers['rows'])
+    summary('Passengers', passengers,
+            f" ({passengers['changed_columns']} of {len(passengers['columns'])} month columns changed,"
+            f" {s.wall:.3f} s)")
+
+    with instrument.stage('detect weather') as s:
+        weather = detect_weather(args.weather, snapshot)
+        s.rows = len(weather['rows'])
+    summary('Weather', weather, f" ({len(weather['cells'])} rows hashed, {s.wall:.3f} s)")
+
+    if args.dry_run:
+        return
+
+    tables = clean_tables(passengers, weather)
+    with instrument.stage('apply') as s:
+        # The clean files get this run's changes only, the delta file keeps the pending ones too
+        changes = dict(tables)
+        if write_delta(passengers, weather, tables):
+            print("  merged into the pending delta (not loaded yet)")
+        for name, (rows, removed, keys) in changes.items():
+            if len(rows) or len(removed):
+                total, years = merge_clean(name, rows, removed, keys)
+                print(f"  {name}: {len(rows)} rows upserted, {len(removed)} removed "
+                      f"({total} rows, years {', '.join(map(str, years))} rewritten in the store)")
+        save_snapshot(passengers, weather)
+        s.rows = sum(len(rows) for rows, _, _ in changes.values())
+    print(f"Delta written to '{DELTA_DIR}', snapshot saved ({s.wall:.3f} s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+Lagged and rolling weather features for the regression model.
+
+From the monthly weather of one station (all months in the raw dump) every
+base column gets:
+
+    lag{k}_{col}       value k months earlier
+    rollmean{w}_{col}  mean of the last w months (including the current one)
+    rollstd{w}_{col}   standard deviation of the last w months
+    yoy_{col}          change from the same month a year earlier
+
+The table also has the base columns themselves, so the current month's
+sunshine, humidity, wind_speed and pressure are available to the model.
+
+The months are first put on a gap-free monthly axis, so a shift of k rows
+is always k months. Each feature is one vectorized shift/rolling call.
+
+A feature is NaN until the dump has enough earlier months for it. weather.txt
+starts in January 2012, the first month of the analysis, so a lag of k
+months is missing for the first k months of 2012 and the 12-month features
+(lag12, rollmean12, rollstd12, yoy) for all of 2012. analasys.py --features
+drops those months: with the default features the regression uses the 120
+months from 2013 on, not all 132. A dump with earlier months for the station
+(--input) gives complete features from 2012.
+
+Every feature is cached in 2026csv/features/<name>.npy together with the
+hash of its input column; a feature is only recomputed when its input
+changed, so adding a lag computes that lag and nothing else. The assembled
+table is written to 2026csv/weather_features.csv (and the Parquet store).
+
+Usage:
+    python features.py                          # default lags/windows
+    python features.py --lags 1,2,3,6,12 --windows 3,12
+    python features.py --input ../2026csv/vedur.csv --station 1
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import store
+from cleanWeather import clean_chunk, read_chunks
+
+BASE_DIR = os.path.join(os.path.dirname(__file__), '..')
+CACHE_DIR = os.path.join(store.CSV_DIR, 'features')
+OUTPUT_FILE = os.path.join(store.CSV_DIR, 'weather_features.csv')
+
+BASE_COLUMNS = ['mean_temp', 'max_temp', 'min_temp', 'precipitation',
+                'sunshine', 'humidity', 'wind_speed', 'pressure']
+DEFAULT_LAGS = [1, 2, 3, 6, 12]
+DEFAULT_WINDOWS = [3, 6, 12]
+
+# Bump when the way a feature is computed changes, so cached files are rebuilt
+FEATURE_VERSION = 1
+
+
+def load_base(input_file, station=1):
+    """Monthly weather of one station on a gap-free month axis (missing months are NaN)."""
+    chunks = [clean_chunk(chunk, stations=[station]) for chunk in read_chunks(input_file)]
+    # Features are computed in float64 (rolling sums of float32 drift)
+    df = store.widen(pd.concat(chunks, ignore_index=True))
+    key = df['year'] * 12 + df['month'] - 1
+    axis = np.arange(key.min(), key.max() + 1)
+    base = df.set_index(key)[BASE_COLUMNS].reindex(axis)
+    base.insert(0, 'month', axis % 12 + 1)
+    base.insert(0, 'year', axis // 12)
+    return base.reset_index(drop=True)
+
+
+def feature_specs(lags=DEFAULT_LAGS, windows=DEFAULT_WINDOWS, columns=BASE_COLUMNS):
+    # [(feature name, kind, parameter, base column)]
+    specs = []
+    for col in columns:
+        specs += [(f"lag{k}_{col}", 'lag', k, col) for k in lags]
+        specs += [(f"rollmean{w}_{col}", 'rollmean', w, col) for w in windows]
+        specs += [(f"rollstd{w}_{col}", 'rollstd', w, col) for w in windows]
+        specs.append((f"yoy_{col}", 'yoy', 12, col))
+    return specs
+
+
+def compute(kind, param, series):
+    if kind == 'lag':
+        return series.shift(param)
+    if kind == 'rollmean':
+        return series.rolling(param, min_periods=param).mean()
+    if kind == 'rollstd':
+        return series.rolling(param, min_periods=param).std()
+    if kind == 'yoy':
+        return series - series.shift(param)
+    raise ValueError(f"Unknown feature kind: {kind}")
+
+
+def input_hash(kind, param, series, years, months):
+    # Feature definition + the month axis + the input column
+    h = hashlib.sha256()
+    h.update(f"{FEATURE_VERSION}:{kind}:{param}".encode())
+    h.update(years.to_numpy(dtype=np.int64).tobytes())
+    h.update(months.to_numpy(dtype=np.int64).tobytes())
+    h.update(series.to_numpy(dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def build_features(base, specs, cache_dir=CACHE_DIR):
+    """
+    Return (features DataFrame with year/month, number of features recomputed).
+
+    Features whose cached input hash matches are read from cache_dir.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    index_file = os.path.join(cache_dir, 'index.json')
+    index = {}
+    if os.path.exists(index_file):
+        with open(index_file) as f:
+            index = json.load(f)
+
+    features = {col: base[col] for col in ['year', 'month'] + BASE_COLUMNS}
+    recomputed = 0
+    for name, kind, param, col in specs:
+        digest = input_hash(kind, param, base[col], base['year'], base['month'])
+        path = os.path.join(cache_dir, name + '.npy')
+        if index.get(name) == digest and os.path.exists(path):
+            values = np.load(path)
+        else:
+            values = compute(kind, param, base[col]).to_numpy(dtype=np.float64)
+            np.save(path, values)
+            index[name] = digest
+            recomputed += 1
+        features[name] = values
+
+    with open(index_file, 'w') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    return pd.DataFrame(features), recomputed
+
+
+def parse_ints(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build lagged/rolling weather features")
+    parser.add_argument('--input', default=os.path.join(BASE_DIR, 'weather.txt'),
+                        help="weather.txt (tab) or vedur.csv (comma) dump")
+    parser.add_argument('--station', type=int, default=1)
+    parser.add_argument('--lags', type=parse_ints, default=DEFAULT_LAGS, help="comma separated lags in months")
+    parser.add_argument('--windows', type=parse_ints, default=DEFAULT_WINDOWS,
+                        help="comma separated rolling window lengths in months")
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    base = load_base(args.input, args.station)
+    specs = feature_specs(args.lags, args.windows)
+    features, recomputed = build_features(base, specs, args.cache_dir)
+
+    features.to_csv(args.output, index=False, float_format='%.6g')
+    store.write_table(features, os.path.splitext(os.path.basename(args.output))[0])
+    print(f"{len(specs)} features for {len(features)} months "
+          f"({recomputed} computed, {len(specs) - recomputed} from cache) -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
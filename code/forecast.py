@@ -0,0 +1,369 @@
+"""
+Passenger forecasts from weather, using the regression model of analasys.py.
+
+`forecast.py fit` (or analasys.py --save-model) saves the fitted model
+(StandardScaler + LinearRegression on mean_temp, max_temp, min_temp,
+precipitation) to 2026csv/forecast_model.json. Besides the scaler and
+coefficients the file keeps the sufficient statistics of the fit (n, sums,
+X'X, X'y) and every month's row, so a new month is added by updating those
+sums and solving the small normal equations again; the old months are never
+re-read. A revised month has its old row subtracted and the new one added.
+An update input that has the same month twice is rejected.
+Predicting is one dot product with the coefficients folded back
+to the unscaled inputs.
+
+Usage:
+    python forecast.py fit                          # fit from the clean data (like analasys.py)
+    python forecast.py predict 2023-07 11.2 13.9 8.9 41.0
+    python forecast.py predict --input new_weather.csv --output forecast.csv
+    python forecast.py update --input new_months.csv     # year,month,passengers + weather columns
+    python forecast.py update                            # add new / revised months of the clean data
+    python forecast.py serve --port 8000                 # GET /predict?mean_temp=..&max_temp=..
+    python forecast.py benchmark
+"""
+
+import argparse
+import json
+import os
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+MODEL_FILE = os.path.join(os.path.dirname(__file__), '..', '2026csv', 'forecast_model.json')
+
+FEATURES = ['mean_temp', 'max_temp', 'min_temp', 'precipitation']
+
+
+class Forecaster:
+    """
+    Linear model kept as sufficient statistics.
+
+    Z = [1, x] for every month; the model holds n = len(Z), Z'Z and Z'y
+    (plus y'y for the R2), and the coefficients are the solution of
+    Z'Z beta = Z'y, the same fit as LinearRegression on the scaled inputs.
+    """
+
+    def __init__(self, features=FEATURES, zz=None, zy=None, yy=0.0, months=(), rows=None):
+        self.features = list(features)
+        k = len(self.features) + 1
+        self.zz = np.zeros((k, k)) if zz is None else np.asarray(zz, dtype=float)
+        self.zy = np.zeros(k) if zy is None else np.asarray(zy, dtype=float)
+        self.yy = float(yy)
+        self.months = set(months)
+        # {month key: features + [passengers]}, needed to take a month out again
+        self.rows = dict(rows or {})
+        self.beta = np.zeros(k)
+        if self.n:
+            self.solve()
+
+    @property
+    def n(self):
+        return int(round(self.zz[0, 0]))
+
+    def add(self, X, y, months=None):
+        """
+        Add rows (X: (m, k) weather, y: (m,) passengers) and refit; O(k^3), not O(n).
+
+        Raises ValueError if months repeats a month or has one the model already holds,
+        the sums would count it twice while months/rows keep it once.
+        """
+        if months is not None:
+            repeated = sorted({int(key) for key in months if key in self.months} | set(duplicate_months(months)))
+            if repeated:
+                raise ValueError(f"months already in the model or given twice: {format_months(repeated)}")
+        X, y = self._accumulate(X, y, 1.0)
+        if months is not None:
+            self.months.update(months)
+            self.rows.update({int(key): list(x) + [float(v)] for key, x, v in zip(months, X.tolist(), y)})
+        self.solve()
+        return self
+
+    def replace(self, months, X, y):
+        """Swap the stored rows of months (all in self.rows) for revised ones and refit."""
+        old = np.array([self.rows[int(key)] for key in months], dtype=float).reshape(-1, len(self.features) + 1)
+        self._accumulate(old[:, :-1], old[:, -1], -1.0)
+        self.months.difference_update(months)
+        return self.add(X, y, months)
+
+    def _accumulate(self, X, y, sign):
+        X = np.asarray(X, dtype=float).reshape(-1, len(self.features))
+        y = np.asarray(y, dtype=float)
+        Z = np.column_stack([np.ones(len(X)), X])
+        self.zz += sign * (Z.T @ Z)
+        self.zy += sign * (Z.T @ y)
+        self.yy += sign * (y @ y)
+        return X, y
+
+    def solve(self):
+        self.beta = np.linalg.solve(self.zz, self.zy)
+
+    # scaler and coefficients in the form analasys.py prints them
+    def scaler(self):
+        mean = self.zz[0, 1:] / self.n
+        var = np.diag(self.zz)[1:] / self.n - mean ** 2
+        return mean, np.sqrt(np.maximum(var, 0))
+
+    def scaled_coef(self):
+        mean, scale = self.scaler()
+        return self.beta[1:] * scale, self.beta[0] + mean @ self.beta[1:]
+
+    def sse(self):
+        # Residual sum of squares from the sums: y'y - beta'Z'y
+        return max(self.yy - self.beta @ self.zy, 0.0)
+
+    def r2(self):
+        mean_y = self.zy[0] / self.n
+        sst = self.yy - self.n * mean_y ** 2
+        return 1 - self.sse() / sst
+
+    def rmse(self):
+        return np.sqrt(self.sse() / self.n)
+
+    def predict(self, X):
+        """Passengers for one month (k values) or many ((m, k) array)."""
+        X = np.asarray(X, dtype=float)
+        return self.beta[0] + X @ self.beta[1:]
+
+    def save(self, path=MODEL_FILE):
+        mean, scale = self.scaler()
+        coef, intercept = self.scaled_coef()
+        state = {
+            'features': self.features,
+            'scaler_mean': mean.tolist(),
+            'scaler_scale': scale.tolist(),
+            'coef': coef.tolist(),
+            'intercept': float(intercept),
+            'r2': float(self.r2()),
+            'zz': self.zz.tolist(),
+            'zy': self.zy.tolist(),
+            'yy': self.yy,
+            'months': sorted(self.months),
+            'rows': {str(key): row for key, row in sorted(self.rows.items())},
+        }
+        with open(path, 'w') as f:
+            json.dump(state, f, indent=2)
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        with open(path) as f:
+            state = json.load(f)
+        rows = {int(key): row for key, row in state.get('rows', {}).items()}
+        return cls(state['features'], state['zz'], state['zy'], state['yy'], state['months'], rows)
+
+
+def month_key(year, month):
+    return int(year) * 12 + int(month) - 1
+
+
+def duplicate_months(keys):
+    # Month keys that occur more than once
+    keys, counts = np.unique(np.asarray(keys, dtype=np.int64), return_counts=True)
+    return keys[counts > 1].tolist()
+
+
+def format_months(keys, shown=12):
+    text = ', '.join(f"{key // 12}-{key % 12 + 1:02d}" for key in keys[:shown])
+    return text + (' ...' if len(keys) > shown else '')
+
+
+def fit_frame(df, features=FEATURES):
+    """Forecaster fitted on a DataFrame with year, month, passengers and the features."""
+    keys = [month_key(y, m) for y, m in zip(df['year'], df['month'])]
+    return Forecaster(features).add(df[features].to_numpy(), df['passengers'].to_numpy(), keys)
+
+
+def load_clean_data():
+    import join
+    import store
+    passengers = store.load_table('passengers_clean')
+    weather = store.load_table('weather_clean')
+    return join.join(passengers, weather)
+
+
+# ---------- HTTP front-end ----------
+
+def make_handler(model):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            # /predict?mean_temp=..&max_temp=..&min_temp=..&precipitation=.. (repeat for a batch)
+            url = urlparse(self.path)
+            if url.path != '/predict':
+                return self._reply(404, {'error': 'use /predict'})
+            query = parse_qs(url.query)
+            try:
+                X = np.column_stack([[float(v) for v in query[f]] for f in model.features])
+            except (KeyError, ValueError) as exc:
+                return self._reply(400, {'error': f"need numeric {', '.join(model.features)}: {exc}"})
+            self._reply(200, {'passengers': model.predict(X).round().tolist()})
+
+        def do_POST(self):
+            # /predict with a JSON list of {feature: value} objects
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                rows = json.loads(self.rfile.read(length))
+                if not isinstance(rows, list) or not rows:
+                    raise ValueError("expected a non-empty JSON list of {feature: value} objects")
+                X = np.array([[float(row[f]) for f in model.features] for row in rows])
+            except (KeyError, ValueError, TypeError) as exc:
+                return self._reply(400, {'error': str(exc)})
+            self._reply(200, {'passengers': model.predict(X).round().tolist()})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+# ---------- commands ----------
+
+def cmd_fit(args):
+    model = fit_frame(load_clean_data())
+    model.save(args.model)
+    print_model(model, args.model)
+
+
+def cmd_predict(args):
+    model = Forecaster.load(args.model)
+    if args.input:
+        import pandas as pd
+        df = pd.read_csv(args.input)
+        df['predicted_passengers'] = model.predict(df[model.features].to_numpy()).round().astype('int64')
+        if args.output:
+            df.to_csv(args.output, index=False)
+            print(f"{len(df)} forecasts -> {args.output}")
+        else:
+            print(df.to_string(index=False))
+        return
+    if len(args.values) != len(model.features):
+        raise SystemExit(f"predict needs {len(model.features)} values: {', '.join(model.features)}")
+    print(f"{args.month}: {round(float(model.predict(args.values)))} passengers")
+
+
+def cmd_update(args):
+    model = Forecaster.load(args.model)
+    if args.input:
+        import pandas as pd
+        df = pd.read_csv(args.input)
+    else:
+        df = load_clean_data()
+    keys = np.array([month_key(y, m) for y, m in zip(df['year'], df['month'])])
+    repeated = duplicate_months(keys)
+    if repeated:
+        # Every row would be added to the sums, but the month stored once
+        raise SystemExit(f"{len(repeated)} months appear more than once in the input: {format_months(repeated)}")
+    X = df[model.features].to_numpy(dtype=float)
+    y = df['passengers'].to_numpy(dtype=float)
+    new = ~np.isin(keys, list(model.months))
+    # Months already in the model whose values were restated
+    known = np.isin(keys, list(model.rows))
+    revised = np.array([is_known and model.rows[int(key)] != list(x) + [float(v)]
+                        for key, is_known, x, v in zip(keys, known, X.tolist(), y)], dtype=bool)
+    unknown = ~new & ~known
+    if unknown.any():
+        # Saved without per-month rows (analasys.py --save-model): a revision can be neither seen nor taken out
+        print(f"Skipped {int(unknown.sum())} months already in the model: it has no per-month rows, "
+              f"so revisions cannot be applied (refit with 'forecast.py fit')")
+    if not new.any() and not revised.any():
+        print(f"No new or revised months ({model.n} months in the model)")
+        return
+    start = time.perf_counter()
+    if revised.any():
+        model.replace(keys[revised].tolist(), X[revised], y[revised])
+    if new.any():
+        model.add(X[new], y[new], keys[new].tolist())
+    elapsed = time.perf_counter() - start
+    model.save(args.model)
+    print(f"Added {int(new.sum())} and revised {int(revised.sum())} months in {elapsed * 1000:.3f} ms")
+    print_model(model, args.model)
+
+
+def cmd_serve(args):
+    model = Forecaster.load(args.model)
+    server = HTTPServer((args.host, args.port), make_handler(model))
+    print(f"Serving forecasts on http://{args.host}:{args.port}/predict (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+def cmd_benchmark(args):
+    model = Forecaster.load(args.model)
+    rng = np.random.default_rng(0)
+    x = [float(v) for v in rng.normal(5, 3, size=len(model.features))]
+
+    repeat = 100_000
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.predict(x)
+    single = (time.perf_counter() - start) / repeat
+
+    X = rng.normal(5, 3, size=(1_000_000, len(model.features)))
+    start = time.perf_counter()
+    model.predict(X)
+    batch = (time.perf_counter() - start) / len(X)
+
+    y = rng.normal(100_000, 30_000, size=1)
+    start = time.perf_counter()
+    for _ in range(1000):
+        Forecaster(model.features, model.zz, model.zy, model.yy).add(X[:1], y)
+    update = (time.perf_counter() - start) / 1000
+
+    print(f"single query:  {single * 1e6:8.2f} us")
+    print(f"batch query:   {batch * 1e9:8.2f} ns per month (1,000,000 months)")
+    print(f"add one month: {update * 1e6:8.2f} us")
+
+
+def print_model(model, path):
+    coef, intercept = model.scaled_coef()
+    print(f"Model: {model.n} months, R2 {model.r2():.4f} -> {path}")
+    for name, value in zip(model.features, coef):
+        print(f"  {name}: {round(value)}")
+    print(f"  intercept: {round(intercept)}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Passenger forecasts from weather")
+    parser.add_argument('--model', default=MODEL_FILE, help="model file written by fit (or analasys.py --save-model)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('fit', help="fit from the clean data").set_defaults(func=cmd_fit)
+
+    predict = commands.add_parser('predict', help="forecast one month or a CSV of months")
+    predict.add_argument('month', nargs='?', default='forecast', help="label, e.g. 2023-07")
+    predict.add_argument('values', nargs='*', type=float, help=' '.join(FEATURES))
+    predict.add_argument('--input', help="CSV with the weather columns")
+    predict.add_argument('--output', help="write the CSV with predicted_passengers here")
+    predict.set_defaults(func=cmd_predict)
+
+    update = commands.add_parser('update', help="add new months and revised months to the model")
+    update.add_argument('--input', help="CSV with year, month, passengers and the weather columns")
+    update.set_defaults(func=cmd_update)
+
+    serve = commands.add_parser('serve', help="local HTTP front-end")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.set_defaults(func=cmd_serve)
+
+    commands.add_parser('benchmark', help="time queries and updates").set_defaults(func=cmd_benchmark)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
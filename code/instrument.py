@@ -0,0 +1,231 @@
+"""
+Stage timing and memory instrumentation.
+
+Wrap a piece of work in a stage:
+
+    import instrument
+
+    with instrument.stage('parse') as s:
+        df = read_raw(path)
+        s.rows = len(df)
+
+    @instrument.timed('reshape', rows=len)
+    def reshape_long(df): ...
+
+A stage always measures its wall time (s.wall, seconds), which is two
+perf_counter calls. Everything else is only collected when tracing is on:
+CPU time, resident memory at the end of the stage and its change over the
+stage, the process's peak RSS so far, row counts and nesting. The peak is
+the process's lifetime high-water mark (all the OS reports), not the
+stage's own peak, so it is shown as "process peak"; the change of the
+resident memory from the start to the end of the stage is the per-stage
+number.
+
+Tracing is switched on with environment variables, so it also reaches
+scripts started by pipeline.py:
+
+    VG_TRACE=trace.jsonl     append one JSON record per script run to this file
+    VG_PROFILE=profiles/     also dump a cProfile file per top-level stage of the main thread
+
+or from code with instrument.enable(trace_file, profile_dir).
+
+Usage:
+    VG_TRACE=trace.jsonl python pipeline.py --force
+    VG_TRACE=trace.jsonl VG_PROFILE=prof python analasys.py --no-plots
+    python instrument.py trace.jsonl        # table of the recorded stages
+"""
+
+import atexit
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACE_ENV = 'VG_TRACE'
+PROFILE_ENV = 'VG_PROFILE'
+
+_trace = None
+
+
+class _Trace:
+    def __init__(self, trace_file, profile_dir=None):
+        self.trace_file = trace_file
+        self.profile_dir = profile_dir
+        self.script = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else 'python'
+        self.started = time.time()
+        self.origin = time.perf_counter()
+        self.stages = []
+        self.local = threading.local()
+        self.profile_count = 0
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+        atexit.register(self.write)
+
+    @property
+    def stack(self):
+        # Open stages of the calling thread (pipeline.py runs stages in threads)
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    def write(self):
+        if not self.stages:
+            return
+        record = {
+            'script': self.script,
+            'argv': sys.argv[1:],
+            'pid': os.getpid(),
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'peak_rss_mb': _peak_rss_mb(),
+            'stages': self.stages,
+        }
+        with open(self.trace_file, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        self.stages = []
+
+
+def _rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def enable(trace_file, profile_dir=None):
+    """Start recording stages; the trace is appended to trace_file at exit."""
+    global _trace
+    # Absolute paths in the environment, so child processes in another cwd use the same files
+    trace_file = os.environ[TRACE_ENV] = os.path.abspath(trace_file)
+    if profile_dir:
+        profile_dir = os.environ[PROFILE_ENV] = os.path.abspath(profile_dir)
+    _trace = _Trace(trace_file, profile_dir)
+
+
+def enabled():
+    return _trace is not None
+
+
+class stage:
+    """Context manager for one stage; set .rows inside the block to record a row count."""
+
+    __slots__ = ('name', 'rows', 'wall', '_start', '_cpu', '_rss', '_record', '_profile')
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.wall = 0.0
+        self._record = None
+
+    def __enter__(self):
+        trace = _trace
+        if trace is not None:
+            self._record = {'stage': self.name,
+                            'parent': trace.stack[-1]['stage'] if trace.stack else None,
+                            'start_s': round(time.perf_counter() - trace.origin, 6)}
+            trace.stack.append(self._record)
+            self._cpu = time.process_time()
+            self._rss = _rss_mb()
+            # cProfile cannot nest, and on Python 3.12+ only one profiler can be active in the
+            # process, so only top-level stages of the main thread are profiled (pipeline.py
+            # runs its stages in worker threads)
+            self._profile = None
+            main_thread = threading.current_thread() is threading.main_thread()
+            if trace.profile_dir and len(trace.stack) == 1 and main_thread:
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wall = time.perf_counter() - self._start
+        record = self._record
+        if record is not None:
+            trace = _trace
+            if self._profile is not None:
+                self._profile.disable()
+                trace.profile_count += 1
+                path = os.path.join(trace.profile_dir, f"{os.path.splitext(trace.script)[0]}-"
+                                                       f"{trace.profile_count:02d}-{self.name}.prof")
+                self._profile.dump_stats(path)
+                record['profile'] = path
+            record['wall_s'] = round(self.wall, 6)
+            record['cpu_s'] = round(time.process_time() - self._cpu, 6)
+            record['rss_mb'] = _rss_mb()
+            record['rss_change_mb'] = (None if record['rss_mb'] is None or self._rss is None
+                                       else round(record['rss_mb'] - self._rss, 3))
+            record['peak_rss_mb'] = _peak_rss_mb()
+            record['rows'] = self.rows
+            if exc_type is not None:
+                record['error'] = exc_type.__name__
+            trace.stack.pop()
+            trace.stages.append(record)
+        return False
+
+
+def timed(name=None, rows=None):
+    """
+    Decorator: run the function as a stage (default name: the function name).
+
+    rows, if given, is called on the return value to get the row count (e.g. rows=len).
+    """
+    def decorate(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name) as s:
+                result = func(*args, **kwargs)
+                if rows is not None and _trace is not None:
+                    s.rows = rows(result)
+                return result
+        return wrapper
+    return decorate
+
+
+def summarize(path):
+    """Print one line per recorded stage of every run in a trace file."""
+    # 'rss change' is the stage's own growth, 'process peak' the high-water mark of the whole run so far
+    print(f"{'script':<20}{'stage':<28}{'wall s':>10}{'cpu s':>10}{'rows':>12}{'rss MB':>9}{'rss change':>12}"
+          f"{'process peak MB':>17}")
+    with open(path) as f:
+        for line in f:
+            run = json.loads(line)
+            # Records are written as stages finish; show them in start order
+            for rec in sorted(run['stages'], key=lambda r: r['start_s']):
+                name = ('  ' if rec['parent'] else '') + rec['stage']
+                if 'error' in rec:
+                    name += ' [' + rec['error'] + ']'
+                rows = '' if rec['rows'] is None else rec['rows']
+                rss = f"{rec['rss_mb']:.1f}" if rec['rss_mb'] is not None else ''
+                # Traces written before the change was recorded have no rss_change_mb
+                change = f"{rec['rss_change_mb']:+.1f}" if rec.get('rss_change_mb') is not None else ''
+                peak = f"{rec['peak_rss_mb']:.1f}" if rec['peak_rss_mb'] is not None else ''
+                print(f"{run['script']:<20}{name:<28}{rec['wall_s']:>10.4f}{rec['cpu_s']:>10.4f}"
+                      f"{rows:>12}{rss:>9}{change:>12}{peak:>17}")
+
+
+if os.environ.get(TRACE_ENV):
+    enable(os.environ[TRACE_ENV], os.environ.get(PROFILE_ENV) or None)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        raise SystemExit("usage: python instrument.py TRACE_FILE")
+    summarize(sys.argv[1])
@@ -0,0 +1,186 @@
+"""
+Join of the clean tables on an integer month key.
+
+Every record's month is year*12 + month - 1 (an int64), so the join does not
+compare year, month and date column by column. The store writes the tables
+sorted on (year, month), i.e. on the key; join() checks that in one pass and
+only sorts a side that is out of order.
+
+- right side with one row per month (one station's weather, the total
+  passengers): direct indexing, an array over the key range holds the row
+  of every month and each left row looks its month up
+- several rows per month on both sides (stations x nationalities): merge of
+  the sorted key runs, every left row is paired with the run of its key
+
+The rows come out in the order pd.merge(left, right, on=['year', 'month',
+'date']) gives them. The months that only one side has are reported in
+result.attrs['only_left'] and result.attrs['only_right'] as (year, month)
+lists.
+
+Usage:
+    python join.py                                  # passengers_clean x weather_clean, missing months
+    python join.py passengers_by_nationality weather_clean
+    python join.py --benchmark --stations 200 --nationalities 50
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# Columns the key stands for; the right side's copies are dropped
+KEY_COLUMNS = ['year', 'month', 'date']
+
+
+def month_key(year, month):
+    """year*12 + month - 1 for scalars or arrays, as int64."""
+    return np.asarray(year, dtype=np.int64) * 12 + np.asarray(month, dtype=np.int64) - 1
+
+
+def key_month(key):
+    # month key -> (year, month)
+    return int(key) // 12, int(key) % 12 + 1
+
+
+def sorted_keys(df):
+    """(keys in ascending order, row order or None when the table is already sorted)."""
+    key = month_key(df['year'].to_numpy(), df['month'].to_numpy())
+    if len(key) > 1 and (key[1:] < key[:-1]).any():
+        order = np.argsort(key, kind='stable')
+        return key[order], order
+    return key, None
+
+
+def match(left_keys, right_keys):
+    """Row pairs (left positions, right positions) with equal keys; both key arrays sorted."""
+    if len(left_keys) == 0 or len(right_keys) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    if (right_keys[1:] > right_keys[:-1]).all():
+        # One right row per month: direct indexing over the key range
+        low = min(left_keys[0], right_keys[0])
+        slots = np.full(max(left_keys[-1], right_keys[-1]) - low + 1, -1, dtype=np.int64)
+        slots[right_keys - low] = np.arange(len(right_keys))
+        hit = slots[left_keys - low]
+        left_pos = np.flatnonzero(hit >= 0)
+        return left_pos, hit[left_pos]
+
+    # Runs of equal keys: each left row gets the whole run of its key on the right
+    start = np.searchsorted(right_keys, left_keys, side='left')
+    counts = np.searchsorted(right_keys, left_keys, side='right') - start
+    left_pos = np.repeat(np.arange(len(left_keys)), counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    right_pos = np.repeat(start, counts) + np.arange(len(left_pos)) - first
+    return left_pos, right_pos
+
+
+def join(left, right):
+    """
+    Inner join of left and right on the month key.
+
+    The right side's year/month/date columns are dropped, other column
+    names must differ. Months found on one side only are listed in
+    attrs['only_left'] / attrs['only_right'].
+    """
+    right_columns = [c for c in right.columns if c not in KEY_COLUMNS]
+    overlap = set(right_columns) & set(left.columns)
+    if overlap:
+        raise ValueError(f"Columns on both sides of the join: {', '.join(sorted(overlap))}")
+
+    left_keys, left_order = sorted_keys(left)
+    right_keys, right_order = sorted_keys(right)
+    left_pos, right_pos = match(left_keys, right_keys)
+    if left_order is not None:
+        left_pos = left_order[left_pos]
+        # Back to the left table's own row order, like pd.merge
+        regroup = np.argsort(left_pos, kind='stable')
+        left_pos, right_pos = left_pos[regroup], right_pos[regroup]
+    if right_order is not None:
+        right_pos = right_order[right_pos]
+
+    result = pd.concat([left.iloc[left_pos].reset_index(drop=True),
+                        right[right_columns].iloc[right_pos].reset_index(drop=True)], axis=1)
+
+    left_months, right_months = np.unique(left_keys), np.unique(right_keys)
+    result.attrs['only_left'] = [key_month(k) for k in np.setdiff1d(left_months, right_months)]
+    result.attrs['only_right'] = [key_month(k) for k in np.setdiff1d(right_months, left_months)]
+    return result
+
+
+def describe_missing(df, left_name='passengers', right_name='weather'):
+    """Lines for the months that only one side of a join has (empty when both have every month)."""
+    lines = []
+    for attr, name, other in (('only_left', left_name, right_name), ('only_right', right_name, left_name)):
+        months = df.attrs.get(attr, [])
+        if months:
+            shown = ', '.join(f"{y}-{m:02d}" for y, m in months[:12]) + (' ...' if len(months) > 12 else '')
+            lines.append(f"{len(months)} months with {name} but no {other}: {shown}")
+    return lines
+
+
+# ---------- command line ----------
+
+def benchmark(n_stations, n_nationalities, repeat=3):
+    # Synthetic weather[station, month] and passengers[nationality, month] on 2002-2025
+    keys = np.arange(month_key(2002, 1), month_key(2025, 12) + 1)
+    rng = np.random.default_rng(0)
+
+    def table(entity, count, column):
+        key = np.tile(keys, count)
+        df = pd.DataFrame({'year': key // 12, 'month': key % 12 + 1, entity: np.repeat(np.arange(count), len(keys)),
+                           column: rng.normal(size=len(key))})
+        df['date'] = pd.to_datetime(df[['year', 'month']].assign(day=1))
+        return df.sort_values(['year', 'month'], kind='stable').reset_index(drop=True)
+
+    weather = table('station', n_stations, 'mean_temp')
+    passengers = table('nationality', n_nationalities, 'passengers')
+
+    def best(func):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    cases = [('one station x one nationality', passengers[passengers['nationality'] == 0],
+              weather[weather['station'] == 0].drop(columns='station')),
+             (f'{n_nationalities} nationalities x one station', passengers,
+              weather[weather['station'] == 0].drop(columns='station')),
+             (f'{n_nationalities} nationalities x {n_stations} stations', passengers, weather)]
+    print(f"{'join':<40}{'rows':>12}{'pd.merge s':>12}{'key join s':>12}")
+    for name, left, right in cases:
+        merge_s, expected = best(lambda: pd.merge(left, right, on=KEY_COLUMNS))
+        join_s, result = best(lambda: join(left, right))
+        pd.testing.assert_frame_equal(result, expected[result.columns])
+        print(f"{name:<40}{len(result):>12,}{merge_s:>12.4f}{join_s:>12.4f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Join two clean tables on the month key and report missing months")
+    parser.add_argument('left', nargs='?', default='passengers_clean')
+    parser.add_argument('right', nargs='?', default='weather_clean')
+    parser.add_argument('--benchmark', action='store_true', help="pd.merge vs the key join on synthetic tables")
+    parser.add_argument('--stations', type=int, default=100)
+    parser.add_argument('--nationalities', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        benchmark(args.stations, args.nationalities)
+        return
+
+    import store
+    left, right = store.load_table(args.left), store.load_table(args.right)
+    start = time.perf_counter()
+    df = join(left, right)
+    elapsed = time.perf_counter() - start
+    print(f"{args.left} ({len(left)} rows) x {args.right} ({len(right)} rows): "
+          f"{len(df)} joined rows in {elapsed * 1000:.2f} ms")
+    lines = describe_missing(df, args.left, args.right)
+    for line in lines or ["Both tables have the same months"]:
+        print("  " + line)
+
+
+if __name__ == '__main__':
+    main()
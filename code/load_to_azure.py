@@ -1,42 +1,55 @@
 """
 Load CSV data into Azure SQL Database
-- Creates tables
-- Loads data from CSV files
-- Verifies checksums (row count, sums)
+- Creates tables (or, with --incremental, keeps the existing ones)
+- Loads data from CSV files (row by row, batched or as table-valued parameters)
+- With --incremental: stages the rows and merges them on (year, month)
+- With --delta: the same for only the new/revised months found by delta.py
+- With --pipeline: a reader thread parses and converts the next batches
+  while the current one is being sent (bounded queue, see prefetched_batches)
+- Verifies checksums per year/month (row count, sums, row hash, see verify.py)
+
+Usage:
+    python load_to_azure.py                      # batched executemany (default)
+    python load_to_azure.py --mode row           # one round-trip per row
+    python load_to_azure.py --mode tvp           # one round-trip per batch (SQL Server)
+    python load_to_azure.py --batch-size 5000
+    python load_to_azure.py --sqlite test.db     # local SQLite stand-in
+    python load_to_azure.py --source parquet     # read the Parquet store (store.py)
+    python load_to_azure.py --incremental        # upsert new/changed months only
+    python load_to_azure.py --delta              # upsert only the rows found by delta.py
+    python load_to_azure.py --pipeline           # parse the next batches while one is being sent
+    python load_to_azure.py --benchmark --latency 0.01   # serial vs pipelined on a SQLite stand-in
 """
 
-import pyodbc
+import argparse
 import csv
 import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-SERVER = os.getenv('db_server')
-DATABASE = os.getenv('db_name')
-USERNAME = os.getenv('db_username')
-PASSWORD = os.getenv('db_password')
-
-# Connection string for Azure SQL
-conn_str = (
-    f"DRIVER={{ODBC Driver 18 for SQL Server}};"
-    f"SERVER={SERVER};"
-    f"DATABASE={DATABASE};"
-    f"UID={USERNAME};"
-    f"PWD={PASSWORD};"
-    f"Encrypt=yes;"
-    f"TrustServerCertificate=no;"
-)
-
-# Expected checksums (calculated from CSV before loading)
-EXPECTED = {
-    'passengers_rows': 132,
-    'passengers_sum': 14790715,
-    'weather_rows': 132,
-    'weather_temp_sum': 707.50,
-    'weather_precip_sum': 10233.90,
-}
+import queue
+import threading
+import time
+from itertools import islice
+
+
+def azure_settings():
+    """(server, database, user, password) from the environment or the .env file."""
+    # dotenv is only needed for Azure, the SQLite and --help paths never import it
+    from dotenv import load_dotenv
+    load_dotenv()
+    return os.getenv('db_server'), os.getenv('db_name'), os.getenv('db_username'), os.getenv('db_password')
+
+
+def connection_string(server, database, username, password):
+    # Connection string for Azure SQL
+    return (
+        f"DRIVER={{ODBC Driver 18 for SQL Server}};"
+        f"SERVER={server};"
+        f"DATABASE={database};"
+        f"UID={username};"
+        f"PWD={password};"
+        f"Encrypt=yes;"
+        f"TrustServerCertificate=no;"
+    )
+
 
 # SQL statements
 SQL_DROP_TABLES = """
@@ -78,90 +91,115 @@ INSERT INTO Weather (year, month, date, mean_temp, max_temp, min_temp, precipita
 VALUES (?, ?, ?, ?, ?, ?, ?);
 """
 
-SQL_VERIFY = """
--- Verification queries
-SELECT
-    'Passengers' as table_name,
-    COUNT(*) as row_count,
-    SUM(passengers) as sum_passengers,
-    NULL as sum_mean_temp,
-    NULL as sum_precipitation
-FROM Passengers
-UNION ALL
-SELECT
-    'Weather' as table_name,
-    COUNT(*) as row_count,
-    NULL as sum_passengers,
-    ROUND(SUM(mean_temp), 2) as sum_mean_temp,
-    ROUND(SUM(precipitation), 2) as sum_precipitation
-FROM Weather;
+# Table types for the table-valued parameter path (--mode tvp)
+SQL_CREATE_TVP_TYPES = """
+IF TYPE_ID('PassengerRows') IS NULL
+    CREATE TYPE PassengerRows AS TABLE (
+        year INT, month INT, date DATE, passengers INT
+    );
+IF TYPE_ID('WeatherRows') IS NULL
+    CREATE TYPE WeatherRows AS TABLE (
+        year INT, month INT, date DATE,
+        mean_temp FLOAT, max_temp FLOAT, min_temp FLOAT, precipitation FLOAT
+    );
 """
 
+SQL_INSERT_PASSENGER_TVP = """
+INSERT INTO Passengers (year, month, date, passengers)
+SELECT year, month, date, passengers FROM ?;
+"""
 
-def main():
-    print("=" * 60)
-    print("AZURE SQL DATA LOADER")
-    print("=" * 60)
+SQL_INSERT_WEATHER_TVP = """
+INSERT INTO Weather (year, month, date, mean_temp, max_temp, min_temp, precipitation)
+SELECT year, month, date, mean_temp, max_temp, min_temp, precipitation FROM ?;
+"""
 
-    # Show connection info
-    print(f"\nConnecting to: {SERVER}")
-    print(f"Database: {DATABASE}")
-    print(f"User: {USERNAME}")
+# SQLite versions of the DDL (local stand-in for testing, same insert/verify SQL)
+SQLITE_DROP_TABLES = """
+DROP TABLE IF EXISTS Passengers;
+DROP TABLE IF EXISTS Weather;
+"""
 
-    # Connect
-    print("\n[1/5] Connecting to Azure SQL...")
-    conn = pyodbc.connect(conn_str)
-    cursor = conn.cursor()
-    print("Connected!")
+SQLITE_CREATE_PASSENGERS = """
+CREATE TABLE Passengers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    year INT NOT NULL,
+    month INT NOT NULL,
+    date DATE NOT NULL,
+    passengers INT NOT NULL
+);
+"""
 
-    # Drop existing tables
-    print("\n[2/5] Dropping existing tables (if any)...")
-    print("-" * 40)
-    print(SQL_DROP_TABLES)
-    cursor.execute(SQL_DROP_TABLES)
-    conn.commit()
-    print("Done!")
+SQLITE_CREATE_WEATHER = """
+CREATE TABLE Weather (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    year INT NOT NULL,
+    month INT NOT NULL,
+    date DATE NOT NULL,
+    mean_temp FLOAT,
+    max_temp FLOAT,
+    min_temp FLOAT,
+    precipitation FLOAT
+);
+"""
 
-    # Create tables
-    print("\n[3/5] Creating tables...")
-    print("-" * 40)
-    print(SQL_CREATE_PASSENGERS)
-    cursor.execute(SQL_CREATE_PASSENGERS)
-    print(SQL_CREATE_WEATHER)
-    cursor.execute(SQL_CREATE_WEATHER)
-    conn.commit()
-    print("Tables created!")
+# Unique (year, month) keys, one row per month and table
+SQL_CREATE_KEYS = """
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_Passengers_year_month')
+    CREATE UNIQUE INDEX UX_Passengers_year_month ON Passengers (year, month);
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_Weather_year_month')
+    CREATE UNIQUE INDEX UX_Weather_year_month ON Weather (year, month);
+"""
 
-    # Load Passengers data
-    print("\n[4/5] Loading data from CSV files...")
-    print("-" * 40)
+SQLITE_CREATE_KEYS = """
+CREATE UNIQUE INDEX IF NOT EXISTS UX_Passengers_year_month ON Passengers (year, month);
+CREATE UNIQUE INDEX IF NOT EXISTS UX_Weather_year_month ON Weather (year, month);
+"""
+
+# Loaded columns per table (key columns first) and their staging types
+TABLE_COLUMNS = {
+    'Passengers': [('year', 'INT'), ('month', 'INT'), ('date', 'DATE'), ('passengers', 'INT')],
+    'Weather': [('year', 'INT'), ('month', 'INT'), ('date', 'DATE'), ('mean_temp', 'FLOAT'),
+                ('max_temp', 'FLOAT'), ('min_temp', 'FLOAT'), ('precipitation', 'FLOAT')],
+}
+
+TABLE_KEYS = {
+    'Passengers': ['year', 'month'],
+    'Weather': ['year', 'month'],
+}
+
+LOAD_MODES = ['row', 'batch', 'tvp']
+DEFAULT_BATCH_SIZE = 1000
+# Batches the --pipeline reader may parse ahead of the sender
+DEFAULT_QUEUE_SIZE = 4
 
-    csv_dir = os.path.join(os.path.dirname(__file__), '..', '2026csv')
 
-    # Load passengers
-    passengers_file = os.path.join(csv_dir, 'passengers_clean.csv')
-    print(f"Loading: {passengers_file}")
-    with open(passengers_file, 'r') as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-        for row in rows:
-            cursor.execute(SQL_INSERT_PASSENGER,
+def connect(sqlite_path=None):
+    """Open a connection to Azure SQL, or to a local SQLite file if given."""
+    if sqlite_path:
+        import sqlite3
+        return sqlite3.connect(sqlite_path)
+    import pyodbc
+    return pyodbc.connect(connection_string(*azure_settings()))
+
+
+def read_passenger_rows(path):
+    """Yield (year, month, date, passengers) tuples from passengers_clean.csv."""
+    with open(path, 'r') as f:
+        for row in csv.DictReader(f):
+            yield (
                 int(row['year']),
                 int(row['month']),
                 row['date'],
                 int(row['passengers'])
             )
-    conn.commit()
-    print(f"  Inserted {len(rows)} rows into Passengers")
-
-    # Load weather
-    weather_file = os.path.join(csv_dir, 'weather_clean.csv')
-    print(f"Loading: {weather_file}")
-    with open(weather_file, 'r') as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-        for row in rows:
-            cursor.execute(SQL_INSERT_WEATHER,
+
+
+def read_weather_rows(path):
+    """Yield (year, month, date, mean_temp, max_temp, min_temp, precipitation) tuples."""
+    with open(path, 'r') as f:
+        for row in csv.DictReader(f):
+            yield (
                 int(row['year']),
                 int(row['month']),
                 row['date'],
@@ -170,66 +208,501 @@ def main():
                 float(row['min_temp']),
                 float(row['precipitation'])
             )
+
+
+def read_store_rows(name, columns):
+    """Yield tuples of columns from the Parquet store, with dates as 'YYYY-MM-DD'."""
+    import store
+    df = store.load_table(name, columns)
+    df['date'] = df['date'].dt.strftime('%Y-%m-%d')
+    return df.itertuples(index=False, name=None)
+
+
+# Per table: (clean data name, CSV row reader, insert SQL, TVP insert SQL, TVP type)
+TABLE_SOURCES = {
+    'Passengers': ('passengers_clean', read_passenger_rows,
+                   SQL_INSERT_PASSENGER, SQL_INSERT_PASSENGER_TVP, 'PassengerRows'),
+    'Weather': ('weather_clean', read_weather_rows,
+                SQL_INSERT_WEATHER, SQL_INSERT_WEATHER_TVP, 'WeatherRows'),
+}
+
+
+def read_rows(table, source='csv', csv_dir=None):
+    """Row tuples for table in TABLE_COLUMNS order, from the clean CSV or the Parquet store."""
+    name, csv_reader = TABLE_SOURCES[table][:2]
+    if source == 'parquet':
+        print(f"Loading: {name} (Parquet store)")
+        return read_store_rows(name, [column for column, _ in TABLE_COLUMNS[table]])
+    path = os.path.join(csv_dir, name + '.csv')
+    print(f"Loading: {path}")
+    return csv_reader(path)
+
+
+def batched(rows, batch_size):
+    """Split an iterable of rows into lists of at most batch_size rows."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+# End of the rows, put on the queue by the reader thread
+_DONE = object()
+
+
+def prefetched_batches(rows, batch_size, depth=DEFAULT_QUEUE_SIZE):
+    """
+    batched(rows, batch_size), with the rows read by a background thread.
+
+    The reader thread parses, converts (and fingerprints) the next batches
+    while the caller is sending the current one. The queue holds at most
+    depth batches: when the database is the slow side the reader blocks,
+    so memory stays bounded. An error in the reader is raised in the caller,
+    and a caller that stops early stops the reader.
+    """
+    ready = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read():
+        try:
+            for batch in batched(rows, batch_size):
+                if not put(batch):
+                    return
+            put(_DONE)
+        except Exception as exc:
+            put(exc)
+
+    reader = threading.Thread(target=read, name='reader', daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = ready.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        reader.join()
+
+
+def insert_rows(conn, cursor, sql, rows, mode='batch', batch_size=DEFAULT_BATCH_SIZE,
+                tvp_sql=None, tvp_type=None, prefetch=0):
+    """
+    Insert rows using one of LOAD_MODES and commit after each batch.
+
+    row   - cursor.execute per row (one round-trip per row)
+    batch - cursor.executemany per batch, with fast_executemany on pyodbc
+    tvp   - one INSERT ... SELECT FROM <table-valued parameter> per batch
+    With prefetch > 0 the rows are read by prefetched_batches(), up to
+    prefetch batches ahead. Returns the number of rows inserted.
+    """
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown load mode: {mode}")
+    if mode == 'tvp' and (tvp_sql is None or tvp_type is None):
+        raise ValueError("tvp mode needs tvp_sql and tvp_type")
+
+    if mode == 'batch' and hasattr(cursor, 'fast_executemany'):
+        # pyodbc sends the whole parameter array in one round-trip
+        cursor.fast_executemany = True
+
+    batches = prefetched_batches(rows, batch_size, prefetch) if prefetch else batched(rows, batch_size)
+    count = 0
+    try:
+        for batch in batches:
+            if mode == 'row':
+                for row in batch:
+                    cursor.execute(sql, row)
+            elif mode == 'batch':
+                cursor.executemany(sql, batch)
+            else:
+                # pyodbc: first element names the table type, the rest are the rows
+                cursor.execute(tvp_sql, [[tvp_type, 'dbo'] + batch])
+            conn.commit()
+            count += len(batch)
+    finally:
+        # Stops the reader thread now if a send failed (the traceback keeps the generator alive)
+        batches.close()
+    return count
+
+
+def upsert_sql(table, sqlite=False):
+    """
+    SQL for an incremental load of table through its staging table.
+
+    Returns (create stage, insert into stage, count, apply, drop stage).
+    The count query returns (staged rows, new rows, changed rows); a row is
+    changed when any non-key column differs (NULL-safe, via EXCEPT).
+    """
+    columns = [name for name, _ in TABLE_COLUMNS[table]]
+    key = TABLE_KEYS[table]
+    values = [name for name in columns if name not in key]
+    stage = table + 'Stage'
+
+    col_defs = ', '.join(f"{name} {sql_type}" for name, sql_type in TABLE_COLUMNS[table])
+    col_list = ', '.join(columns)
+    join_on = ' AND '.join(f"t.{name} = s.{name}" for name in key)
+    changed = (f"EXISTS (SELECT {', '.join('s.' + v for v in values)} "
+               f"EXCEPT SELECT {', '.join('t.' + v for v in values)})")
+
+    if sqlite:
+        create = f"DROP TABLE IF EXISTS {stage}; CREATE TABLE {stage} ({col_defs});"
+        drop = f"DROP TABLE IF EXISTS {stage};"
+    else:
+        create = (f"IF OBJECT_ID('{stage}', 'U') IS NOT NULL DROP TABLE {stage};\n"
+                  f"CREATE TABLE {stage} ({col_defs});")
+        drop = f"IF OBJECT_ID('{stage}', 'U') IS NOT NULL DROP TABLE {stage};"
+
+    insert = f"INSERT INTO {stage} ({col_list}) VALUES ({', '.join('?' * len(columns))});"
+
+    count = f"""
+SELECT
+    COUNT(*),
+    COALESCE(SUM(CASE WHEN t.{key[0]} IS NULL THEN 1 ELSE 0 END), 0),
+    COALESCE(SUM(CASE WHEN t.{key[0]} IS NOT NULL AND {changed} THEN 1 ELSE 0 END), 0)
+FROM {stage} s
+LEFT JOIN {table} t ON {join_on};
+"""
+
+    if sqlite:
+        apply = f"""
+INSERT INTO {table} ({col_list})
+SELECT {col_list} FROM {stage} WHERE true
+ON CONFLICT ({', '.join(key)}) DO UPDATE SET
+    {', '.join(f"{v} = excluded.{v}" for v in values)}
+WHERE {' OR '.join(f"{table}.{v} IS NOT excluded.{v}" for v in values)};
+"""
+    else:
+        apply = f"""
+MERGE {table} AS t
+USING {stage} AS s ON {join_on}
+WHEN MATCHED AND {changed} THEN
+    UPDATE SET {', '.join(f"t.{v} = s.{v}" for v in values)}
+WHEN NOT MATCHED BY TARGET THEN
+    INSERT ({col_list}) VALUES ({', '.join('s.' + c for c in columns)});
+"""
+    return create, insert, count, apply, drop
+
+
+def upsert_rows(conn, cursor, table, rows, sqlite=False, batch_size=DEFAULT_BATCH_SIZE, prefetch=0):
+    """
+    Stage rows and merge them into table on its (year, month) key.
+
+    Only new months are inserted and only months whose values changed are
+    updated, so readers never see an empty table. The count and the merge run
+    in one transaction. Returns (inserted, updated, unchanged).
+    """
+    create, insert, count, apply, drop = upsert_sql(table, sqlite)
+
+    if sqlite:
+        cursor.executescript(create)
+    else:
+        cursor.execute(create)
+    insert_rows(conn, cursor, insert, rows, mode='batch', batch_size=batch_size, prefetch=prefetch)
+
+    cursor.execute(count)
+    staged, inserted, updated = cursor.fetchone()
+    cursor.execute(apply)
+    conn.commit()
+
+    cursor.execute(drop)
+    conn.commit()
+    return inserted, updated, staged - inserted - updated
+
+
+def create_tables(conn, cursor, sqlite=False, keep_existing=False, tvp=False):
+    """Create Passengers and Weather with their unique keys; keep_existing skips tables that exist."""
+    if sqlite:
+        create_passengers = SQLITE_CREATE_PASSENGERS
+        create_weather = SQLITE_CREATE_WEATHER
+        if keep_existing:
+            create_passengers = create_passengers.replace('CREATE TABLE', 'CREATE TABLE IF NOT EXISTS')
+            create_weather = create_weather.replace('CREATE TABLE', 'CREATE TABLE IF NOT EXISTS')
+        create_keys = SQLITE_CREATE_KEYS
+    else:
+        create_passengers = SQL_CREATE_PASSENGERS
+        create_weather = SQL_CREATE_WEATHER
+        if keep_existing:
+            create_passengers = "IF OBJECT_ID('Passengers', 'U') IS NULL" + create_passengers
+            create_weather = "IF OBJECT_ID('Weather', 'U') IS NULL" + create_weather
+        create_keys = SQL_CREATE_KEYS
+
+    print(create_passengers)
+    cursor.execute(create_passengers)
+    print(create_weather)
+    cursor.execute(create_weather)
+    print(create_keys)
+    if sqlite:
+        cursor.executescript(create_keys)
+    else:
+        cursor.execute(create_keys)
+    if tvp:
+        print(SQL_CREATE_TVP_TYPES)
+        cursor.execute(SQL_CREATE_TVP_TYPES)
     conn.commit()
-    print(f"  Inserted {len(rows)} rows into Weather")
+
+
+def write_scaled_csv(src, dst, scale):
+    # scale copies of a clean CSV, copy k shifted by k times the year span so (year, month) stays unique
+    with open(src, 'r') as f:
+        rows = list(csv.DictReader(f))
+    years = [int(row['year']) for row in rows]
+    span = max(years) - min(years) + 1
+    if max(years) + (scale - 1) * span > 9999:
+        raise SystemExit(f"--scale {scale} moves the dates past year 9999")
+    with open(dst, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        for k in range(scale):
+            for row in rows:
+                year = int(row['year']) + k * span
+                writer.writerow(dict(row, year=year, date=f"{year:04d}" + row['date'][4:]))
+    return len(rows) * scale
+
+
+def benchmark(csv_dir, scale=100, latency=0.01, batch_size=DEFAULT_BATCH_SIZE, queue_size=DEFAULT_QUEUE_SIZE):
+    """
+    Serial vs pipelined insert of scaled copies of the clean tables.
+
+    The database is a SQLite file behind parallel_load.LatencyConnection, so
+    every executemany/commit costs latency seconds like a round-trip to Azure.
+    Both loaders parse, convert and fingerprint the rows the same way; the
+    loaded tables are checked against the source fingerprints.
+    """
+    import tempfile
+    import verify
+    from parallel_load import LatencyConnection
+
+    with tempfile.TemporaryDirectory() as tmp:
+        counts = {}
+        for table, (name, *_) in TABLE_SOURCES.items():
+            counts[table] = write_scaled_csv(os.path.join(csv_dir, name + '.csv'), os.path.join(tmp, name + '.csv'),
+                                             scale)
+        batches = sum(-(-count // batch_size) for count in counts.values())
+        print(f"Benchmark: {sum(counts.values()):,} rows in {batches} batches of {batch_size}, "
+              f"{latency * 1000:.0f} ms per round-trip (scale {scale}x)")
+
+        def from_csv(table):
+            name, reader = TABLE_SOURCES[table][:2]
+            return reader(os.path.join(tmp, name + '.csv'))
+
+        # Reading alone and sending alone (rows parsed beforehand) bound what overlapping can reach
+        start = time.perf_counter()
+        checksums = {table: ({}, {}) for table in TABLE_SOURCES}
+        parsed = {table: list(verify.fingerprinted(table, from_csv(table), *checksums[table]))
+                  for table in TABLE_SOURCES}
+        read_s = time.perf_counter() - start
+
+        def load(label, prefetch, rows_for):
+            # One transaction per batch, committed by insert_rows() like on Azure
+            conn = LatencyConnection(os.path.join(tmp, label + '.db'), latency, autocommit=False)
+            cursor = conn.cursor()
+            cursor.execute(SQLITE_CREATE_PASSENGERS)
+            cursor.execute(SQLITE_CREATE_WEATHER)
+            cursor.executescript(SQLITE_CREATE_KEYS)
+            start = time.perf_counter()
+            for table, (_, _, insert_sql, _, _) in TABLE_SOURCES.items():
+                insert_rows(conn, cursor, insert_sql, rows_for(table), batch_size=batch_size, prefetch=prefetch)
+            elapsed = time.perf_counter() - start
+            for table, (src_years, _) in checksums.items():
+                if verify.differences(src_years, verify.db_fingerprints(cursor, table, sqlite=True)):
+                    raise SystemExit(f"{label}: {table} does not match its source")
+            conn.close()
+            return elapsed
+
+        def parse(table):
+            # what the loader does per row: parse, convert and fingerprint
+            return verify.fingerprinted(table, from_csv(table), {}, {})
+
+        send_s = load('send', 0, lambda table: iter(parsed[table]))
+        serial_s = load('serial', 0, parse)
+        pipelined_s = load('pipelined', queue_size, parse)
+
+    print(f"  read + convert only:  {read_s:8.3f} s  (parse, convert, fingerprint)")
+    print(f"  send only:            {send_s:8.3f} s")
+    print(f"  serial loader:        {serial_s:8.3f} s")
+    print(f"  pipelined loader:     {pipelined_s:8.3f} s  (queue of {queue_size} batches)")
+    print(f"  speedup:              {serial_s / pipelined_s:8.2f}x")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load the clean CSV files into Azure SQL")
+    parser.add_argument('--mode', choices=LOAD_MODES, default='batch',
+                        help="insert strategy (default: batch)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"rows per round-trip (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--sqlite', metavar='PATH',
+                        help="load into a local SQLite file instead of Azure SQL")
+    parser.add_argument('--incremental', action='store_true',
+                        help="keep the tables and upsert new/changed months instead of reloading")
+    parser.add_argument('--source', choices=['csv', 'parquet'], default='csv',
+                        help="read the clean CSV files or the Parquet store (default: csv)")
+    parser.add_argument('--csv-dir', default=os.path.join(os.path.dirname(__file__), '..', '2026csv'),
+                        help="directory with passengers_clean.csv and weather_clean.csv")
+    parser.add_argument('--delta', action='store_true',
+                        help="upsert the delta of the last delta.py run and verify only its months")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="parse the next batches in a reader thread while the current one is sent")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"batches the --pipeline reader may run ahead (default: {DEFAULT_QUEUE_SIZE})")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="compare the serial and the pipelined loader on a SQLite stand-in with --latency")
+    parser.add_argument('--latency', type=float, default=0.01,
+                        help="seconds per round-trip in --benchmark (default: 0.01)")
+    parser.add_argument('--scale', type=int, default=100,
+                        help="copies of each clean table in --benchmark (default: 100)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    import instrument
+    import verify
+    args = parse_args(argv)
+    if args.benchmark:
+        benchmark(args.csv_dir, args.scale, args.latency, args.batch_size, args.queue_size)
+        return
+    prefetch = args.queue_size if args.pipeline else 0
+    manifest = None
+    if args.delta:
+        import delta
+        manifest = delta.load_manifest()
+        if manifest.get('consumed'):
+            print("Note: this delta was already loaded, loading it again")
+        args.incremental, args.source, args.csv_dir = True, 'csv', delta.DELTA_DIR
+    if args.mode == 'tvp' and args.sqlite:
+        raise SystemExit("tvp mode needs SQL Server, use --mode batch with --sqlite")
+    if args.mode != 'batch' and args.incremental:
+        raise SystemExit("--incremental stages rows with --mode batch")
+
+    print("=" * 60)
+    print("AZURE SQL DATA LOADER")
+    print("=" * 60)
+
+    # Show connection info
+    if args.sqlite:
+        print(f"\nConnecting to SQLite: {args.sqlite}")
+    else:
+        server, database, username, _ = azure_settings()
+        print(f"\nConnecting to: {server}")
+        print(f"Database: {database}")
+        print(f"User: {username}")
+    print(f"Load mode: {args.mode} (batch size {args.batch_size})"
+          + (", incremental upsert" if args.incremental else "")
+          + (f", pipelined (queue of {prefetch} batches)" if prefetch else ""))
+
+    # Connect
+    print("\n[1/5] Connecting to " + ("SQLite..." if args.sqlite else "Azure SQL..."))
+    with instrument.stage('connect') as step:
+        conn = connect(args.sqlite)
+        cursor = conn.cursor()
+    print(f"Connected! ({step.wall:.2f} s)")
+
+    # Drop existing tables
+    print("\n[2/5] Dropping existing tables (if any)...")
+    print("-" * 40)
+    with instrument.stage('drop') as step:
+        if args.incremental:
+            print("Skipped, incremental load keeps the existing tables")
+        elif args.sqlite:
+            print(SQLITE_DROP_TABLES)
+            cursor.executescript(SQLITE_DROP_TABLES)
+        else:
+            print(SQL_DROP_TABLES)
+            cursor.execute(SQL_DROP_TABLES)
+        conn.commit()
+    print(f"Done! ({step.wall:.2f} s)")
+
+    # Create tables
+    print("\n[3/5] Creating tables...")
+    print("-" * 40)
+    with instrument.stage('create') as step:
+        create_tables(conn, cursor, sqlite=bool(args.sqlite), keep_existing=args.incremental,
+                      tvp=args.mode == 'tvp')
+    print(f"Tables created! ({step.wall:.2f} s)")
+
+    # Load Passengers data
+    print("\n[4/5] Loading data from CSV files...")
+    print("-" * 40)
+
+    csv_dir = args.csv_dir
+    timings = []
+
+    # Source checksums are computed while the rows stream into the database
+    source_checksums = {}
+    for table in ['Passengers', 'Weather']:
+        with instrument.stage('insert ' + table) as step:
+            src_years, src_months = {}, {}
+            source_checksums[table] = (src_years, src_months)
+            rows = verify.fingerprinted(table, read_rows(table, args.source, csv_dir), src_years, src_months)
+            if args.incremental:
+                inserted, updated, unchanged = upsert_rows(conn, cursor, table, rows, sqlite=bool(args.sqlite),
+                                                           batch_size=args.batch_size, prefetch=prefetch)
+                count = inserted + updated + unchanged
+                print(f"  {table}: {inserted} inserted, {updated} updated, {unchanged} unchanged")
+                if manifest is not None:
+                    removed = manifest['tables'][TABLE_SOURCES[table][0]]['removed']
+                    if removed:
+                        cursor.executemany(f"DELETE FROM {table} WHERE year = ? AND month = ?", removed)
+                        conn.commit()
+                        print(f"  {table}: {len(removed)} removed months deleted")
+            else:
+                _, _, insert_sql, tvp_sql, tvp_type = TABLE_SOURCES[table]
+                count = insert_rows(conn, cursor, insert_sql, rows,
+                                    mode=args.mode, batch_size=args.batch_size,
+                                    tvp_sql=tvp_sql, tvp_type=tvp_type, prefetch=prefetch)
+                print(f"  Inserted {count} rows into {table}")
+            step.rows = count
+        timings.append((table, count, step.wall))
 
     # Verify checksums
     print("\n[5/5] Verifying checksums...")
     print("-" * 40)
-    print("SQL Query:")
-    print(SQL_VERIFY)
-
-    cursor.execute(SQL_VERIFY)
-    results = cursor.fetchall()
+    print("Per " + ("delta month" if manifest is not None else "year")
+          + ": row count, column sums and row hash (one GROUP BY query per table)")
 
     print("\n" + "=" * 60)
     print("VERIFICATION RESULTS")
     print("=" * 60)
 
     all_passed = True
-
-    for row in results:
-        table_name = row[0]
-        row_count = row[1]
-
-        if table_name == 'Passengers':
-            sum_passengers = row[2]
-            print(f"\n{table_name}:")
-            print(f"  Row count:      {row_count:>10} (expected: {EXPECTED['passengers_rows']})")
-            print(f"  SUM(passengers): {sum_passengers:>10,} (expected: {EXPECTED['passengers_sum']:,})")
-
-            if row_count != EXPECTED['passengers_rows']:
-                print("  ❌ ROW COUNT MISMATCH!")
-                all_passed = False
-            if sum_passengers != EXPECTED['passengers_sum']:
-                print("  ❌ SUM MISMATCH!")
-                all_passed = False
-
-        elif table_name == 'Weather':
-            sum_temp = row[3]
-            sum_precip = row[4]
-            print(f"\n{table_name}:")
-            print(f"  Row count:         {row_count:>10} (expected: {EXPECTED['weather_rows']})")
-            print(f"  SUM(mean_temp):    {sum_temp:>10.2f} (expected: {EXPECTED['weather_temp_sum']:.2f})")
-            print(f"  SUM(precipitation): {sum_precip:>10.2f} (expected: {EXPECTED['weather_precip_sum']:.2f})")
-
-            if row_count != EXPECTED['weather_rows']:
-                print("  ❌ ROW COUNT MISMATCH!")
-                all_passed = False
-            if abs(sum_temp - EXPECTED['weather_temp_sum']) > 0.01:
-                print("  ❌ TEMP SUM MISMATCH!")
-                all_passed = False
-            if abs(sum_precip - EXPECTED['weather_precip_sum']) > 0.01:
-                print("  ❌ PRECIP SUM MISMATCH!")
-                all_passed = False
+    for table in ['Passengers', 'Weather']:
+        src_years, src_months = source_checksums[table]
+        with instrument.stage('verify ' + table):
+            if manifest is not None:
+                removed = manifest['tables'][TABLE_SOURCES[table][0]]['removed']
+                passed = verify.verify_months(cursor, table, src_months, sqlite=bool(args.sqlite), removed=removed)
+            else:
+                passed = verify.verify_table(cursor, table, src_years, src_months, sqlite=bool(args.sqlite))
+            all_passed &= passed
 
     print("\n" + "=" * 60)
     if all_passed:
         print("✓ ALL CHECKSUMS PASSED - Data loaded successfully!")
+        if manifest is not None:
+            # The next delta.py run may now start a new delta
+            delta.mark_consumed()
     else:
         print("✗ SOME CHECKSUMS FAILED - Check the data!")
     print("=" * 60)
 
+    # Load throughput
+    print(f"\nLoad throughput ({args.mode}, batch size {args.batch_size}):")
+    for table_name, count, seconds in timings:
+        rate = count / seconds if seconds > 0 else float('inf')
+        print(f"  {table_name:<12} {count:>8} rows in {seconds:>8.3f} s = {rate:>12,.0f} rows/s")
+
     cursor.close()
     conn.close()
 
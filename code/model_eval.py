@@ -0,0 +1,273 @@
+"""
+Rolling-origin cross-validation of the passenger models.
+
+analasys.py reports R2 on the months the regression was fitted on. Here
+every model is fitted on an expanding window of months and scored on the
+months that follow it:
+
+    fold 1: train 2012 .. 2015   test 2016
+    fold 2: train 2012 .. 2016   test 2017
+    ...
+
+Models:
+    ols              StandardScaler + LinearRegression on the weather (as in analasys.py)
+    ridge            StandardScaler + Ridge on the weather
+    seasonal_mean    training mean of each calendar month
+    seasonal_naive   same month last year, scaled by a fitted log growth rate
+                     with a COVID dummy (for the month and for its year-ago month)
+
+Every (model, fold) fit runs as its own task in a process pool. Fit and
+predict times are recorded per task and reported next to the errors.
+
+Usage:
+    python model_eval.py
+    python model_eval.py --min-train 36 --horizon 6 --jobs 4
+    python model_eval.py --features lag1_mean_temp,sunshine    # features.py columns for ols/ridge
+    python model_eval.py --folds                               # per-fold errors too
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+import join
+import store
+
+WEATHER_VARS = ['mean_temp', 'max_temp', 'min_temp', 'precipitation']
+
+# Months with travel restrictions (inclusive), as year*12 + month - 1
+COVID_START = 2020 * 12 + 3 - 1
+COVID_END = 2021 * 12 + 6 - 1
+
+TOTAL = 'Útlendingar alls'
+
+
+# ---------- data ----------
+
+def month_key(year, month):
+    return year * 12 + month - 1
+
+
+def load_data(features=None):
+    """
+    Monthly frame with passengers, weather, last year's passengers and the COVID dummies.
+
+    Last year's value comes from the full passenger history, so the first
+    analysis year has it too.
+    """
+    passengers = store.load_table('passengers_clean')
+    weather = store.load_table('weather_clean')
+    df = join.join(passengers, weather)
+    df['key'] = month_key(df['year'], df['month'])
+
+    history = store.load_table('passengers_by_nationality')
+    history = history[history['nationality'].astype(str) == TOTAL]
+    last_year = pd.Series(history['passengers'].to_numpy(dtype=float),
+                          index=month_key(history['year'], history['month']).to_numpy() + 12)
+    df['passengers_last_year'] = last_year.reindex(df['key']).to_numpy()
+
+    df['covid'] = df['key'].between(COVID_START, COVID_END).astype(float)
+    df['covid_last_year'] = (df['key'] - 12).between(COVID_START, COVID_END).astype(float)
+
+    if features:
+        table = store.load_table('weather_features').drop(columns=WEATHER_VARS)
+        extra = [c for c in table.columns if c.startswith(tuple(features))]
+        df = pd.merge(df, table[['year', 'month'] + extra], on=['year', 'month'], how='left')
+    return df.sort_values('key').reset_index(drop=True)
+
+
+# ---------- models ----------
+
+class RegressionModel:
+    """Scaled linear model on weather columns; months with missing inputs get the training mean."""
+
+    def __init__(self, estimator, columns):
+        self.estimator = estimator
+        self.columns = columns
+
+    def fit(self, df):
+        train = df.dropna(subset=self.columns)
+        self.pipeline = make_pipeline(StandardScaler(), self.estimator)
+        self.pipeline.fit(train[self.columns].values, train['passengers'].values)
+        self.fallback = df['passengers'].mean()
+        return self
+
+    def predict(self, df):
+        pred = np.full(len(df), self.fallback)
+        ok = df[self.columns].notna().all(axis=1).to_numpy()
+        if ok.any():
+            pred[ok] = self.pipeline.predict(df.loc[ok, self.columns].values)
+        return pred
+
+
+class SeasonalMean:
+    """Mean of each calendar month in the training window."""
+
+    def fit(self, df):
+        self.by_month = df.groupby('month')['passengers'].mean()
+        self.fallback = df['passengers'].mean()
+        return self
+
+    def predict(self, df):
+        return df['month'].map(self.by_month).fillna(self.fallback).to_numpy()
+
+
+class SeasonalNaive:
+    """
+    Same month last year times exp(growth).
+
+    log(y / y_last_year) = b0 + b1*covid + b2*covid_last_year is fitted by
+    least squares; a dummy that is all zero in the training window gets no
+    coefficient, so before 2020 this is plain seasonal-naive with drift.
+    """
+
+    dummies = ['covid', 'covid_last_year']
+
+    def fit(self, df):
+        train = df.dropna(subset=['passengers_last_year'])
+        self.used = [d for d in self.dummies if train[d].any()]
+        X = np.column_stack([np.ones(len(train))] + [train[d].values for d in self.used])
+        target = np.log(train['passengers'].values / train['passengers_last_year'].values)
+        self.coef = np.linalg.lstsq(X, target, rcond=None)[0]
+        self.seasonal = SeasonalMean().fit(df)
+        return self
+
+    def predict(self, df):
+        X = np.column_stack([np.ones(len(df))] + [df[d].values for d in self.used])
+        pred = df['passengers_last_year'].values * np.exp(X @ self.coef)
+        missing = np.isnan(pred)
+        pred[missing] = self.seasonal.predict(df[missing])
+        return pred
+
+
+def make_model(name, columns):
+    if name == 'ols':
+        return RegressionModel(LinearRegression(), columns)
+    if name == 'ridge':
+        return RegressionModel(Ridge(alpha=1.0), columns)
+    if name == 'seasonal_mean':
+        return SeasonalMean()
+    if name == 'seasonal_naive':
+        return SeasonalNaive()
+    raise ValueError(f"Unknown model: {name}")
+
+
+MODELS = ['ols', 'ridge', 'seasonal_mean', 'seasonal_naive']
+
+
+# ---------- cross-validation ----------
+
+def rolling_origin(n, min_train=48, horizon=12, step=None):
+    """[(train indices, test indices)] for an expanding window over n ordered months."""
+    step = step or horizon
+    folds = []
+    start = min_train
+    while start < n:
+        folds.append((np.arange(start), np.arange(start, min(start + horizon, n))))
+        start += step
+    return folds
+
+
+def run_task(task):
+    # Worker entry point: fit one model on one fold and score it
+    name, columns, fold, train, test = task
+    model = make_model(name, columns)
+
+    start = time.perf_counter()
+    model.fit(train)
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pred = model.predict(test)
+    predict_s = time.perf_counter() - start
+
+    actual = test['passengers'].to_numpy(dtype=float)
+    error = pred - actual
+    return {
+        'model': name,
+        'fold': fold,
+        'test_start': f"{test['year'].iloc[0]}-{test['month'].iloc[0]:02d}",
+        'months': len(test),
+        'mae': np.mean(np.abs(error)),
+        'rmse': np.sqrt(np.mean(error ** 2)),
+        'mape': np.mean(np.abs(error) / actual) * 100,
+        'fit_ms': fit_s * 1000,
+        'predict_ms': predict_s * 1000,
+    }
+
+
+def evaluate(df, models=MODELS, columns=WEATHER_VARS, min_train=48, horizon=12, jobs=None):
+    """Per (model, fold) results as a DataFrame, fits spread over a process pool."""
+    folds = rolling_origin(len(df), min_train, horizon)
+    tasks = [(name, columns, i + 1, df.iloc[train], df.iloc[test])
+             for name in models for i, (train, test) in enumerate(folds)]
+    if jobs == 1:
+        results = [run_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs or min(len(tasks), os.cpu_count() or 1)) as pool:
+            results = list(pool.map(run_task, tasks))
+    return pd.DataFrame(results)
+
+
+def summarize(results):
+    # Errors pooled over folds (months weighted equally), times summed
+    results = results.assign(sq=results['rmse'] ** 2 * results['months'],
+                             abs_sum=results['mae'] * results['months'],
+                             pct_sum=results['mape'] * results['months'])
+    grouped = results.groupby('model', sort=False)
+    months = grouped['months'].sum()
+    return pd.DataFrame({
+        'folds': grouped['fold'].count(),
+        'mae': grouped['abs_sum'].sum() / months,
+        'rmse': np.sqrt(grouped['sq'].sum() / months),
+        'mape': grouped['pct_sum'].sum() / months,
+        'fit_ms': grouped['fit_ms'].sum(),
+        'predict_ms': grouped['predict_ms'].sum(),
+    })
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rolling-origin cross-validation of the passenger models")
+    parser.add_argument('--models', default=','.join(MODELS), help="comma separated: " + ', '.join(MODELS))
+    parser.add_argument('--min-train', type=int, default=48, help="months in the first training window")
+    parser.add_argument('--horizon', type=int, default=12, help="months per test fold")
+    parser.add_argument('--features', help="comma separated features.py column prefixes added to ols/ridge")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('--folds', action='store_true', help="also print the per-fold errors")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    features = args.features.split(',') if args.features else None
+    df = load_data(features)
+    columns = WEATHER_VARS + [c for c in df.columns if features and c.startswith(tuple(features))]
+
+    models = args.models.split(',')
+    start = time.perf_counter()
+    results = evaluate(df, models, columns, args.min_train, args.horizon, args.jobs)
+    elapsed = time.perf_counter() - start
+
+    n_folds = results['fold'].max()
+    print(f"Rolling-origin CV: {len(df)} months, {n_folds} folds of {args.horizon} months, "
+          f"first training window {args.min_train} months")
+    print(f"Regression inputs: {', '.join(columns)}")
+    if args.folds:
+        print("\nPer fold:")
+        print(results.to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+
+    print("\nPooled over folds (times are totals):")
+    summary = summarize(results)
+    print(summary.to_string(float_format=lambda v: f"{v:,.2f}"))
+    print(f"\n{len(results)} fits in {elapsed:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
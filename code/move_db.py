@@ -1,8 +1,16 @@
-import pandas as pd
 import pyodbc
 import os
+import sys
 from dotenv import load_dotenv
 
+import instrument
+import store
+import verify
+from load_to_azure import TABLE_COLUMNS, create_tables, upsert_rows
+
+# --incremental: keep the tables and only upsert new/changed months
+incremental = '--incremental' in sys.argv
+
 # Load .env file
 load_dotenv()
 
@@ -12,11 +20,18 @@ db_password = os.getenv('db_password')
 db_server = os.getenv('db_server')
 db_name = os.getenv('db_name')
 
-# Read CSV files
-df_passengers = pd.read_csv('../2026csv/passengers_clean.csv')
-df_weather = pd.read_csv('../2026csv/weather_clean.csv')
+# Read clean data (Parquet store if built, otherwise the CSV files)
+with instrument.stage('parse') as step:
+    df_passengers = store.load_table('passengers_clean')
+    df_weather = store.load_table('weather_clean')
+    step.rows = len(df_passengers) + len(df_weather)
+
+# Calculate checksums BEFORE loading (per year and month, see verify.py)
+source_checksums = {}
+for table, df in [('Passengers', df_passengers), ('Weather', df_weather)]:
+    columns = [name for name, _ in TABLE_COLUMNS[table]]
+    source_checksums[table] = verify.source_fingerprints(table, df[columns].itertuples(index=False, name=None))
 
-# Calculate checksums BEFORE loading
 print("=== CHECKSUMS BEFORE (from CSV) ===")
 print(f"Passengers rows: {len(df_passengers)}")
 print(f"Passengers SUM: {df_passengers['passengers'].sum():,}")
@@ -41,68 +56,78 @@ conn = pyodbc.connect(conn_str)
 cursor = conn.cursor()
 print("Connected!")
 
-# Create tables (drop if exist)
-print("\nCreating tables...")
-cursor.execute("IF OBJECT_ID('Passengers', 'U') IS NOT NULL DROP TABLE Passengers;")
-cursor.execute("IF OBJECT_ID('Weather', 'U') IS NOT NULL DROP TABLE Weather;")
-
-cursor.execute("""
-CREATE TABLE Passengers (
-    id INT IDENTITY(1,1) PRIMARY KEY,
-    year INT NOT NULL,
-    month INT NOT NULL,
-    date DATE NOT NULL,
-    passengers INT NOT NULL
-);
-""")
-
-cursor.execute("""
-CREATE TABLE Weather (
-    id INT IDENTITY(1,1) PRIMARY KEY,
-    year INT NOT NULL,
-    month INT NOT NULL,
-    date DATE NOT NULL,
-    mean_temp FLOAT,
-    max_temp FLOAT,
-    min_temp FLOAT,
-    precipitation FLOAT
-);
-""")
-conn.commit()
-print("Tables created!")
+# Create tables (drop if exist, or create if missing with --incremental)
+if incremental:
+    print("\nCreating tables (if missing)...")
+    create_tables(conn, cursor, keep_existing=True)
+    print("Tables ready!")
+else:
+    print("\nCreating tables...")
+    cursor.execute("IF OBJECT_ID('Passengers', 'U') IS NOT NULL DROP TABLE Passengers;")
+    cursor.execute("IF OBJECT_ID('Weather', 'U') IS NOT NULL DROP TABLE Weather;")
+
+    cursor.execute("""
+    CREATE TABLE Passengers (
+        id INT IDENTITY(1,1) PRIMARY KEY,
+        year INT NOT NULL,
+        month INT NOT NULL,
+        date DATE NOT NULL,
+        passengers INT NOT NULL
+    );
+    """)
+
+    cursor.execute("""
+    CREATE TABLE Weather (
+        id INT IDENTITY(1,1) PRIMARY KEY,
+        year INT NOT NULL,
+        month INT NOT NULL,
+        date DATE NOT NULL,
+        mean_temp FLOAT,
+        max_temp FLOAT,
+        min_temp FLOAT,
+        precipitation FLOAT
+    );
+    """)
+    conn.commit()
+    print("Tables created!")
 
 # Insert data
-print("\nLoading Passengers data...")
-for _, row in df_passengers.iterrows():
-    cursor.execute(
-        "INSERT INTO Passengers (year, month, date, passengers) VALUES (?, ?, ?, ?)",
-        int(row['year']), int(row['month']), row['date'], int(row['passengers'])
-    )
-conn.commit()
-print(f"  Inserted {len(df_passengers)} rows")
-
-print("Loading Weather data...")
-for _, row in df_weather.iterrows():
-    cursor.execute(
-        "INSERT INTO Weather (year, month, date, mean_temp, max_temp, min_temp, precipitation) VALUES (?, ?, ?, ?, ?, ?, ?)",
-        int(row['year']), int(row['month']), row['date'],
-        float(row['mean_temp']), float(row['max_temp']), float(row['min_temp']), float(row['precipitation'])
-    )
-conn.commit()
-print(f"  Inserted {len(df_weather)} rows")
-
-# Verify checksums AFTER loading
+if incremental:
+    for table, df in [('Passengers', df_passengers), ('Weather', df_weather)]:
+        print(f"\nUpserting {table} data...")
+        columns = [name for name, _ in TABLE_COLUMNS[table]]
+        rows = df[columns].itertuples(index=False, name=None)
+        with instrument.stage('insert ' + table, rows=len(df)):
+            inserted, updated, unchanged = upsert_rows(conn, cursor, table, rows)
+        print(f"  {inserted} inserted, {updated} updated, {unchanged} unchanged")
+else:
+    print("\nLoading Passengers data...")
+    with instrument.stage('insert Passengers', rows=len(df_passengers)):
+        for _, row in df_passengers.iterrows():
+            cursor.execute(
+                "INSERT INTO Passengers (year, month, date, passengers) VALUES (?, ?, ?, ?)",
+                int(row['year']), int(row['month']), row['date'], int(row['passengers'])
+            )
+        conn.commit()
+    print(f"  Inserted {len(df_passengers)} rows")
+
+    print("Loading Weather data...")
+    with instrument.stage('insert Weather', rows=len(df_weather)):
+        for _, row in df_weather.iterrows():
+            cursor.execute(
+                "INSERT INTO Weather (year, month, date, mean_temp, max_temp, min_temp, precipitation) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                int(row['year']), int(row['month']), row['date'],
+                float(row['mean_temp']), float(row['max_temp']), float(row['min_temp']), float(row['precipitation'])
+            )
+        conn.commit()
+    print(f"  Inserted {len(df_weather)} rows")
+
+# Verify checksums AFTER loading (one GROUP BY query per table)
 print("\n=== CHECKSUMS AFTER (from database) ===")
-cursor.execute("SELECT COUNT(*), SUM(passengers) FROM Passengers")
-p_count, p_sum = cursor.fetchone()
-print(f"Passengers rows: {p_count}")
-print(f"Passengers SUM: {p_sum:,}")
-
-cursor.execute("SELECT COUNT(*), ROUND(SUM(mean_temp), 2), ROUND(SUM(precipitation), 2) FROM Weather")
-w_count, w_temp, w_precip = cursor.fetchone()
-print(f"Weather rows: {w_count}")
-print(f"Weather temp SUM: {w_temp}")
-print(f"Weather precip SUM: {w_precip}")
+for table in ['Passengers', 'Weather']:
+    src_years, src_months = source_checksums[table]
+    with instrument.stage('verify ' + table):
+        verify.verify_table(cursor, table, src_years, src_months)
 
 # Close connection
 cursor.close()
@@ -0,0 +1,365 @@
+"""
+Correlation/regression report for every (station, nationality) pair.
+
+analasys.py looks at one pair (Reykjavík weather x all foreign arrivals).
+This runs the same statistics for a list of (station, nationality) pairs:
+Pearson r and p-value of passengers against every weather variable, and the
+multiple regression on the standardised variables (R2, adjusted R2, RMSE,
+coefficients), on the months both series have.
+
+The data is loaded once into two dense arrays on a common month axis,
+passengers[nationality, month] and weather[station, month, variable], placed
+in shared memory. Worker processes attach to the blocks by name and read
+them as NumPy views, so nothing is copied or pickled per task; a task is only
+a list of (station index, nationality index) pairs. The rows from all
+workers are written to one results table.
+
+Station-level weather comes from a table cleaned with the station column, e.g.
+    python cleanWeather.py --input ../2026csv/vedur.csv --stations all --keep-station \\
+        --start-year 1949 --output ../2026csv/weather_stations.csv
+Without a station column every row is taken as station 1, and a passenger
+table without a nationality column (passengers_clean) is one group, the
+total of all foreign arrivals. A table with two rows for the same (station,
+month) or (nationality, month) is rejected. With --archive the
+weather is read from the memory-mapped station archive (archive.py) instead:
+the workers open the archive files themselves and take each station's
+months from the mapped pages, so no weather array is built or shared.
+
+Usage:
+    python pair_analysis.py                                   # all stations x all nationalities
+    python pair_analysis.py --weather-table weather_stations --stations 1,422
+    python pair_analysis.py --nationalities "Útlendingar alls" --workers 4
+    python pair_analysis.py --archive ../2026csv/archive
+    python pair_analysis.py --benchmark --stations-x 200 --nationalities-x 50
+    python pair_analysis.py --benchmark --repeat 5       # best of 5 runs per worker count
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import batch_stats
+import store
+from cleanPassengers import TOTAL_ROW
+
+RESULTS_FILE = os.path.join(store.CSV_DIR, 'pair_analysis.csv')
+
+WEATHER_VARS = ['mean_temp', 'max_temp', 'min_temp', 'precipitation']
+
+# Pairs per task: large enough that process overhead is small, small enough to balance
+DEFAULT_CHUNK = 64
+
+
+# ---------- data ----------
+
+def load_frames(weather_table='weather_clean', passenger_table='passengers_by_nationality'):
+    weather = store.load_table(weather_table)
+    if 'station' not in weather.columns:
+        weather['station'] = 1
+    passengers = store.load_table(passenger_table)
+    return weather, passengers
+
+
+def check_unique(groups, group_idx, month_keys, month_idx, what):
+    # Two rows for one cell would silently overwrite each other in the dense array
+    cell = group_idx * len(month_keys) + month_idx
+    cells, counts = np.unique(cell, return_counts=True)
+    duplicates = cells[counts > 1]
+    if len(duplicates):
+        first = duplicates[0]
+        year, month = divmod(int(month_keys[first % len(month_keys)]), 12)
+        raise ValueError(f"{len(duplicates)} duplicate ({what}, month) rows, "
+                         f"e.g. {what} {groups[first // len(month_keys)]} {year}-{month + 1:02d}")
+
+
+def to_arrays(weather, passengers):
+    """
+    Dense arrays on the union of months of both tables (NaN where missing).
+
+    Returns (stations, nationalities, month_keys, weather[s, t, v], passengers[n, t]).
+    Raises ValueError if a (station, month) or (nationality, month) has more than one row.
+    """
+    w_key = (weather['year'] * 12 + weather['month'] - 1).to_numpy()
+    p_key = (passengers['year'] * 12 + passengers['month'] - 1).to_numpy()
+    month_keys = np.union1d(w_key, p_key)
+
+    stations, s_idx = np.unique(weather['station'].to_numpy(), return_inverse=True)
+    w_t = np.searchsorted(month_keys, w_key)
+    check_unique(stations, s_idx, month_keys, w_t, 'station')
+    weather_arr = np.full((len(stations), len(month_keys), len(WEATHER_VARS)), np.nan)
+    weather_arr[s_idx, w_t] = weather[WEATHER_VARS].to_numpy(dtype=float)
+
+    nationalities, passenger_arr = passenger_array(passengers, month_keys)
+    return stations, nationalities, month_keys, weather_arr, passenger_arr
+
+
+def passenger_array(passengers, month_keys):
+    """(nationalities, passengers[n, t]) on month_keys (NaN where missing)."""
+    p_key = (passengers['year'] * 12 + passengers['month'] - 1).to_numpy()
+    if 'nationality' in passengers.columns:
+        nationality = passengers['nationality'].astype(str).to_numpy()
+    else:
+        # passengers_clean holds only the total row
+        nationality = np.full(len(passengers), TOTAL_ROW)
+    nationalities, n_idx = np.unique(nationality, return_inverse=True)
+    p_t = np.searchsorted(month_keys, p_key)
+    check_unique(nationalities, n_idx, month_keys, p_t, 'nationality')
+    passenger_arr = np.full((len(nationalities), len(month_keys)), np.nan)
+    passenger_arr[n_idx, p_t] = passengers['passengers'].to_numpy(dtype=float)
+    return nationalities, passenger_arr
+
+
+class SharedArray:
+    """A NumPy array in a named shared memory block (create in the parent, attach in workers)."""
+
+    def __init__(self, array=None, spec=None):
+        if spec is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            self.spec = (self.shm.name, array.shape, array.dtype.str)
+            self.array = np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf)
+            self.array[...] = array
+        else:
+            self.spec = spec
+            self.shm = shared_memory.SharedMemory(name=spec[0])
+            self.array = np.ndarray(spec[1], dtype=np.dtype(spec[2]), buffer=self.shm.buf)
+
+    def close(self, unlink=False):
+        self.array = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class ArchiveWeather:
+    """weather[s] for the workers, read from the station archive on the analysis month axis."""
+
+    def __init__(self, archive, stations, month_keys):
+        self.archive = archive
+        self.stations = stations
+        self.month_keys = month_keys
+        self.array = self
+
+    @property
+    def spec(self):
+        # The Archive pickles as its path, each worker maps the files itself
+        return ('archive', self.archive, self.stations, self.month_keys)
+
+    def __getitem__(self, s):
+        return self.archive.matrix(self.stations[s], WEATHER_VARS, self.month_keys)
+
+    def close(self, unlink=False):
+        self.archive = None
+
+
+# ---------- statistics ----------
+
+def analyse_pair(weather, passengers):
+    """
+    Statistics for one pair: weather (months, variables), passengers (months,).
+
+    Only months where passengers and every weather variable are present are used.
+    """
+    mask = ~np.isnan(passengers) & ~np.isnan(weather).any(axis=1)
+    X = weather[mask]
+    y = passengers[mask]
+    n = len(y)
+    k = len(WEATHER_VARS)
+    row = {'n': n}
+
+    _, tests = batch_stats.pearson(X, y)
+    for j, var in enumerate(WEATHER_VARS):
+        row['r_' + var] = tests['r'][0, j]
+        row['p_' + var] = tests['p'][0, j]
+
+    # Least squares on standardised columns, same model as analasys.py
+    # (StandardScaler + LinearRegression); constant columns get coefficient 0
+    if n > k + 1:
+        std = X.std(axis=0)
+        std[std == 0] = 1.0
+        Z = np.column_stack([np.ones(n), (X - X.mean(axis=0)) / std])
+        beta = np.linalg.lstsq(Z, y, rcond=None)[0]
+        resid = y - Z @ beta
+        ss_res = resid @ resid
+        ss_tot = ((y - y.mean()) ** 2).sum()
+        r2 = 1 - ss_res / ss_tot if ss_tot > 0 else np.nan
+        row['r2'] = r2
+        row['adj_r2'] = 1 - (1 - r2) * (n - 1) / (n - k - 1)
+        row['rmse'] = np.sqrt(ss_res / n)
+        for j, var in enumerate(WEATHER_VARS):
+            row['coef_' + var] = beta[j + 1]
+    else:
+        for col in ['r2', 'adj_r2', 'rmse'] + ['coef_' + var for var in WEATHER_VARS]:
+            row[col] = np.nan
+    return row
+
+
+# Worker state: the shared arrays, attached once per process
+_shared = {}
+
+
+def attach(weather_spec, passenger_spec):
+    if weather_spec[0] == 'archive':
+        _shared['weather'] = ArchiveWeather(*weather_spec[1:])
+    else:
+        _shared['weather'] = SharedArray(spec=weather_spec)
+    _shared['passengers'] = SharedArray(spec=passenger_spec)
+
+
+def analyse_chunk(pairs):
+    # pairs: [(station index, nationality index)], runs in a worker
+    weather = _shared['weather'].array
+    passengers = _shared['passengers'].array
+    rows = []
+    for s, n in pairs:
+        row = analyse_pair(weather[s], passengers[n])
+        row['_s'], row['_n'] = s, n
+        rows.append(row)
+    return rows
+
+
+def run(stations, nationalities, weather_arr, passenger_arr, pairs, workers=None, chunk=DEFAULT_CHUNK):
+    """
+    Analyse the (station index, nationality index) pairs and return the results table.
+
+    workers=1 runs in this process; otherwise a process pool reads the
+    arrays from shared memory. weather_arr may also be an ArchiveWeather.
+    """
+    weather_shm = weather_arr if isinstance(weather_arr, ArchiveWeather) else SharedArray(weather_arr)
+    passenger_shm = SharedArray(passenger_arr)
+    try:
+        chunks = [pairs[i:i + chunk] for i in range(0, len(pairs), chunk)]
+        if workers == 1:
+            attach(weather_shm.spec, passenger_shm.spec)
+            results = [analyse_chunk(c) for c in chunks]
+            for shared in _shared.values():
+                shared.close()
+            _shared.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=attach,
+                                     initargs=(weather_shm.spec, passenger_shm.spec)) as pool:
+                results = list(pool.map(analyse_chunk, chunks))
+    finally:
+        weather_shm.close(unlink=True)
+        passenger_shm.close(unlink=True)
+
+    table = pd.DataFrame([row for rows in results for row in rows])
+    table.insert(0, 'station', stations[table.pop('_s').to_numpy()])
+    table.insert(1, 'nationality', nationalities[table.pop('_n').to_numpy()])
+    return table
+
+
+def select_pairs(stations, nationalities, wanted_stations=None, wanted_nationalities=None):
+    # Cross product of the selected stations and nationalities, as array indices
+    s_idx = [i for i, s in enumerate(stations) if wanted_stations is None or s in wanted_stations]
+    n_idx = [i for i, n in enumerate(nationalities) if wanted_nationalities is None or n in wanted_nationalities]
+    return [(s, n) for s in s_idx for n in n_idx]
+
+
+# ---------- benchmark ----------
+
+def synthetic_arrays(weather_arr, passenger_arr, n_stations, n_nationalities, seed=0):
+    # Noisy copies of the real series, standing in for more stations / nationalities
+    rng = np.random.default_rng(seed)
+    base_w = weather_arr[0]
+    base_p = passenger_arr[0]
+    weather = base_w + rng.normal(0, 1.0, size=(n_stations,) + base_w.shape)
+    passengers = base_p * rng.uniform(0.01, 1.0, size=(n_nationalities, 1))
+    return np.arange(1, n_stations + 1), np.array([f"N{i:04d}" for i in range(n_nationalities)]), weather, passengers
+
+
+def benchmark(weather_arr, passenger_arr, n_stations, n_nationalities, max_workers=None, chunk=DEFAULT_CHUNK,
+              repeat=3):
+    stations, nationalities, weather, passengers = synthetic_arrays(
+        weather_arr, passenger_arr, n_stations, n_nationalities)
+    pairs = select_pairs(stations, nationalities)
+    max_workers = max_workers or os.cpu_count() or 1
+    counts = sorted({1, max_workers} | {2 ** i for i in range(max_workers.bit_length()) if 2 ** i <= max_workers})
+
+    print(f"{n_stations} stations x {n_nationalities} nationalities = {len(pairs)} pairs, "
+          f"{weather.shape[1]} months, {os.cpu_count()} CPUs, best of {repeat}")
+    print(f"{'workers':>8}{'seconds':>10}{'pairs/s':>12}{'speedup':>9}")
+    # Warm-up outside the timing, the first run pays for imports and page faults
+    run(stations, nationalities, weather, passengers, pairs[:chunk], 1, chunk)
+    reference = None
+    for workers in counts:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            table = run(stations, nationalities, weather, passengers, pairs, workers, chunk)
+            times.append(time.perf_counter() - start)
+        elapsed = min(times)
+        if reference is None:
+            reference = (elapsed, table)
+        elif not table.equals(reference[1]):
+            print("  results differ from the 1-worker run!")
+        print(f"{workers:>8}{elapsed:>10.3f}{len(pairs) / elapsed:>12,.0f}{reference[0] / elapsed:>9.2f}")
+
+
+def parse_list(value):
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Weather vs tourism statistics for every (station, nationality) pair")
+    parser.add_argument('--weather-table', default='weather_clean',
+                        help="clean weather table (with a station column for several stations)")
+    parser.add_argument('--passenger-table', default='passengers_by_nationality')
+    parser.add_argument('--archive', metavar='DIR', help="read the weather from a station archive (archive.py)")
+    parser.add_argument('--stations', type=parse_list, help="comma separated station ids (default: all)")
+    parser.add_argument('--nationalities', type=parse_list, help="comma separated nationalities (default: all)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK, help="pairs per task")
+    parser.add_argument('--output', default=RESULTS_FILE)
+    parser.add_argument('--benchmark', action='store_true', help="time 1..N workers on synthetic pairs")
+    parser.add_argument('--stations-x', type=int, default=100, help="synthetic stations for --benchmark")
+    parser.add_argument('--nationalities-x', type=int, default=50, help="synthetic nationalities for --benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per worker count in --benchmark, best counts")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.archive:
+        from archive import Archive
+        station_archive = Archive(args.archive)
+        passengers = store.load_table(args.passenger_table)
+        month_keys = np.unique((passengers['year'] * 12 + passengers['month'] - 1).to_numpy())
+        nationalities, passenger_arr = passenger_array(passengers, month_keys)
+        stations = station_archive.stations
+        weather_arr = ArchiveWeather(station_archive, stations, month_keys)
+    else:
+        weather, passengers = load_frames(args.weather_table, args.passenger_table)
+        stations, nationalities, month_keys, weather_arr, passenger_arr = to_arrays(weather, passengers)
+
+    if args.benchmark:
+        if args.archive:
+            raise SystemExit("--benchmark uses the table data, not --archive")
+        benchmark(weather_arr, passenger_arr, args.stations_x, args.nationalities_x, args.workers, args.chunk,
+                  args.repeat)
+        return
+
+    wanted_stations = [int(s) for s in args.stations] if args.stations else None
+    pairs = select_pairs(stations, nationalities, wanted_stations, args.nationalities)
+    print(f"{len(stations)} stations x {len(nationalities)} nationalities, "
+          f"{len(month_keys)} months -> {len(pairs)} pairs")
+    if not pairs:
+        print("No pairs selected")
+        return
+
+    start = time.perf_counter()
+    table = run(stations, nationalities, weather_arr, passenger_arr, pairs, args.workers, args.chunk)
+    elapsed = time.perf_counter() - start
+
+    table.to_csv(args.output, index=False, float_format='%.6g')
+    print(f"Analysed {len(table)} pairs in {elapsed:.3f} s -> {args.output}")
+    print(table[['station', 'nationality', 'n', 'r_mean_temp', 'p_mean_temp', 'r2']]
+          .head(10).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
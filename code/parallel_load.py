@@ -0,0 +1,316 @@
+"""
+Parallel loader: loads tables and year partitions concurrently over a small
+connection pool.
+
+Every work unit is one (table, year) partition: DELETE the year, then
+INSERT its rows. On Azure that is one transaction per unit; on the SQLite
+stand-in (LatencyConnection, autocommit) each statement commits by itself,
+so a failed unit can leave part of its year behind. Either way a unit that
+fails on a transient connection error can simply be retried with backoff:
+the retry starts by deleting the year again. Per-worker
+throughput is printed at the end, and the result is checked with verify.py.
+
+For local testing, --sqlite loads into a SQLite file and --latency adds a
+delay to every round-trip (execute, executemany, commit) to mimic a remote
+server; --fail-rate injects transient errors to exercise the retry path.
+
+Usage:
+    python parallel_load.py --workers 4
+    python parallel_load.py --sqlite test.db --workers 4 --latency 0.02
+    python parallel_load.py --sqlite test.db --workers 1 --latency 0.02   # serial baseline
+"""
+
+import argparse
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import instrument
+import verify
+from load_to_azure import (DEFAULT_BATCH_SIZE, SQL_DROP_TABLES, SQLITE_DROP_TABLES, TABLE_COLUMNS,
+                           batched, connect, create_tables, read_rows)
+
+# SQLSTATEs / SQL Server error numbers worth retrying (connection drops, timeouts,
+# Azure SQL failover and throttling, deadlock victim)
+TRANSIENT_SQLSTATES = {'08S01', '08001', '08004', '08007', 'HYT00', 'HYT01', '40001'}
+TRANSIENT_ERRORS = ['40613', '40197', '40501', '49918', '49919', '49920', '4060', '10928', '10929', '1205']
+
+
+def is_transient(exc):
+    if isinstance(exc, sqlite3.OperationalError):
+        message = str(exc)
+        return 'locked' in message or 'busy' in message
+    # pyodbc errors carry the SQLSTATE as the first argument
+    if exc.args and exc.args[0] in TRANSIENT_SQLSTATES:
+        return True
+    message = str(exc)
+    return type(exc).__module__ == 'pyodbc' and any(f"({code})" in message for code in TRANSIENT_ERRORS)
+
+
+def with_retry(func, retries=5, base_delay=0.5, max_delay=30.0, on_retry=None):
+    """Call func(), retrying transient errors with exponential backoff and jitter."""
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except Exception as exc:
+            if attempt == retries or not is_transient(exc):
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+            if on_retry:
+                on_retry(exc, attempt + 1, delay)
+            time.sleep(delay)
+
+
+class LatencyCursor:
+    """Cursor wrapper that sleeps before each round-trip and can fail on purpose."""
+
+    def __init__(self, cursor, latency, fail_rate):
+        self._cursor = cursor
+        self._latency = latency
+        self._fail_rate = fail_rate
+
+    def _round_trip(self):
+        time.sleep(self._latency)
+        if self._fail_rate and random.random() < self._fail_rate:
+            raise sqlite3.OperationalError("database is locked (injected)")
+
+    def execute(self, *args):
+        self._round_trip()
+        return self._cursor.execute(*args)
+
+    def executemany(self, *args):
+        self._round_trip()
+        return self._cursor.executemany(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class LatencyConnection:
+    """
+    SQLite connection that behaves like a remote one: every round-trip costs latency.
+
+    SQLite allows one writer at a time, so statements run in autocommit mode
+    here; otherwise the injected latency would be spent holding the write lock
+    and the workers could never overlap. Units stay retry-safe because each
+    one starts by deleting its year. A single writer can pass autocommit=False
+    to get one transaction per commit() like the real loader.
+    """
+
+    def __init__(self, path, latency=0.0, fail_rate=0.0, autocommit=True):
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False,
+                                     isolation_level=None if autocommit else 'DEFERRED')
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self.latency = latency
+        self.fail_rate = fail_rate
+
+    def cursor(self):
+        return LatencyCursor(self._conn.cursor(), self.latency, self.fail_rate)
+
+    def commit(self):
+        time.sleep(self.latency)
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool; connections are opened on first use and reused.
+
+    A connection that raised an error is closed instead of returned, so the
+    next unit gets a fresh one.
+    """
+
+    def __init__(self, factory, size):
+        self._factory = factory
+        self._idle = queue.Queue()
+        self._slots = threading.Semaphore(size)
+        self._all = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._factory()
+                with self._lock:
+                    self._all.append(conn)
+            try:
+                yield conn
+            except Exception:
+                self._discard(conn)
+                raise
+            else:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def _discard(self, conn):
+        with self._lock:
+            if conn in self._all:
+                self._all.remove(conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all = []
+
+
+class WorkerStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_worker = {}
+
+    def add(self, rows, seconds, retries):
+        name = threading.current_thread().name
+        with self._lock:
+            stats = self.by_worker.setdefault(name, {'units': 0, 'rows': 0, 'seconds': 0.0, 'retries': 0})
+            stats['units'] += 1
+            stats['rows'] += rows
+            stats['seconds'] += seconds
+            stats['retries'] += retries
+
+
+def partition_rows(rows):
+    # {year: [row, ...]}, rows are tuples with year first
+    partitions = {}
+    for row in rows:
+        partitions.setdefault(row[0], []).append(row)
+    return partitions
+
+
+def load_unit(pool, table, year, rows, stats, batch_size=DEFAULT_BATCH_SIZE, retries=5):
+    """
+    Load one (table, year) partition, retrying transient errors.
+
+    One transaction on a connection with autocommit off (pyodbc). With
+    LatencyConnection every statement commits on its own; a retry is still
+    idempotent because it deletes the year before inserting it again.
+    """
+    columns = [name for name, _ in TABLE_COLUMNS[table]]
+    insert_sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+                  f"VALUES ({', '.join('?' * len(columns))});")
+    attempts = []
+
+    def attempt():
+        attempts.append(1)
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            if hasattr(cursor, 'fast_executemany'):
+                cursor.fast_executemany = True
+            try:
+                # Deleting the year first makes a retried unit idempotent
+                cursor.execute(f"DELETE FROM {table} WHERE year = ?", (year,))
+                for batch in batched(rows, batch_size):
+                    cursor.executemany(insert_sql, batch)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def log_retry(exc, n, delay):
+        print(f"  retry {n} for {table} {year} in {delay:.2f} s: {exc}")
+
+    start = time.perf_counter()
+    with_retry(attempt, retries=retries, base_delay=0.05, on_retry=log_retry)
+    stats.add(len(rows), time.perf_counter() - start, len(attempts) - 1)
+    return table, year, len(rows)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load the clean data with parallel workers")
+    parser.add_argument('--workers', type=int, default=4, help="pooled connections / worker threads")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--retries', type=int, default=5, help="retries per unit on transient errors")
+    parser.add_argument('--source', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--csv-dir', default=os.path.join(os.path.dirname(__file__), '..', '2026csv'))
+    parser.add_argument('--sqlite', metavar='PATH', help="load into a local SQLite file")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="seconds added to every SQLite round-trip (with --sqlite)")
+    parser.add_argument('--fail-rate', type=float, default=0.0,
+                        help="probability of an injected transient error per round-trip (with --sqlite)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sqlite = bool(args.sqlite)
+
+    print("=" * 60)
+    print(f"PARALLEL LOADER ({args.workers} workers)")
+    print("=" * 60)
+
+    # Tables are (re)created on one plain connection before the workers start
+    conn = connect(args.sqlite)
+    cursor = conn.cursor()
+    if sqlite:
+        cursor.executescript(SQLITE_DROP_TABLES)
+    else:
+        cursor.execute(SQL_DROP_TABLES)
+    conn.commit()
+    create_tables(conn, cursor, sqlite=sqlite)
+
+    # Read every table once, fingerprinting it for the verification step
+    source_checksums = {}
+    units = []
+    for table in TABLE_COLUMNS:
+        src_years, src_months = {}, {}
+        source_checksums[table] = (src_years, src_months)
+        rows = verify.fingerprinted(table, read_rows(table, args.source, args.csv_dir), src_years, src_months)
+        for year, year_rows in sorted(partition_rows(rows).items()):
+            units.append((table, year, year_rows))
+    print(f"\n{len(units)} units ({len(TABLE_COLUMNS)} tables x year partitions)")
+
+    if sqlite:
+        factory = lambda: LatencyConnection(args.sqlite, args.latency, args.fail_rate)
+    else:
+        factory = lambda: connect()
+    pool = ConnectionPool(lambda: with_retry(factory, retries=args.retries), args.workers)
+    stats = WorkerStats()
+
+    with instrument.stage('insert') as step:
+        with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix='worker') as executor:
+            futures = [executor.submit(load_unit, pool, table, year, rows, stats, args.batch_size, args.retries)
+                       for table, year, rows in units]
+            loaded = [future.result() for future in futures]
+        pool.close()
+        total = step.rows = sum(count for _, _, count in loaded)
+    elapsed = step.wall
+
+    print(f"\nLoaded {total} rows in {elapsed:.3f} s = {total / elapsed:,.0f} rows/s")
+    print(f"\n{'worker':<12}{'units':>7}{'rows':>9}{'busy s':>10}{'rows/s':>12}{'retries':>9}")
+    for name, s in sorted(stats.by_worker.items()):
+        rate = s['rows'] / s['seconds'] if s['seconds'] > 0 else float('inf')
+        print(f"{name:<12}{s['units']:>7}{s['rows']:>9}{s['seconds']:>10.3f}{rate:>12,.0f}{s['retries']:>9}")
+
+    all_passed = True
+    for table in TABLE_COLUMNS:
+        src_years, src_months = source_checksums[table]
+        with instrument.stage('verify ' + table):
+            all_passed &= verify.verify_table(cursor, table, src_years, src_months, sqlite=sqlite)
+    cursor.close()
+    conn.close()
+
+    print("\n✓ ALL CHECKSUMS PASSED" if all_passed else "\n✗ SOME CHECKSUMS FAILED")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""
+Pipeline runner for the cleaning, analysis and loading scripts.
+
+Each stage declares the files it reads and writes. The script and the local
+modules it imports (store.py, schema.py, ...) are inputs too, found by
+scanning the import statements. Before a stage runs, its inputs and outputs
+are fingerprinted (mtime + size, and a content hash when
+the mtime changed) and compared with the last successful run recorded in
+.pipeline_state.json. Up-to-date stages are skipped, and stages that do not
+depend on each other (the two cleaners) run at the same time.
+
+The load stage writes to the database and has no output files, so it is
+tracked by its inputs only: use --force after the tables were dropped or
+changed in the database.
+
+Usage:
+    python pipeline.py                  # clean_passengers, clean_weather, analyze
+    python pipeline.py load             # ... and everything load depends on
+    python pipeline.py features         # lagged/rolling weather features (features.py)
+    python pipeline.py --force analyze  # rerun analyze even if up to date
+    python pipeline.py --dry-run        # show what would run (the state file is not changed)
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import instrument
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(CODE_DIR)
+CSV_DIR = os.path.join(BASE_DIR, '2026csv')
+STATE_FILE = os.path.join(CODE_DIR, '.pipeline_state.json')
+
+# Written next to analasys.py
+FIGURES = ['1_time_series.png', '2_seasonal_patterns.png', '3_correlation_heatmap.png',
+           '4_scatter_plots.png', '5_regression_analysis.png']
+
+
+def local_imports(script):
+    """Paths of the modules in code/ that script imports, directly or through each other."""
+    found = []
+    todo = [script]
+    while todo:
+        with open(todo.pop(), encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        # Imports inside functions count too, the scripts import most modules lazily
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                path = os.path.join(CODE_DIR, name.split('.')[0] + '.py')
+                if os.path.exists(path) and path != script and path not in found:
+                    found.append(path)
+                    todo.append(path)
+    return sorted(found)
+
+
+class Stage:
+    def __init__(self, name, script, inputs, outputs, args=(), log=None):
+        self.name = name
+        self.script = os.path.join(CODE_DIR, script)
+        # The script and its local modules are inputs, so editing any of them reruns the stage
+        code = [self.script] + local_imports(self.script)
+        self.inputs = code + [path for path in inputs if path not in code]
+        self.outputs = list(outputs)
+        self.args = list(args)
+        # Optional file that receives the stage's stdout (then also an output)
+        self.log = log
+        if log:
+            self.outputs.append(log)
+
+
+STAGES = [
+    Stage('clean_passengers', 'cleanPassengers.py',
+          inputs=[os.path.join(CSV_DIR, 'farþegar.csv')],
+          outputs=[os.path.join(CSV_DIR, 'passengers_clean.csv'),
+                   os.path.join(CSV_DIR, 'passengers_by_nationality.csv')]),
+    Stage('clean_weather', 'cleanWeather.py',
+          inputs=[os.path.join(BASE_DIR, 'weather.txt')],
+          outputs=[os.path.join(CSV_DIR, 'weather_clean.csv')]),
+    Stage('features', 'features.py',
+          inputs=[os.path.join(BASE_DIR, 'weather.txt')],
+          outputs=[os.path.join(CSV_DIR, 'weather_features.csv')]),
+    Stage('analyze', 'analasys.py',
+          inputs=[os.path.join(CSV_DIR, 'passengers_clean.csv'),
+                  os.path.join(CSV_DIR, 'weather_clean.csv')],
+          outputs=[os.path.join(CODE_DIR, name) for name in FIGURES] +
+                  [os.path.join(CSV_DIR, 'analysis_cube.parquet')],
+          log=os.path.join(CODE_DIR, 'analysis_output.txt')),
+    # Writes to the database only, so it has no output files: it reruns when an
+    # input changes, not when the tables in the database are changed or dropped
+    Stage('load', 'load_to_azure.py',
+          inputs=[os.path.join(CSV_DIR, 'passengers_clean.csv'),
+                  os.path.join(CSV_DIR, 'weather_clean.csv')],
+          outputs=[]),
+]
+
+DEFAULT_STAGES = ['clean_passengers', 'clean_weather', 'analyze']
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def fingerprint(path, previous=None):
+    """
+    Fingerprint of one file: {'mtime', 'size', 'sha256'} or None if missing.
+
+    The content hash is only recomputed when mtime or size differ from the
+    previous fingerprint, so unchanged files cost one stat() call.
+    """
+    if not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    if previous and previous['mtime'] == st.st_mtime_ns and previous['size'] == st.st_size:
+        return previous
+    return {'mtime': st.st_mtime_ns, 'size': st.st_size, 'sha256': file_hash(path)}
+
+
+def same_content(a, b):
+    return a is not None and b is not None and a['sha256'] == b['sha256']
+
+
+def load_state():
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state):
+    with open(STATE_FILE, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def is_up_to_date(stage, state):
+    """
+    Up to date when every input and output has the content it had after the last run.
+
+    Files that were only touched get their new mtime recorded, so they are not
+    hashed again on the next run.
+    """
+    recorded = state.get(stage.name)
+    if recorded is None:
+        return False
+    current = {}
+    for path in stage.inputs + stage.outputs:
+        previous = recorded['files'].get(path)
+        current[path] = fingerprint(path, previous)
+        if not same_content(current[path], previous):
+            return False
+    recorded['files'] = current
+    return True
+
+
+def record(stage, state):
+    previous = state.get(stage.name, {}).get('files', {})
+    state[stage.name] = {
+        'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'files': {path: fingerprint(path, previous.get(path)) for path in stage.inputs + stage.outputs},
+    }
+
+
+def dependencies(stage, stages):
+    # A stage depends on every stage that writes one of its inputs
+    return [other for other in stages if other is not stage and set(other.outputs) & set(stage.inputs)]
+
+
+def select(names, stages=STAGES):
+    # Requested stages plus everything they depend on, in declaration order
+    by_name = {stage.name: stage for stage in stages}
+    wanted = set()
+    todo = list(names)
+    while todo:
+        name = todo.pop()
+        if name not in by_name:
+            raise SystemExit(f"Unknown stage: {name} (stages: {', '.join(by_name)})")
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(dep.name for dep in dependencies(by_name[name], stages))
+    return [stage for stage in stages if stage.name in wanted]
+
+
+def levels(stages):
+    # Group stages into waves; every stage in a wave only depends on earlier waves
+    remaining = list(stages)
+    done = set()
+    waves = []
+    while remaining:
+        wave = [s for s in remaining if all(dep.name in done for dep in dependencies(s, stages))]
+        if not wave:
+            raise SystemExit("Stage dependencies contain a cycle")
+        waves.append(wave)
+        done.update(s.name for s in wave)
+        remaining = [s for s in remaining if s not in wave]
+    return waves
+
+
+def run_stage(stage):
+    # The scripts record their own stages too when VG_TRACE is set (see instrument.py)
+    cmd = [sys.executable, stage.script] + stage.args
+    with instrument.stage(stage.name) as step:
+        if stage.log:
+            with open(stage.log, 'w') as log:
+                result = subprocess.run(cmd, cwd=CODE_DIR, stdout=log, stderr=subprocess.STDOUT)
+        else:
+            result = subprocess.run(cmd, cwd=CODE_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            if result.returncode != 0:
+                print(result.stdout)
+    return result.returncode, step.wall
+
+
+def run(names, force=False, dry_run=False, jobs=None):
+    stages = select(names)
+    state = load_state()
+    failed = set()
+    # Dry run: stages that would run, their dependants would run after them
+    would_run = set()
+
+    for wave in levels(stages):
+        todo = []
+        for stage in wave:
+            deps = [dep.name for dep in dependencies(stage, stages)]
+            if any(dep in failed for dep in deps):
+                print(f"[skip]  {stage.name} (dependency failed)")
+                failed.add(stage.name)
+            elif dry_run and any(dep in would_run for dep in deps):
+                todo.append(stage)
+            elif not force and is_up_to_date(stage, state):
+                print(f"[ok]    {stage.name} is up to date")
+            else:
+                todo.append(stage)
+
+        if dry_run:
+            # Nothing ran, so nothing is recorded in the state file
+            for stage in todo:
+                after = [dep for dep in dependencies(stage, stages) if dep.name in would_run]
+                print(f"[run]   {stage.name} would run" +
+                      (f" (after {', '.join(dep.name for dep in after)})" if after else ""))
+                would_run.add(stage.name)
+            continue
+        if not todo:
+            save_state(state)
+            continue
+
+        with ThreadPoolExecutor(max_workers=jobs or len(todo)) as pool:
+            results = list(pool.map(run_stage, todo))
+
+        for stage, (returncode, seconds) in zip(todo, results):
+            if returncode == 0:
+                record(stage, state)
+                print(f"[done]  {stage.name} in {seconds:.2f} s")
+            else:
+                failed.add(stage.name)
+                print(f"[fail]  {stage.name} exited with {returncode} after {seconds:.2f} s")
+        save_state(state)
+
+    return not failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the pipeline stages that are out of date")
+    parser.add_argument('stages', nargs='*', default=DEFAULT_STAGES,
+                        help=f"stages to bring up to date (default: {' '.join(DEFAULT_STAGES)})")
+    parser.add_argument('--force', action='store_true', help="run the selected stages even if up to date")
+    parser.add_argument('--dry-run', action='store_true', help="only show what would run")
+    parser.add_argument('--jobs', type=int, default=None, help="max stages running at once")
+    args = parser.parse_args(argv)
+
+    ok = run(args.stages, force=args.force, dry_run=args.dry_run, jobs=args.jobs)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Column types of the clean tables, declared once.
+
+Every reader and writer (the cleaners, store.py, backends.py, bench.py)
+takes its types from DTYPES:
+
+    year                int16
+    month               int8
+    passengers          int32
+    measures            float32 (the IMO export has one decimal)
+    station, nationality  categorical
+
+The date column is never parsed from text. month_start() builds it from
+year and month with integer arithmetic on datetime64[M] (months since
+1970-01), so readers skip the 'date' column of the CSV files altogether.
+
+Analysis code gets the wide types back from store.load_table() (see
+store.widen), because sums of squares overflow int32 and float32 sums lose
+precision; the narrow types are for parsing, storing and moving the rows.
+
+Usage:
+    python schema.py                      # memory and load time, inferred vs schema types
+    python schema.py --scale 1000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+MEASURES = ['mean_temp', 'max_temp', 'min_temp', 'precipitation',
+            'sunshine', 'humidity', 'wind_speed', 'pressure']
+
+DTYPES = {
+    'station': 'category',
+    'nationality': 'category',
+    'year': 'int16',
+    'month': 'int8',
+    'passengers': 'int32',
+    **{name: 'float32' for name in MEASURES},
+}
+
+# Values of the categorical columns, as they are parsed
+# (IMO automatic station numbers go past the int16 range)
+CATEGORY_VALUES = {
+    'station': 'int32',
+    'nationality': 'str',
+}
+
+DATE_DTYPE = 'datetime64[s]'
+
+
+def parse_dtypes(columns):
+    """read_csv dtypes for the schema columns among columns (categories by their value type)."""
+    return {c: CATEGORY_VALUES.get(c, DTYPES[c]) for c in columns if c in DTYPES}
+
+
+def month_start(year, month):
+    """First day of each month as datetime64, from the year and month numbers."""
+    months = (np.asarray(year, dtype=np.int64) - 1970) * 12 + np.asarray(month, dtype=np.int64) - 1
+    return months.astype('datetime64[M]').astype(DATE_DTYPE)
+
+
+def apply(df):
+    """Cast the schema columns of df in place and return it."""
+    for column in df.columns:
+        dtype = DTYPES.get(column)
+        if dtype is not None and df[column].dtype != dtype:
+            if dtype == 'category':
+                df[column] = df[column].astype(CATEGORY_VALUES[column]).astype('category')
+            else:
+                df[column] = df[column].astype(dtype)
+    if 'date' in df.columns and df['date'].dtype != DATE_DTYPE:
+        df['date'] = df['date'].astype(DATE_DTYPE)
+    return df
+
+
+def read_csv(path, columns=None):
+    """
+    Read a clean CSV file with the schema types.
+
+    The date column is not read, it is rebuilt from year and month.
+    """
+    header = list(pd.read_csv(path, nrows=0).columns)
+    wanted = list(columns) if columns is not None else header
+    parse = [c for c in header if c != 'date' and (c in wanted or 'date' in wanted and c in ('year', 'month'))]
+    df = apply(pd.read_csv(path, usecols=parse, dtype=parse_dtypes(parse)))
+    if 'date' in wanted:
+        df['date'] = month_start(df['year'], df['month'])
+    return df[wanted]
+
+
+def arrow_types():
+    """Parquet/Arrow type per schema column (categories are dictionary encoded)."""
+    import pyarrow as pa
+    types = {'date': pa.date32()}
+    for column, dtype in DTYPES.items():
+        if dtype == 'category':
+            values = CATEGORY_VALUES[column]
+            value_type = pa.string() if values == 'str' else pa.from_numpy_dtype(np.dtype(values))
+            types[column] = pa.dictionary(pa.int32(), value_type)
+        else:
+            types[column] = pa.from_numpy_dtype(np.dtype(dtype))
+    return types
+
+
+# ---------- before / after ----------
+
+def read_inferred(path):
+    # The readers before the schema: inferred int64/float64/str columns, dates parsed from text
+    df = pd.read_csv(path)
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True, index=False).sum() / 2 ** 20
+
+
+def benchmark(tables, scale=1, repeat=5):
+    from store import CSV_DIR
+    print(f"Inferred types vs schema types, best of {repeat} (scale {scale}x)")
+    print(f"{'table':<28}{'rows':>10}{'MB before':>11}{'MB after':>10}{'s before':>10}{'s after':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in tables:
+            source = os.path.join(CSV_DIR, name + '.csv')
+            if not os.path.exists(source):
+                continue
+            path = os.path.join(tmp, name + '.csv')
+            df = pd.read_csv(source)
+            pd.concat([df] * scale, ignore_index=True).to_csv(path, index=False)
+
+            before_s, before = best_time(lambda: read_inferred(path), repeat)
+            after_s, after = best_time(lambda: read_csv(path), repeat)
+            if not before['date'].astype(DATE_DTYPE).equals(after['date']):
+                raise SystemExit(f"{name}: dates differ between the readers")
+            print(f"{name:<28}{len(after):>10}{memory_mb(before):>11.2f}{memory_mb(after):>10.2f}"
+                  f"{before_s:>10.4f}{after_s:>10.4f}")
+
+    # Dates alone: the frame assembly the cleaners used vs month arithmetic
+    n = 1_000_000 * max(1, scale // 1000)
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({'year': rng.integers(1949, 2027, n), 'month': rng.integers(1, 13, n)})
+    assembled_s, assembled = best_time(lambda: pd.to_datetime(frame.assign(day=1)), repeat)
+    arithmetic_s, arithmetic = best_time(lambda: month_start(frame['year'], frame['month']), repeat)
+    if not (assembled.to_numpy().astype(DATE_DTYPE) == arithmetic).all():
+        raise SystemExit("month_start differs from pd.to_datetime")
+    print(f"\nDates for {n:,} rows: pd.to_datetime {assembled_s:.4f} s, "
+          f"month arithmetic {arithmetic_s:.4f} s ({assembled_s / arithmetic_s:.0f}x)")
+
+
+def main(argv=None):
+    from store import TABLES
+    parser = argparse.ArgumentParser(description="Memory and load time with and without the schema types")
+    parser.add_argument('--scale', type=int, default=1, help="copies of each table in the benchmark")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    benchmark(TABLES, args.scale, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
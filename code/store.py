@@ -0,0 +1,223 @@
+"""
+Columnar store for the cleaned datasets.
+
+Each clean table is also written as a Parquet dataset partitioned by year
+(2026csv/parquet/<table>/year=YYYY/*.parquet) with the column types of
+schema.py: int16/int8 keys, int32 counts, float32 measures, dictionary
+encoded station/nationality and a native date32 date column.
+Readers ask for the columns and year range they need, and only the matching
+partitions and columns are read from disk.
+
+Usage:
+    python store.py                     # build the store from the clean CSV files
+    python store.py --benchmark         # CSV vs Parquet load times
+    python store.py --benchmark --scale 1000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+import schema
+
+CSV_DIR = os.path.join(os.path.dirname(__file__), '..', '2026csv')
+STORE_DIR = os.path.join(CSV_DIR, 'parquet')
+
+TABLES = ['passengers_clean', 'passengers_by_nationality', 'weather_clean']
+
+COLUMN_TYPES = schema.arrow_types()
+
+# The IMO export has one decimal, float32 values are rounded back to it on widen()
+FLOAT_DECIMALS = 1
+
+PARTITIONING = ds.partitioning(pa.schema([('year', COLUMN_TYPES['year'])]), flavor='hive')
+
+
+def table_path(name, store_dir=None):
+    # STORE_DIR is looked up on every call, so tests can point the store elsewhere
+    return os.path.join(store_dir or STORE_DIR, name)
+
+
+def has_table(name, store_dir=None):
+    return os.path.isdir(table_path(name, store_dir))
+
+
+def drop_table(name, store_dir=None):
+    """Remove a stored table, so load_table() reads its CSV again."""
+    shutil.rmtree(table_path(name, store_dir), ignore_errors=True)
+
+
+def to_arrow(df):
+    # Cast to the store types, columns not in COLUMN_TYPES keep the inferred type
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(schema):
+        if field.name in COLUMN_TYPES:
+            schema = schema.set(i, pa.field(field.name, COLUMN_TYPES[field.name]))
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def write_table(df, name, append=False, store_dir=None):
+    """
+    Write df as a year-partitioned Parquet dataset.
+
+    With append=False the existing dataset is replaced. append=True adds new
+    files next to the existing ones, which lets a streaming writer emit one
+    chunk at a time.
+    """
+    path = table_path(name, store_dir)
+    if not append and os.path.isdir(path):
+        shutil.rmtree(path)
+    # Rows of one year must be contiguous, otherwise every run becomes its own row group;
+    # sorted on the month key inside a year so join.py can merge without sorting
+    df = df.sort_values([c for c in ('year', 'month') if c in df.columns], kind='stable')
+    ds.write_dataset(
+        to_arrow(df),
+        path,
+        format='parquet',
+        partitioning=PARTITIONING,
+        basename_template='part-' + uuid.uuid4().hex + '-{i}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+    )
+
+
+def write_years(df, name, years, store_dir=None):
+    """
+    Replace the partitions of years in a stored table with the rows of df for those years.
+
+    Other years are not touched, so an update of a few months rewrites only their years.
+    """
+    path = table_path(name, store_dir)
+    for year in years:
+        shutil.rmtree(os.path.join(path, f"year={int(year)}"), ignore_errors=True)
+    rows = df[df['year'].isin(list(years))]
+    if len(rows):
+        write_table(rows, name, append=True, store_dir=store_dir)
+
+
+def table_years(name, store_dir=None):
+    """Years of a stored table, from its partition directories (no data is read)."""
+    path = table_path(name, store_dir)
+    return sorted(int(entry[5:]) for entry in os.listdir(path)
+                  if entry.startswith('year=') and os.listdir(os.path.join(path, entry)))
+
+
+def year_filter(start_year=None, end_year=None):
+    expr = None
+    if start_year is not None:
+        expr = ds.field('year') >= start_year
+    if end_year is not None:
+        upper = ds.field('year') <= end_year
+        expr = upper if expr is None else expr & upper
+    return expr
+
+
+def read_table(name, columns=None, start_year=None, end_year=None, store_dir=None):
+    """
+    Read columns of a stored table for start_year..end_year (inclusive).
+
+    The year filter is applied to the partition paths, so other years are
+    never opened. Returns a DataFrame with the stored types (date as datetime64).
+    """
+    dataset = ds.dataset(table_path(name, store_dir), format='parquet', partitioning=PARTITIONING)
+    table = dataset.to_table(columns=columns, filter=year_filter(start_year, end_year))
+
+    # Partition column is read last, put the columns back in the written order
+    order = columns or [c['name'] for c in dataset.schema.pandas_metadata['columns']]
+    return schema.apply(table.to_pandas(date_as_object=False)[order])
+
+
+def read_csv_table(name, columns=None, start_year=None, end_year=None, csv_dir=CSV_DIR):
+    # Same result as read_table(), parsed from the clean CSV file
+    df = schema.read_csv(os.path.join(csv_dir, name + '.csv'), columns)
+    if start_year is not None:
+        df = df[df['year'] >= start_year]
+    if end_year is not None:
+        df = df[df['year'] <= end_year]
+    return df.reset_index(drop=True)
+
+
+def load_table(name, columns=None, start_year=None, end_year=None):
+    """Read a clean table from the columnar store, or from its CSV if not built yet."""
+    if has_table(name):
+        return widen(read_table(name, columns, start_year, end_year))
+    return widen(read_csv_table(name, columns, start_year, end_year))
+
+
+def widen(df):
+    # float32 -> float64 with the source precision, narrow ints -> int64 (for the analysis arithmetic)
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == np.float32:
+            df[col] = df[col].astype('float64').round(FLOAT_DECIMALS)
+        elif df[col].dtype in (np.int8, np.int16, np.int32):
+            df[col] = df[col].astype('int64')
+    return df
+
+
+def build_from_csv(names=TABLES, csv_dir=CSV_DIR, store_dir=None):
+    for name in names:
+        csv_file = os.path.join(csv_dir, name + '.csv')
+        if not os.path.exists(csv_file):
+            print(f"  skipped {name} (no {csv_file})")
+            continue
+        df = read_csv_table(name, csv_dir=csv_dir)
+        write_table(df, name, store_dir=store_dir)
+        print(f"  {name}: {len(df)} rows -> {table_path(name, store_dir)}")
+
+
+def scaled_copy(df, scale):
+    # Stack scale copies of df (same years, like more stations or nationalities)
+    return pd.concat([df] * scale, ignore_index=True)
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark(scale=1, repeat=5):
+    print(f"Load times, best of {repeat} (scale {scale}x)")
+    print(f"{'table':<28}{'rows':>10}{'csv':>10}{'parquet':>10}{'1 col, 1 yr':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in TABLES:
+            if not os.path.exists(os.path.join(CSV_DIR, name + '.csv')):
+                continue
+            df = scaled_copy(read_csv_table(name), scale)
+            df.to_csv(os.path.join(tmp, name + '.csv'), index=False)
+            write_table(df, name, store_dir=tmp)
+
+            last_col = df.columns[-1]
+            year = int(df['year'].iloc[len(df) // 2])
+            csv_s = best_time(lambda: read_csv_table(name, csv_dir=tmp), repeat)
+            parquet_s = best_time(lambda: read_table(name, store_dir=tmp), repeat)
+            pruned_s = best_time(lambda: read_table(name, ['year', last_col], year, year, store_dir=tmp), repeat)
+            print(f"{name:<28}{len(df):>10}{csv_s:>10.4f}{parquet_s:>10.4f}{pruned_s:>13.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or benchmark the Parquet store")
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--scale', type=int, default=1, help="copies of each table in the benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.scale)
+    else:
+        print(f"Building columnar store in '{STORE_DIR}'")
+        build_from_csv()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+Partition checksums for the loaded tables.
+
+For every year (and every month inside it) a fingerprint is computed:
+the row count, the sum of every column and an order-independent hash of
+the rows. The source side is one streaming pass over the row tuples, the
+database side is one GROUP BY year query. Years that differ are drilled
+down with one GROUP BY year, month query restricted to those years, so the
+full table is never pulled back.
+
+Row hash: all values are mapped to integers (floats scaled by FLOAT_SCALE,
+dates as days since 1970-01-01), combined with the (year, month) key into
+x = (key*KEY_WEIGHT + sum(value*WEIGHT)) mod M and hashed as x*x mod M.
+The partition hash is the sum of row hashes mod M, so row order does not
+matter but moving a value to another month does. Everything stays below
+2**63, so SQL Server (BIGINT) and SQLite compute the same numbers as Python.
+
+Usage:
+    python verify.py                    # compare the clean CSV files with Azure SQL
+    python verify.py --sqlite test.db   # ... with a local SQLite file
+"""
+
+import argparse
+import math
+from datetime import date
+
+from load_to_azure import TABLE_COLUMNS
+
+MODULUS = 2147483647
+KEY_WEIGHT = 999983
+WEIGHTS = [1000003, 1000033, 1000037, 1000039, 1000081, 1000099, 1000117, 1000121]
+FLOAT_SCALE = 10
+NULL_HASH_VALUE = MODULUS - 1
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+# ---------- source side ----------
+
+def to_int(value, sql_type):
+    """Integer used for sums and hashing, or None for a missing value."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if sql_type == 'DATE':
+        if isinstance(value, str):
+            value = date.fromisoformat(value[:10])
+        return value.toordinal() - EPOCH_ORDINAL
+    if sql_type == 'FLOAT':
+        # Half-away-from-zero like SQL ROUND (Python's round() rounds half to even)
+        scaled = value * FLOAT_SCALE
+        return int(math.floor(scaled + 0.5)) if scaled >= 0 else -int(math.floor(-scaled + 0.5))
+    return int(value)
+
+
+def row_hash(key, ints):
+    x = key % MODULUS * KEY_WEIGHT % MODULUS
+    for value, weight in zip(ints, WEIGHTS):
+        if value is None:
+            value = NULL_HASH_VALUE
+        x += value % MODULUS * weight % MODULUS
+    x %= MODULUS
+    return x * x % MODULUS
+
+
+def empty_fingerprint(n_columns):
+    return {'rows': 0, 'sums': [0] * n_columns, 'hash': 0}
+
+
+def add_row(fp, ints, h):
+    fp['rows'] += 1
+    for i, value in enumerate(ints):
+        if value is not None:
+            fp['sums'][i] += value
+    fp['hash'] = (fp['hash'] + h) % MODULUS
+
+
+def fingerprinted(table, rows, by_year, by_month):
+    """
+    Yield row tuples (TABLE_COLUMNS order) unchanged while fingerprinting them.
+
+    by_year / by_month are filled in as {year: fingerprint} and
+    {(year, month): fingerprint}, so a loader gets the source checksums from
+    the same pass that inserts the rows.
+    """
+    types = [sql_type for _, sql_type in TABLE_COLUMNS[table]]
+    for row in rows:
+        ints = [to_int(value, sql_type) for value, sql_type in zip(row, types)]
+        year, month = ints[0], ints[1]
+        h = row_hash(year * 12 + month - 1, ints)
+        if year not in by_year:
+            by_year[year] = empty_fingerprint(len(types))
+        if (year, month) not in by_month:
+            by_month[(year, month)] = empty_fingerprint(len(types))
+        add_row(by_year[year], ints, h)
+        add_row(by_month[(year, month)], ints, h)
+        yield row
+
+
+def source_fingerprints(table, rows):
+    """One pass over row tuples, returns ({year: fingerprint}, {(year, month): fingerprint})."""
+    by_year = {}
+    by_month = {}
+    for _ in fingerprinted(table, rows, by_year, by_month):
+        pass
+    return by_year, by_month
+
+
+# ---------- database side ----------
+
+def int_expr(column, sql_type, sqlite=False):
+    # SQL version of to_int()
+    if sql_type == 'DATE':
+        if sqlite:
+            return f"CAST(julianday({column}) - 2440587.5 AS INTEGER)"
+        return f"CAST(DATEDIFF(day, '1970-01-01', {column}) AS BIGINT)"
+    if sql_type == 'FLOAT':
+        if sqlite:
+            return f"CAST(ROUND({column} * {FLOAT_SCALE}) AS INTEGER)"
+        return f"CAST(ROUND({column} * {FLOAT_SCALE}, 0) AS BIGINT)"
+    return f"CAST({column} AS BIGINT)"
+
+
+def hash_expr(table, sqlite=False):
+    # SQL version of row_hash(); % can be negative in SQL, so normalise with + M
+    m = MODULUS
+    terms = [f"(CAST(year AS BIGINT) * 12 + month - 1) % {m} * {KEY_WEIGHT} % {m}"]
+    for (column, sql_type), weight in zip(TABLE_COLUMNS[table], WEIGHTS):
+        value = f"COALESCE({int_expr(column, sql_type, sqlite)}, {NULL_HASH_VALUE})"
+        terms.append(f"(({value} % {m}) + {m}) % {m} * {weight} % {m}")
+    x = f"(({' + '.join(terms)}) % {m})"
+    return f"{x} * {x} % {m}"
+
+
+def fingerprint_sql(table, sqlite=False, by_month=False, years=None):
+    group = 'year, month' if by_month else 'year'
+    sums = [f"SUM({int_expr(column, sql_type, sqlite)})" for column, sql_type in TABLE_COLUMNS[table]]
+    where = ''
+    if years:
+        where = f"WHERE year IN ({', '.join(str(int(y)) for y in years)})"
+    return (f"SELECT {group}, COUNT(*), {', '.join(sums)}, SUM({hash_expr(table, sqlite)}) % {MODULUS} "
+            f"FROM {table} {where} GROUP BY {group}")
+
+
+def db_fingerprints(cursor, table, sqlite=False, by_month=False, years=None):
+    """{year: fingerprint} or {(year, month): fingerprint} from one aggregated query."""
+    cursor.execute(fingerprint_sql(table, sqlite, by_month, years))
+    n_key = 2 if by_month else 1
+    result = {}
+    for row in cursor.fetchall():
+        key = (int(row[0]), int(row[1])) if by_month else int(row[0])
+        result[key] = {
+            'rows': int(row[n_key]),
+            'sums': [int(s) if s is not None else 0 for s in row[n_key + 1:-1]],
+            'hash': int(row[-1]),
+        }
+    return result
+
+
+# ---------- comparison ----------
+
+def differences(source, db):
+    """[(partition, problem)] for partitions whose fingerprints differ."""
+    problems = []
+    for key in sorted(set(source) | set(db)):
+        src = source.get(key)
+        got = db.get(key)
+        if src is None:
+            problems.append((key, f"only in database ({got['rows']} rows)"))
+        elif got is None:
+            problems.append((key, f"missing in database ({src['rows']} rows)"))
+        elif src != got:
+            parts = []
+            if src['rows'] != got['rows']:
+                parts.append(f"rows {src['rows']} != {got['rows']}")
+            if src['sums'] != got['sums']:
+                parts.append("sums differ")
+            if src['hash'] != got['hash']:
+                parts.append("row hash differs")
+            problems.append((key, ', '.join(parts)))
+    return problems
+
+
+def verify_table(cursor, table, src_years, src_months, sqlite=False):
+    """
+    Compare source fingerprints with the loaded table, print the result.
+
+    Returns True when every year matches.
+    """
+    db_years = db_fingerprints(cursor, table, sqlite)
+
+    total_src = sum(fp['rows'] for fp in src_years.values())
+    total_db = sum(fp['rows'] for fp in db_years.values())
+    print(f"\n{table}: {total_src} rows in source, {total_db} rows in database, "
+          f"{len(src_years)} years")
+
+    bad_years = differences(src_years, db_years)
+    if not bad_years:
+        print("  ✓ all years match (count, sums, row hash)")
+        return True
+
+    years = [year for year, _ in bad_years]
+    db_months = db_fingerprints(cursor, table, sqlite, by_month=True, years=years)
+    src_months = {key: fp for key, fp in src_months.items() if key[0] in years}
+    for (year, month), problem in differences(src_months, db_months):
+        print(f"  ❌ {year}-{month:02d}: {problem}")
+    for year, problem in bad_years:
+        print(f"  ❌ {year}: {problem}")
+    return False
+
+
+def verify_months(cursor, table, src_months, sqlite=False, removed=()):
+    """
+    Compare only the months in src_months with the loaded table (after a delta load).
+
+    removed are (year, month) keys the delta deleted; they must have no rows
+    left unless the delta also reloaded them. Returns True when every one of
+    those months matches.
+    """
+    months = set(src_months) | {tuple(key) for key in removed}
+    years = sorted({year for year, _ in months})
+    db_months = db_fingerprints(cursor, table, sqlite, by_month=True, years=years) if years else {}
+    db_months = {key: fp for key, fp in db_months.items() if key in months}
+    print(f"\n{table}: {sum(fp['rows'] for fp in src_months.values())} delta rows in {len(src_months)} months, "
+          f"{len(months) - len(src_months)} removed months")
+
+    problems = differences(src_months, db_months)
+    if not problems:
+        print("  ✓ all delta months match (count, sums, row hash)")
+        return True
+    for (year, month), problem in problems:
+        print(f"  ❌ {year}-{month:02d}: {problem}")
+    return False
+
+
+def main(argv=None):
+    import os
+    from load_to_azure import connect, read_rows
+
+    parser = argparse.ArgumentParser(description="Compare the clean data with the loaded tables per year/month")
+    parser.add_argument('--sqlite', metavar='PATH', help="check a local SQLite file instead of Azure SQL")
+    parser.add_argument('--source', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--csv-dir', default=os.path.join(os.path.dirname(__file__), '..', '2026csv'))
+    args = parser.parse_args(argv)
+
+    conn = connect(args.sqlite)
+    cursor = conn.cursor()
+    all_passed = True
+    for table in TABLE_COLUMNS:
+        src_years, src_months = source_fingerprints(table, read_rows(table, args.source, args.csv_dir))
+        all_passed &= verify_table(cursor, table, src_years, src_months, sqlite=bool(args.sqlite))
+    cursor.close()
+    conn.close()
+
+    print("\n✓ ALL PARTITIONS MATCH" if all_passed else "\n✗ SOME PARTITIONS DIFFER")
+    raise SystemExit(0 if all_passed else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Single entry point for the cleaning, analysis and loading scripts.
+
+At start-up only argparse is imported. Each subcommand imports its script
+when it runs. The scripts import their heavy modules only on the code paths
+that use them:
+
+- analyze: matplotlib/seaborn only for figures, sklearn only for --features
+- load/verify: dotenv and pyodbc only when connecting to Azure, and no
+  pandas unless reading the Parquet store
+
+`vg.py startup` guards the start-up cost. It imports each subcommand's
+modules in a fresh interpreter with `python -X importtime`, then checks the
+import time against a budget and checks that no module on the command's
+deny list was loaded. It exits with 1 if either check fails, so a scheduled
+job or CI step can run it.
+
+Usage:
+    python vg.py clean                      # passengers and weather
+    python vg.py clean passengers
+    python vg.py clean weather --stations 1,422
+    python vg.py analyze --no-plots         # arguments after the subcommand go to the script
+    python vg.py load --sqlite test.db
+    python vg.py verify --sqlite test.db
+    python vg.py startup                    # import time of every subcommand vs its budget
+    python vg.py startup --repeat 5
+"""
+
+import argparse
+import os
+import sys
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Per subcommand: (modules it imports, import budget in ms, modules it must not load)
+PLOTTING = ['matplotlib', 'seaborn', 'sklearn', 'scipy']
+DATABASE = ['dotenv', 'pyodbc']
+STARTUP = {
+    'vg': (['vg'], 50, ['numpy', 'pandas', 'pyarrow'] + PLOTTING + DATABASE),
+    'clean': (['cleanPassengers', 'cleanWeather'], 1200, PLOTTING + DATABASE),
+    'analyze': (['analasys'], 1200, PLOTTING + DATABASE),
+    'load': (['load_to_azure'], 100, ['numpy', 'pandas', 'pyarrow'] + PLOTTING + DATABASE),
+    'verify': (['verify'], 100, ['numpy', 'pandas', 'pyarrow'] + PLOTTING + DATABASE),
+}
+
+
+def run_clean(argv):
+    target = argv[0] if argv and argv[0] in ('passengers', 'weather') else None
+    if target is None and argv:
+        raise SystemExit("usage: vg.py clean [passengers | weather [cleanWeather.py arguments]]")
+    if target in (None, 'passengers'):
+        import cleanPassengers
+        cleanPassengers.main(argv[1:])
+    if target in (None, 'weather'):
+        import cleanWeather
+        cleanWeather.main(argv[1:])
+
+
+def run_analyze(argv):
+    import analasys
+    analasys.main(argv)
+
+
+def run_load(argv):
+    import load_to_azure
+    load_to_azure.main(argv)
+
+
+def run_verify(argv):
+    import verify
+    verify.main(argv)
+
+
+# ---------- start-up budget ----------
+
+def import_time(modules):
+    """(total ms, names of every module loaded) for importing modules in a fresh interpreter."""
+    import subprocess
+    code = '; '.join('import ' + m for m in modules)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=CODE_DIR, capture_output=True, text=True, check=True)
+    total_us = 0
+    loaded = set()
+    # Lines look like "import time:  self [us] | cumulative | <indent>name"
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        loaded.add(name.strip())
+        if len(name) - len(name.lstrip()) == 1:
+            # top-level import, its cumulative time includes everything below it
+            total_us += int(cumulative)
+    return total_us / 1000, loaded
+
+
+def check_startup(repeat=3, commands=None):
+    failed = False
+    print(f"{'command':<10}{'import ms':>11}{'budget ms':>11}  heavy modules loaded")
+    for command in commands or STARTUP:
+        modules, budget, denied = STARTUP[command]
+        runs = [import_time(modules) for _ in range(repeat)]
+        best = min(ms for ms, _ in runs)
+        heavy = sorted(m for m in denied if m in runs[0][1])
+        ok = best <= budget and not heavy
+        failed |= not ok
+        print(f"{command:<10}{best:>11.0f}{budget:>11}  {', '.join(heavy) or '-'}{'' if ok else '   FAILED'}")
+    print("\nStart-up within budget" if not failed else "\nStart-up budget exceeded")
+    return not failed
+
+
+def run_startup(argv):
+    parser = argparse.ArgumentParser(prog='vg.py startup', description="Check the import time of each subcommand")
+    parser.add_argument('commands', nargs='*', metavar='COMMAND',
+                        help="subcommands to check: " + ', '.join(STARTUP) + " (default: all)")
+    parser.add_argument('--repeat', type=int, default=3, help="fresh interpreters per command, best time counts")
+    args = parser.parse_args(argv)
+    unknown = [c for c in args.commands if c not in STARTUP]
+    if unknown:
+        parser.error("unknown command: " + ', '.join(unknown))
+    raise SystemExit(0 if check_startup(args.repeat, args.commands) else 1)
+
+
+COMMANDS = {
+    'clean': (run_clean, "clean the raw passenger and/or weather exports"),
+    'analyze': (run_analyze, "statistics and figures (analasys.py)"),
+    'load': (run_load, "load the clean tables into Azure SQL or SQLite (load_to_azure.py)"),
+    'verify': (run_verify, "compare the loaded tables with the clean data (verify.py)"),
+    'startup': (run_startup, "import-time budget of every subcommand"),
+}
+
+
+def main(argv=None):
+    commands = '\n'.join(f"  {name:<10}{help_text}" for name, (_, help_text) in COMMANDS.items())
+    parser = argparse.ArgumentParser(description="Tourism and weather data pipeline",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog="commands:\n" + commands +
+                                            "\n\nRun 'vg.py COMMAND --help' for the options of a command.")
+    parser.add_argument('command', choices=list(COMMANDS), metavar='COMMAND')
+    # The script parses its own arguments, everything after the command is passed on
+    parser.add_argument('args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    COMMANDS[args.command][0](args.args)
+
+
+if __name__ == '__main__':
+    main()
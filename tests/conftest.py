@@ -0,0 +1,17 @@
+import os
+import sys
+
+# The scripts in code/ import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'code'))
+
+import pytest  # noqa: E402
+
+import store  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    # Tables written by a test go to its own Parquet store, never to 2026csv/parquet
+    path = tmp_path / 'parquet'
+    monkeypatch.setattr(store, 'STORE_DIR', str(path))
+    return path
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import archive
+
+
+def records(stations, years, months=range(1, 13), offset=0.0):
+    # Raw dump rows: every archive column gets a value derived from its key
+    rows = []
+    for station in stations:
+        for year in years:
+            for month in months:
+                base = station / 10 + (year - 2000) + month / 100 + offset
+                rows.append([station, year, month] + [round(base + j, 1) for j in range(len(archive.COLUMNS))])
+    return pd.DataFrame(rows, columns=archive.KEYS + archive.COLUMNS)
+
+
+def write_dump(path, df):
+    # vedur.csv layout: comma separated, header on the first line
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def built(tmp_path):
+    dump = records([1, 422], [2000, 2001])
+    path = str(tmp_path / 'archive')
+    assert archive.build(write_dump(tmp_path / 'vedur.csv', dump), path, chunksize=10) == len(dump)
+    return path, dump
+
+
+def expected_series(df, station, column):
+    rows = df[df['stöð'] == station].sort_values(['ár', 'mán'])
+    return rows[column].to_numpy(dtype=np.float32)
+
+
+def test_build_and_read_back(built):
+    path, dump = built
+    a = archive.Archive(path)
+    assert list(a.stations) == [1, 422]
+    assert a.capacity == 16
+    assert (a.first_month, a.last_month) == ((2000, 1), (2001, 12))
+    for station in (1, 422):
+        for column in ('t', 'sun', 'f'):
+            np.testing.assert_array_equal(a.series(station, column), expected_series(dump, station, column))
+    np.testing.assert_array_equal(a.series(422, 'mean_temp', 2001, 2001), expected_series(dump, 422, 't')[12:])
+    july = dump[(dump['ár'] == 2001) & (dump['mán'] == 7)].sort_values('stöð')
+    np.testing.assert_array_equal(a.cross_section(2001, 7, 'tx'), july['tx'].to_numpy(dtype=np.float32))
+    assert a.frame(1, ['t']).shape == (24, 3)
+
+
+def test_append_revises_in_place_and_extends(built, tmp_path):
+    path, dump = built
+    size = (tmp_path / 'archive' / 't.f32').stat().st_size
+    revised = records([422], [2001], months=[3], offset=100)
+    new = records([1, 422], [2002], months=[1, 2])
+    months, written = archive.append(pd.concat([revised, new], ignore_index=True), path)
+    assert (months, written) == (2, 5)
+
+    a = archive.Archive(path)
+    assert a.last_month == (2002, 2)
+    assert (tmp_path / 'archive' / 't.f32').stat().st_size == size + 2 * a.capacity * 4
+    assert a.series(422, 't')[14] == np.float32(revised['t'].iloc[0])
+    # Everything else of the old months is untouched
+    before = expected_series(dump, 422, 't')
+    np.testing.assert_array_equal(np.delete(a.series(422, 't')[:24], 14), np.delete(before, 14))
+    np.testing.assert_array_equal(a.series(1, 't')[:24], expected_series(dump, 1, 't'))
+    np.testing.assert_array_equal(a.cross_section(2002, 2, 't'), new[new['mán'] == 2]['t'].to_numpy(np.float32))
+
+
+def test_append_skipping_months_leaves_nan(built):
+    path, _ = built
+    archive.append(records([1], [2002], months=[4]), path)
+    a = archive.Archive(path)
+    assert a.last_month == (2002, 4)
+    assert np.isnan(a.series(1, 't')[24:27]).all()
+    assert np.isnan(a.series(422, 't')[24:]).all()
+
+
+def test_new_station_takes_a_free_slot(built):
+    path, dump = built
+    archive.append(records([7], [2001], months=[6]), path)
+    a = archive.Archive(path)
+    assert list(a.stations) == [1, 422, 7]
+    series = a.series(7, 't')
+    assert np.isnan(series[:17]).all() and not np.isnan(series[17]) and np.isnan(series[18:]).all()
+    assert len(a.cross_section(2001, 6, 't')) == 3
+    # The other stations' slots are unchanged
+    june = dump[(dump['ár'] == 2001) & (dump['mán'] == 6)].sort_values('stöð')
+    np.testing.assert_array_equal(a.cross_section(2001, 6, 't')[:2], june['t'].to_numpy(dtype=np.float32))
+
+
+def test_station_beyond_capacity_raises(built, tmp_path):
+    path, _ = built
+    before = {f.name: f.read_bytes() for f in (tmp_path / 'archive').iterdir()}
+    with pytest.raises(ValueError, match="17 stations do not fit the 16 slots"):
+        archive.append(records(range(100, 115), [2001], months=[1]), path)
+    # Nothing was written
+    assert {f.name: f.read_bytes() for f in (tmp_path / 'archive').iterdir()} == before
+    archive.append(records(range(100, 114), [2001], months=[1]), path)
+    assert len(archive.Archive(path).stations) == 16
+
+
+def test_month_before_the_archive_raises(built):
+    path, _ = built
+    with pytest.raises(ValueError, match="before 2000-01 need a rebuild"):
+        archive.append(records([1], [1999], months=[12]), path)
+    a = archive.Archive(path)
+    with pytest.raises(IndexError):
+        a.cross_section(1999, 12, 't')
+    with pytest.raises(KeyError):
+        a.series(5, 't')
+
+
+def test_matrix_on_a_month_axis(built):
+    path, dump = built
+    a = archive.Archive(path)
+    keys = np.array([1999 * 12 + 11, 2000 * 12, 2001 * 12 + 11, 2002 * 12])
+    m = a.matrix(422, ['mean_temp', 'precipitation'], keys)
+    assert np.isnan(m[[0, 3]]).all()
+    row = dump[(dump['stöð'] == 422) & (dump['ár'] == 2000) & (dump['mán'] == 1)]
+    np.testing.assert_array_equal(m[1], row[['t', 'r']].to_numpy(dtype=float)[0])
@@ -0,0 +1,62 @@
+import shutil
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import backends
+import load_to_azure
+import store
+
+TABLES = ['Passengers', 'Weather']
+
+
+def sqlite_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+@pytest.fixture
+def loader_columns():
+    # Columns of the tables load_to_azure.py creates
+    conn = sqlite3.connect(':memory:')
+    load_to_azure.create_tables(conn, conn.cursor(), sqlite=True)
+    columns = {table: sqlite_columns(conn, table) for table in TABLES}
+    conn.close()
+    return columns
+
+
+@pytest.fixture(params=['sqlite', 'duckdb'])
+def backend(request, tmp_path):
+    if request.param == 'duckdb':
+        pytest.importorskip('duckdb')
+    backend = backends.open_backend(f"{request.param}:{tmp_path / ('vg.' + request.param)}")
+    yield backend
+    backend.close()
+
+
+def test_schema_matches_the_loader(backend, loader_columns):
+    backend.create_tables()
+    for table in TABLES:
+        columns = backend.query(f"SELECT * FROM {table} LIMIT 0").columns
+        assert list(columns) == loader_columns[table]
+
+
+def test_load_from_a_path_with_a_quote(backend, tmp_path):
+    csv_dir = tmp_path / "it's here"
+    csv_dir.mkdir()
+    for name in ('passengers_clean', 'weather_clean'):
+        shutil.copy(f"{store.CSV_DIR}/{name}.csv", csv_dir)
+
+    backend.create_tables()
+    for table in TABLES:
+        expected = len(pd.read_csv(csv_dir / (load_to_azure.TABLE_SOURCES[table][0] + '.csv')))
+        assert backend.bulk_load(table, 'csv', str(csv_dir)) == expected
+    ids = backend.query("SELECT id FROM Weather ORDER BY id")['id']
+    assert list(ids) == list(range(1, len(ids) + 1))
+
+
+def test_unique_month_key(backend):
+    backend.create_tables()
+    backend.execute("INSERT INTO Passengers (year, month, date, passengers) VALUES (2020, 1, '2020-01-01', 5)")
+    with pytest.raises(Exception, match='(?i)unique|constraint|duplicate'):
+        backend.execute("INSERT INTO Passengers (year, month, date, passengers) VALUES (2020, 1, '2020-01-01', 6)")
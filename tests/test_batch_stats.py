@@ -0,0 +1,81 @@
+import warnings
+
+import numpy as np
+import pytest
+from scipy import stats
+
+import batch_stats
+
+STATS = ['r', 'p', 'slope', 'intercept']
+
+
+def reference(x, y):
+    # scipy.stats.pearsonr and np.polyfit on one group, NaN where they have no answer
+    if len(x) < 2 or np.ptp(x) == 0:
+        return [np.nan] * 4
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', stats.ConstantInputWarning)
+        r, p = stats.pearsonr(x, y)
+    slope, intercept = np.polyfit(x, y, 1)
+    return [r, p, slope, intercept]
+
+
+def make_groups(sizes, seed=0):
+    # sizes: {label: (rows, kind)}; x holds 3 columns at the 0.1 resolution of the weather data
+    rng = np.random.default_rng(seed)
+    xs, ys, groups = [], [], []
+    for label, (rows, kind) in sizes.items():
+        x = rng.normal(5, 4, (rows, 3)).round(1)
+        y = (x @ [3.0, -1.0, 0.5] + rng.normal(0, 2, rows)).round(1)
+        if kind == 'constant_x':
+            x[:, 0] = 2.7
+            x[:, 2] = 0.1
+        elif kind == 'constant_y':
+            y[:] = 12.35
+        xs.append(x)
+        ys.append(y)
+        groups += [label] * rows
+    return np.vstack(xs), np.concatenate(ys), np.array(groups)
+
+
+CASES = {
+    'many rows': {'a': (132, None), 'b': (40, None), 'c': (3, None)},
+    'constant x': {'a': (7, 'constant_x'), 'b': (11, 'constant_x'), 'c': (30, None)},
+    'constant y': {'a': (9, 'constant_y'), 'b': (12, None)},
+    'n <= 2': {'a': (1, None), 'b': (2, None), 'c': (2, 'constant_x'), 'd': (5, None)},
+    'mixed': {'a': (1, None), 'b': (2, None), 'c': (13, 'constant_x'), 'd': (8, 'constant_y'), 'e': (60, None)},
+}
+
+
+@pytest.mark.parametrize('source', ['pearson', 'from_sums'])
+@pytest.mark.parametrize('case', list(CASES))
+def test_matches_pearsonr_and_polyfit(case, source):
+    x, y, groups = make_groups(CASES[case])
+    if source == 'pearson':
+        labels, result = batch_stats.pearson(x, y, groups)
+    else:
+        labels, codes = np.unique(groups, return_inverse=True)
+        sums = [np.bincount(codes, weights=w, minlength=len(labels)) for w in (y, y * y)]
+        result = {name: np.empty((len(labels), x.shape[1])) for name in ['n'] + STATS}
+        for j in range(x.shape[1]):
+            column = batch_stats.from_sums(
+                np.bincount(codes), np.bincount(codes, weights=x[:, j]), sums[0],
+                np.bincount(codes, weights=x[:, j] ** 2), sums[1], np.bincount(codes, weights=x[:, j] * y))
+            for name in result:
+                result[name][:, j] = column[name]
+
+    assert list(labels) == sorted(CASES[case])
+    for g, label in enumerate(labels):
+        rows = groups == label
+        assert (result['n'][g] == rows.sum()).all()
+        for j in range(x.shape[1]):
+            expected = reference(x[rows, j], y[rows])
+            actual = [result[name][g, j] for name in STATS]
+            np.testing.assert_allclose(actual, expected, rtol=1e-7, atol=1e-9, err_msg=f"group {label}, x{j}")
+
+
+def test_single_group():
+    x, y, _ = make_groups({'a': (50, None)})
+    labels, result = batch_stats.pearson(x[:, 1], y)
+    assert list(labels) == [0] and result['r'].shape == (1, 1)
+    np.testing.assert_allclose([result[name][0, 0] for name in STATS], reference(x[:, 1], y), rtol=1e-9)
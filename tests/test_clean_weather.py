@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import cleanWeather
+import store
+
+WEATHER = os.path.join(os.path.dirname(__file__), '..', 'weather.txt')
+
+
+@pytest.fixture
+def output(tmp_path, store_dir):
+    # The store_dir fixture keeps the table out of 2026csv/parquet
+    name = 'test_weather'
+    return str(tmp_path / (name + '.csv')), name
+
+
+def test_parquet_run_writes_the_store(output):
+    path, name = output
+    total, _, _ = cleanWeather.clean_weather(WEATHER, path, start_year=2015, end_year=2016)
+    assert total == 24
+    assert store.has_table(name)
+    assert store.table_years(name) == [2015, 2016]
+
+
+def test_no_parquet_run_drops_the_stale_store(output):
+    path, name = output
+    cleanWeather.clean_weather(WEATHER, path, start_year=2015, end_year=2016)
+    cleanWeather.clean_weather(WEATHER, path, start_year=2017, end_year=2017, parquet=False)
+
+    assert not store.has_table(name)
+    df = store.read_csv_table(name, csv_dir=os.path.dirname(path))
+    assert sorted(df['year'].unique()) == [2017]
+
+
+def test_run_without_matching_rows_drops_the_stale_store(output):
+    path, name = output
+    cleanWeather.clean_weather(WEATHER, path, start_year=2015, end_year=2016)
+    total, first, last = cleanWeather.clean_weather(WEATHER, path, stations=[999999])
+
+    assert (total, first, last) == (0, None, None)
+    assert not store.has_table(name)
+    assert open(path).read().startswith('year,month,date,')
@@ -0,0 +1,175 @@
+import pandas as pd
+import pytest
+
+import delta
+
+TOTAL = 'Útlendingar alls'
+MONTHS = [f"2015M{m:02d}" for m in range(1, 7)]
+WEATHER_HEADER = ['stöð', 'ár', 'mán', 't', 'tx', 'tn', 'r', 'sun', 'rh', 'f', 'p']
+
+
+def write_passengers(path, values):
+    # values: {nationality: {month column: count}}, in the Hagstofa layout (title, blank line, ';' header)
+    columns = sorted({c for row in values.values() for c in row})
+    lines = ['"Farþegar um Keflavíkurflugvöll"', '', ';'.join(['"Ríkisfang"'] + [f'"{c}"' for c in columns])]
+    for name, row in values.items():
+        lines.append(';'.join([f'"{name}"'] + [str(row.get(c, '..')) for c in columns]))
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8-sig')
+
+
+def write_weather(path, rows):
+    # rows: {(station, year, month): mean temperature}, in the IMO layout (title, tab separated header)
+    lines = ['Mánaðarmeðaltöl', '\t'.join(WEATHER_HEADER)]
+    for (station, year, month), t in sorted(rows.items()):
+        lines.append('\t'.join(map(str, [station, year, month, t, t + 3, t - 3, 80.5, 40.1, 85, 5.2, 1001.3])))
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+def passengers_v1():
+    return {TOTAL: {c: 40_000 + 1000 * i for i, c in enumerate(MONTHS)},
+            'Bretland': {c: 5_000 + 100 * i for i, c in enumerate(MONTHS)}}
+
+
+def weather_v1():
+    return {(station, 2015, m): round(0.5 * m + station / 100, 1) for station in (1, 422) for m in range(1, 7)}
+
+
+@pytest.fixture
+def export(tmp_path):
+    paths = {'passengers': tmp_path / 'farþegar.csv', 'weather': tmp_path / 'weather.txt',
+             'snapshot': tmp_path / 'snapshots', 'delta': tmp_path / 'delta'}
+    write_passengers(paths['passengers'], passengers_v1())
+    write_weather(paths['weather'], weather_v1())
+    return paths
+
+
+def detect(paths):
+    snapshot = delta.load_snapshot(str(paths['snapshot']))
+    return (delta.detect_passengers(str(paths['passengers']), snapshot),
+            delta.detect_weather(str(paths['weather']), snapshot))
+
+
+def ingest(paths):
+    # detect + write the delta + save the snapshot, like delta.py without merging into 2026csv
+    passengers, weather = detect(paths)
+    tables = delta.clean_tables(passengers, weather)
+    merged = delta.write_delta(passengers, weather, tables, str(paths['delta']))
+    delta.save_snapshot(passengers, weather, str(paths['snapshot']))
+    return passengers, weather, tables, merged
+
+
+def test_first_run_sees_everything_as_new(export):
+    passengers, weather = detect(export)
+    assert len(passengers['new']) == 12 and passengers['changed_columns'] == 6
+    assert len(weather['new']) == 12
+    for result in (passengers, weather):
+        assert len(result['revised']) == 0 and len(result['removed']) == 0
+    tables = delta.clean_tables(passengers, weather)
+    assert len(tables['passengers_clean'][0]) == 6
+    # Default clean weather is station 1 only
+    assert len(tables['weather_clean'][0]) == 6
+
+
+def test_unchanged_export_has_no_delta(export):
+    ingest(export)
+    passengers, weather = detect(export)
+    assert passengers['changed_columns'] == 0
+    for result in (passengers, weather):
+        assert len(result['rows']) == len(result['new']) == len(result['revised']) == len(result['removed']) == 0
+
+
+def test_restated_month_is_revised_only(export):
+    ingest(export)
+    values = passengers_v1()
+    values['Bretland']['2015M03'] += 7
+    values[TOTAL]['2015M07'] = 52_000
+    write_passengers(export['passengers'], values)
+    rows = weather_v1()
+    rows[(1, 2015, 2)] = 9.9
+    rows[(1, 2015, 7)] = 11.0
+    write_weather(export['weather'], rows)
+
+    passengers, weather = detect(export)
+    assert passengers['changed_columns'] == 2
+    assert delta.month_cells(passengers['revised']) == [(2015, 3)]
+    assert list(passengers['revised']['nationality']) == ['Bretland']
+    assert delta.month_cells(passengers['new']) == [(2015, 7)]
+    assert delta.month_cells(weather['revised']) == [(2015, 2)]
+    assert delta.month_cells(weather['new']) == [(2015, 7)]
+    assert len(passengers['removed']) == len(weather['removed']) == 0
+
+    tables = delta.clean_tables(passengers, weather)
+    # The total row did not change in March, so passengers_clean only gets July
+    assert delta.month_cells(tables['passengers_clean'][0]) == [(2015, 7)]
+    assert delta.month_cells(tables['weather_clean'][0]) == [(2015, 2), (2015, 7)]
+
+
+def test_dropped_cells_are_removed(export):
+    ingest(export)
+    values = passengers_v1()
+    del values['Bretland']['2015M06']
+    write_passengers(export['passengers'], values)
+    rows = weather_v1()
+    del rows[(422, 2015, 5)]
+    write_weather(export['weather'], rows)
+
+    passengers, weather = detect(export)
+    assert delta.month_cells(passengers['removed']) == [(2015, 6)]
+    assert list(passengers['removed']['nationality']) == ['Bretland']
+    assert weather['removed'][delta.WEATHER_KEYS].values.tolist() == [[422, 2015, 5]]
+    assert len(passengers['new']) == len(passengers['revised']) == len(weather['revised']) == 0
+
+
+def test_two_deltas_before_a_load_combine(export):
+    _, _, _, merged = ingest(export)
+    assert not merged
+
+    # Second export: March restated again, July new, station 1 June removed
+    values = passengers_v1()
+    values[TOTAL]['2015M03'] = 1
+    values[TOTAL]['2015M07'] = 52_000
+    write_passengers(export['passengers'], values)
+    rows = weather_v1()
+    del rows[(1, 2015, 6)]
+    write_weather(export['weather'], rows)
+    _, _, _, merged = ingest(export)
+    assert merged
+
+    manifest = delta.load_manifest(str(export['delta']))
+    assert not manifest['consumed']
+    assert manifest['passengers']['new'] == [[2015, m] for m in range(1, 8)]
+    assert manifest['passengers']['revised'] == [[2015, 3]]
+    assert manifest['weather']['removed'] == [[2015, 6]]
+
+    clean = pd.read_csv(export['delta'] / 'passengers_clean.csv')
+    assert clean['month'].tolist() == list(range(1, 8))
+    # The newer delta's value wins
+    assert clean.loc[clean['month'] == 3, 'passengers'].item() == 1
+    weather_clean = pd.read_csv(export['delta'] / 'weather_clean.csv')
+    # June was new in the first delta and removed in the second: only the removal is left
+    assert 6 not in weather_clean['month'].tolist()
+    assert manifest['tables']['weather_clean']['removed'] == [[2015, 6]]
+
+
+def test_consumed_delta_is_replaced(export):
+    ingest(export)
+    delta.mark_consumed(str(export['delta']))
+    assert delta.pending_manifest(str(export['delta'])) is None
+
+    values = passengers_v1()
+    values[TOTAL]['2015M07'] = 52_000
+    write_passengers(export['passengers'], values)
+    _, _, _, merged = ingest(export)
+    assert not merged
+    manifest = delta.load_manifest(str(export['delta']))
+    assert manifest['passengers']['new'] == [[2015, 7]]
+    assert pd.read_csv(export['delta'] / 'passengers_clean.csv')['month'].tolist() == [7]
+
+
+def test_combine_newer_rows_and_removals_win():
+    keys = ['year', 'month']
+    old = pd.DataFrame({'year': [2015, 2015, 2015], 'month': [1, 2, 3], 'passengers': [10, 20, 30]})
+    new = pd.DataFrame({'year': [2015, 2015], 'month': [2, 4], 'passengers': [21, 40]})
+    rows, removed = delta.combine(old, [[2015, 5], [2015, 4]], new, pd.DataFrame({'year': [2015], 'month': [3]}), keys)
+    assert rows.values.tolist() == [[2015, 1, 10], [2015, 2, 21], [2015, 4, 40]]
+    assert removed.values.tolist() == [[2015, 5], [2015, 3]]
@@ -0,0 +1,46 @@
+import pytest
+
+import analasys
+
+
+@pytest.fixture
+def figure_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(analasys, 'FIGURE_DIR', str(tmp_path))
+    monkeypatch.setattr(analasys, 'FIGURE_CACHE', str(tmp_path / '.figure_cache.json'))
+    return tmp_path
+
+
+def plot_v1(path, value):
+    with open(path, 'w') as f:
+        f.write(f"v1 {value}")
+
+
+def plot_v2(path, value):
+    with open(path, 'w') as f:
+        f.write(f"v2 {value}")
+
+
+def rendered(capsys):
+    return [line for line in capsys.readouterr().out.splitlines() if line.startswith('Saved')]
+
+
+def test_unchanged_figures_are_skipped(figure_dir, capsys):
+    analasys.render_figures([('a.png', plot_v1, {'value': 1}), ('b.png', plot_v1, {'value': 2})], jobs=1)
+    assert rendered(capsys) == ['Saved: a.png', 'Saved: b.png']
+
+    analasys.render_figures([('a.png', plot_v1, {'value': 1}), ('b.png', plot_v1, {'value': 3})], jobs=1)
+    assert rendered(capsys) == ['Saved: b.png']
+    analasys.render_figures([('a.png', plot_v1, {'value': 1})], jobs=1, force=True)
+    assert rendered(capsys) == ['Saved: a.png']
+
+
+def test_edited_plot_function_re_renders(figure_dir, capsys, monkeypatch):
+    analasys.render_figures([('a.png', plot_v1, {'value': 1})], jobs=1)
+    rendered(capsys)
+
+    # Same function name and inputs, different body
+    monkeypatch.setattr(plot_v2, '__name__', plot_v1.__name__)
+    assert analasys.task_hash(('a.png', plot_v1, {'value': 1})) != analasys.task_hash(('a.png', plot_v2, {'value': 1}))
+    analasys.render_figures([('a.png', plot_v2, {'value': 1})], jobs=1)
+    assert rendered(capsys) == ['Saved: a.png']
+    assert (figure_dir / 'a.png').read_text() == 'v2 1'
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import forecast
+
+
+def months_frame(start_year, years, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for year in range(start_year, start_year + years):
+        for month in range(1, 13):
+            weather = rng.normal([5, 9, 1, 80], [4, 4, 4, 30])
+            passengers = 100_000 + 8_000 * weather[0] + rng.normal(0, 5_000)
+            rows.append([year, month, round(passengers)] + weather.round(1).tolist())
+    return pd.DataFrame(rows, columns=['year', 'month', 'passengers'] + forecast.FEATURES)
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = tmp_path / 'model.json'
+    forecast.fit_frame(months_frame(2015, 2)).save(path)
+    return path
+
+
+def update(model_file, df, tmp_path):
+    path = tmp_path / 'update.csv'
+    df.to_csv(path, index=False)
+    forecast.main(['--model', str(model_file), 'update', '--input', str(path)])
+    return forecast.Forecaster.load(model_file)
+
+
+def test_update_matches_a_refit(model_file, tmp_path):
+    df = months_frame(2015, 3)
+    df.loc[5, 'passengers'] += 20_000          # a revised month
+    model = update(model_file, df, tmp_path)
+
+    refit = forecast.fit_frame(df)
+    assert model.n == refit.n == 36
+    np.testing.assert_allclose(model.beta, refit.beta, rtol=1e-9)
+    assert len(model.months) == len(model.rows) == 36
+
+
+def test_update_rejects_a_month_given_twice(model_file, tmp_path):
+    new = months_frame(2017, 1)
+    with pytest.raises(SystemExit, match=r"1 months appear more than once in the input: 2017-03"):
+        update(model_file, pd.concat([new, new.iloc[[2]]]), tmp_path)
+    # The model file is untouched
+    assert forecast.Forecaster.load(model_file).n == 24
+
+
+def test_add_rejects_repeated_months():
+    df = months_frame(2015, 1)
+    model = forecast.fit_frame(df)
+    with pytest.raises(ValueError, match="2015-01"):
+        model.add(df[forecast.FEATURES].to_numpy()[:1], df['passengers'].to_numpy()[:1], [forecast.month_key(2015, 1)])
+    key = forecast.month_key(2016, 1)
+    with pytest.raises(ValueError, match="2016-01"):
+        model.add(np.zeros((2, 4)), np.zeros(2), [key, key])
+    assert model.n == 12
+
+
+def test_replace_takes_the_old_row_out():
+    df = months_frame(2015, 2)
+    model = forecast.fit_frame(df)
+    revised = df.iloc[[4]].copy()
+    revised['passengers'] += 50_000
+    model.replace([forecast.month_key(2015, 5)], revised[forecast.FEATURES].to_numpy(), revised['passengers'].to_numpy())
+
+    expected = df.copy()
+    expected.loc[4, 'passengers'] += 50_000
+    np.testing.assert_allclose(model.beta, forecast.fit_frame(expected).beta, rtol=1e-9)
+    assert model.n == 24
@@ -0,0 +1,56 @@
+import json
+import threading
+
+import pytest
+
+import instrument
+
+
+@pytest.fixture
+def trace(tmp_path, monkeypatch):
+    trace = instrument._Trace(str(tmp_path / 'trace.jsonl'), str(tmp_path / 'prof'))
+    monkeypatch.setattr(instrument, '_trace', trace)
+    yield trace
+    trace.write()
+
+
+def test_stage_records_rss_change(trace):
+    with instrument.stage('grow') as s:
+        block = bytearray(64 * 2 ** 20)
+        block[::4096] = b'x' * len(block[::4096])
+        s.rows = 1
+    record = trace.stages[-1]
+    if record['rss_mb'] is None:
+        pytest.skip("no /proc/self/statm")
+    assert record['rss_change_mb'] > 32
+    assert record['peak_rss_mb'] >= record['rss_mb'] - 1
+
+
+def test_profile_only_on_the_main_thread(trace):
+    def work():
+        with instrument.stage('in_thread'):
+            sum(range(1000))
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    thread.join()
+    with instrument.stage('in_main'):
+        sum(range(1000))
+
+    records = {record['stage']: record for record in trace.stages}
+    assert 'profile' not in records['in_thread']
+    assert records['in_main']['profile'].endswith('-in_main.prof')
+
+
+def test_summary_columns(trace, capsys):
+    with instrument.stage('outer'):
+        with instrument.stage('inner') as s:
+            s.rows = 5
+    trace.write()
+
+    instrument.summarize(trace.trace_file)
+    header, *lines = capsys.readouterr().out.splitlines()
+    assert 'rss change' in header and 'process peak MB' in header
+    assert [line.split()[1] for line in lines] == ['outer', 'inner']
+    with open(trace.trace_file) as f:
+        assert [r['stage'] for r in json.loads(f.readline())['stages']] == ['inner', 'outer']
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import join
+
+
+def month_table(months, entity=None, count=1, column='value', seed=0):
+    # count rows per (year, month), one per entity, with dates like the cleaners write them
+    rng = np.random.default_rng(seed)
+    rows = pd.DataFrame([(year, month) for year, month in months for _ in range(count)], columns=['year', 'month'])
+    if entity:
+        rows[entity] = np.tile(np.arange(count), len(months))
+    rows['date'] = pd.to_datetime(rows[['year', 'month']].assign(day=1))
+    rows[column] = rng.normal(size=len(rows)).round(2)
+    return rows
+
+
+def shuffled(df, seed=1):
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def assert_same_as_merge(left, right):
+    result = join.join(left, right)
+    expected = pd.merge(left, right, on=join.KEY_COLUMNS)
+    pd.testing.assert_frame_equal(result, expected[result.columns])
+    return result
+
+
+MONTHS = [(2015, m) for m in range(1, 13)] + [(2016, m) for m in range(1, 7)]
+
+
+@pytest.mark.parametrize('left_sorted, right_sorted', [(True, True), (False, True), (True, False), (False, False)])
+def test_one_row_per_month_on_the_right(left_sorted, right_sorted):
+    left = month_table(MONTHS[2:], 'nationality', 3, 'passengers')
+    right = month_table(MONTHS[:-2], column='mean_temp', seed=2)
+    left = left if left_sorted else shuffled(left)
+    right = right if right_sorted else shuffled(right)
+    result = assert_same_as_merge(left, right)
+    assert len(result) == 3 * (len(MONTHS) - 4)
+
+
+@pytest.mark.parametrize('left_sorted, right_sorted', [(True, True), (False, True), (True, False), (False, False)])
+def test_several_rows_per_month_on_both_sides(left_sorted, right_sorted):
+    left = month_table(MONTHS[:-1], 'nationality', 3, 'passengers')
+    right = month_table(MONTHS[1:], 'station', 4, 'mean_temp', seed=2)
+    left = left if left_sorted else shuffled(left)
+    right = right if right_sorted else shuffled(right, seed=3)
+    result = assert_same_as_merge(left, right)
+    assert len(result) == 3 * 4 * (len(MONTHS) - 2)
+
+
+def test_empty_side():
+    left = month_table(MONTHS, column='passengers')
+    right = month_table([(2020, 1)], column='mean_temp')
+    result = assert_same_as_merge(left, right)
+    assert len(result) == 0
+    assert result.attrs['only_right'] == [(2020, 1)]
+
+
+def test_months_on_one_side_only():
+    left = shuffled(month_table(MONTHS[:-3], 'nationality', 2, 'passengers'))
+    right = month_table([(2014, 12)] + MONTHS[1:], column='mean_temp')
+    result = join.join(left, right)
+    assert result.attrs['only_left'] == [(2015, 1)]
+    assert result.attrs['only_right'] == [(2014, 12), (2016, 4), (2016, 5), (2016, 6)]
+
+    assert join.describe_missing(result) == [
+        "1 months with passengers but no weather: 2015-01",
+        "4 months with weather but no passengers: 2014-12, 2016-04, 2016-05, 2016-06"]
+    assert join.describe_missing(join.join(right, right.rename(columns={'mean_temp': 't'}))) == []
+
+
+def test_describe_missing_shortens_long_lists():
+    left = month_table(MONTHS, column='passengers')
+    right = month_table(MONTHS[:2], column='mean_temp')
+    lines = join.describe_missing(join.join(left, right), 'passengers_clean', 'weather_clean')
+    assert lines == ["16 months with passengers_clean but no weather_clean: "
+                     + ', '.join(f"{y}-{m:02d}" for y, m in MONTHS[2:14]) + " ..."]
+
+
+def test_overlapping_columns_raise():
+    left = month_table(MONTHS, column='value')
+    with pytest.raises(ValueError, match="Columns on both sides of the join: value"):
+        join.join(left, left)
@@ -0,0 +1,154 @@
+import sqlite3
+
+import pytest
+
+import load_to_azure as loader
+
+PASSENGER_ROWS = [(2012, m, f"2012-{m:02d}-01", 1000 * m) for m in range(1, 13)]
+
+
+@pytest.fixture
+def db():
+    conn = sqlite3.connect(':memory:')
+    cursor = conn.cursor()
+    loader.create_tables(conn, cursor, sqlite=True)
+    yield conn, cursor
+    conn.close()
+
+
+def table_rows(cursor, table='Passengers'):
+    cursor.execute(f"SELECT year, month, date, passengers FROM {table} ORDER BY year, month")
+    return cursor.fetchall()
+
+
+@pytest.mark.parametrize('mode', ['row', 'batch'])
+@pytest.mark.parametrize('batch_size', [1, 5, 1000])
+def test_insert_rows_counts(db, mode, batch_size):
+    conn, cursor = db
+    count = loader.insert_rows(conn, cursor, loader.SQL_INSERT_PASSENGER, iter(PASSENGER_ROWS),
+                               mode=mode, batch_size=batch_size)
+    assert count == len(PASSENGER_ROWS)
+    assert table_rows(cursor) == PASSENGER_ROWS
+
+
+class RecordingCursor:
+    # Stand-in for a pyodbc cursor: tvp mode needs SQL Server, so only the calls are checked
+    def __init__(self):
+        self.calls = []
+
+    def execute(self, sql, params):
+        self.calls.append((sql, params))
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_insert_rows_tvp_sends_one_call_per_batch():
+    conn, cursor = RecordingConnection(), RecordingCursor()
+    count = loader.insert_rows(conn, cursor, loader.SQL_INSERT_PASSENGER, PASSENGER_ROWS, mode='tvp',
+                               batch_size=5, tvp_sql=loader.SQL_INSERT_PASSENGER_TVP, tvp_type='PassengerRows')
+    assert count == 12
+    assert conn.commits == 3
+    assert [len(params[0]) - 2 for _, params in cursor.calls] == [5, 5, 2]
+    assert cursor.calls[0][1][0][:2] == ['PassengerRows', 'dbo']
+
+
+def test_insert_rows_rejects_bad_mode(db):
+    conn, cursor = db
+    with pytest.raises(ValueError):
+        loader.insert_rows(conn, cursor, loader.SQL_INSERT_PASSENGER, PASSENGER_ROWS, mode='bulk')
+    with pytest.raises(ValueError):
+        loader.insert_rows(conn, cursor, loader.SQL_INSERT_PASSENGER, PASSENGER_ROWS, mode='tvp')
+
+
+def test_upsert_rows_counts(db):
+    conn, cursor = db
+    assert loader.upsert_rows(conn, cursor, 'Passengers', PASSENGER_ROWS[:10], sqlite=True) == (10, 0, 0)
+    assert loader.upsert_rows(conn, cursor, 'Passengers', PASSENGER_ROWS[:10], sqlite=True) == (0, 0, 10)
+
+    # two restated months and two new ones
+    changed = list(PASSENGER_ROWS)
+    changed[3] = (2012, 4, '2012-04-01', 1)
+    changed[7] = (2012, 8, '2012-08-01', 2)
+    assert loader.upsert_rows(conn, cursor, 'Passengers', changed, sqlite=True, batch_size=3) == (2, 2, 8)
+    assert table_rows(cursor) == changed
+
+
+def test_upsert_rows_weather_with_missing_values(db):
+    conn, cursor = db
+    rows = [(2012, 1, '2012-01-01', 0.5, 4.0, -3.0, None), (2012, 2, '2012-02-01', 1.0, 5.0, -2.0, 80.1)]
+    assert loader.upsert_rows(conn, cursor, 'Weather', rows, sqlite=True) == (2, 0, 0)
+    # NULL compares equal to NULL for the change check
+    assert loader.upsert_rows(conn, cursor, 'Weather', rows, sqlite=True) == (0, 0, 2)
+    rows[0] = (2012, 1, '2012-01-01', 0.5, 4.0, -3.0, 12.0)
+    assert loader.upsert_rows(conn, cursor, 'Weather', rows, sqlite=True) == (0, 1, 1)
+
+
+# ---------- pipelined reader (prefetched_batches) ----------
+
+def reader_threads():
+    import threading
+    return [t for t in threading.enumerate() if t.name == 'reader']
+
+
+def test_prefetched_batches_same_batches_as_batched():
+    rows = list(range(1003))
+    assert list(loader.prefetched_batches(iter(rows), 100, 2)) == list(loader.batched(rows, 100))
+    assert not reader_threads()
+
+
+def test_prefetched_batches_raises_reader_error():
+    def rows():
+        yield from PASSENGER_ROWS
+        raise ValueError("could not convert string to float: 'x'")
+
+    batches = loader.prefetched_batches(rows(), 5, 1)
+    with pytest.raises(ValueError, match="could not convert"):
+        for _ in batches:
+            pass
+    assert not reader_threads()
+
+
+def test_prefetched_batches_consumer_stops_early():
+    # The reader fills the queue and blocks on it; closing the generator must release it
+    import time
+    batches = loader.prefetched_batches(iter(range(10 ** 7)), 10, 2)
+    next(batches)
+    time.sleep(0.05)
+    batches.close()
+    assert not reader_threads()
+
+
+class FailingCursor:
+    def __init__(self, fail_after):
+        self.fail_after = fail_after
+
+    def executemany(self, sql, batch):
+        self.fail_after -= 1
+        if self.fail_after < 0:
+            raise sqlite3.OperationalError("connection lost")
+
+
+def test_failed_send_stops_the_reader():
+    rows = ((2012, 1, '2012-01-01', i) for i in range(10 ** 6))
+    with pytest.raises(sqlite3.OperationalError) as error:
+        loader.insert_rows(RecordingConnection(), FailingCursor(3), loader.SQL_INSERT_PASSENGER, rows,
+                           batch_size=10, prefetch=2)
+    # checked while the traceback (and with it the generator frame) is still referenced
+    assert error.value is not None
+    assert not reader_threads()
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 4])
+def test_pipelined_insert_and_upsert_match_serial(db, prefetch):
+    conn, cursor = db
+    assert loader.insert_rows(conn, cursor, loader.SQL_INSERT_PASSENGER, iter(PASSENGER_ROWS[:6]),
+                              batch_size=2, prefetch=prefetch) == 6
+    assert loader.upsert_rows(conn, cursor, 'Passengers', iter(PASSENGER_ROWS), sqlite=True,
+                              batch_size=5, prefetch=prefetch) == (6, 0, 6)
+    assert table_rows(cursor) == PASSENGER_ROWS
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import analasys
+import cube
+import forecast
+import schema
+import store
+
+
+def month_rows(years, extra):
+    # One row per (year, month, *extra) with the date built like the cleaners do
+    keys = pd.MultiIndex.from_product([years, range(1, 13)] + [values for _, values in extra],
+                                      names=['year', 'month'] + [name for name, _ in extra]).to_frame(index=False)
+    keys['date'] = schema.month_start(keys['year'], keys['month'])
+    return keys
+
+
+@pytest.fixture
+def tables(store_dir):
+    # 3 stations x 2 nationalities over 3 years, written to the test's own store
+    rng = np.random.default_rng(7)
+    weather = month_rows([2015, 2016, 2017], [('station', [1, 422, 495])])
+    weather['mean_temp'] = rng.normal(5, 4, len(weather)).round(1)
+    weather['max_temp'] = (weather['mean_temp'] + rng.uniform(2, 8, len(weather))).round(1)
+    weather['min_temp'] = (weather['mean_temp'] - rng.uniform(2, 8, len(weather))).round(1)
+    weather['precipitation'] = rng.uniform(10, 150, len(weather)).round(1)
+    passengers = month_rows([2015, 2016, 2017], [('nationality', ['Bretland', 'Þýskaland'])])
+    passengers['passengers'] = rng.integers(1000, 50000, len(passengers))
+
+    names = ('test_weather', 'test_passengers')
+    store.write_table(schema.apply(weather[['station', 'year', 'month', 'date', 'mean_temp', 'max_temp',
+                                            'min_temp', 'precipitation']]), names[0])
+    store.write_table(schema.apply(passengers[['nationality', 'year', 'month', 'date', 'passengers']]), names[1])
+    return names
+
+
+def test_streamed_cells_equal_in_memory(tables):
+    streamed, partitions, rows = analasys.stream_cells(*tables)
+    in_memory = cube.compute_cells(analasys.load_data(*tables))
+
+    assert partitions == 36
+    assert rows == 36 * 3 * 2
+    pd.testing.assert_frame_equal(streamed, in_memory[streamed.columns], check_exact=True)
+
+
+def test_streamed_rollups_and_regression_equal_in_memory(tables):
+    streamed, _, _ = analasys.stream_cells(*tables)
+    rows = analasys.load_data(*tables)
+    in_memory = cube.compute_cells(rows)
+
+    for by in (None, 'month', 'season', 'year'):
+        expected = cube.rollup(streamed, by)
+        pd.testing.assert_frame_equal(expected, cube.rollup(in_memory, by)[expected.columns])
+
+    def model(cells):
+        return forecast.Forecaster(analasys.weather_vars,
+                                   *cube.normal_equations(cube.rollup(cells), analasys.weather_vars, 'passengers'))
+
+    out_of_core = model(streamed)
+    np.testing.assert_array_equal(out_of_core.beta, model(in_memory).beta)
+
+    # ... and the same fit as StandardScaler + LinearRegression on the joined rows
+    X = rows[analasys.weather_vars].values
+    _, _, y_pred, r2, _ = analasys.fit_regression(X, rows['passengers'].values)
+    assert out_of_core.r2() == pytest.approx(r2, rel=1e-9)
+    np.testing.assert_allclose(out_of_core.predict(X), y_pred, rtol=1e-9)
+
+
+def test_check_cells_passes_on_streamed_cells(tables, capsys):
+    streamed, _, _ = analasys.stream_cells(*tables)
+    analasys.check_cells(streamed, *tables)
+    assert "identical to the in-memory path" in capsys.readouterr().out
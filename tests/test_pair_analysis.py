@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import pair_analysis
+import schema
+
+
+def weather(stations=(1,), years=(2015, 2016)):
+    rows = [(s, y, m, 1.0 + m, 4.0 + m, -2.0 + m, 50.0 + s)
+            for s in stations for y in years for m in range(1, 13)]
+    df = pd.DataFrame(rows, columns=['station', 'year', 'month'] + pair_analysis.WEATHER_VARS)
+    df['date'] = schema.month_start(df['year'], df['month'])
+    return df
+
+
+def passengers(nationalities=('A', 'B'), years=(2015, 2016)):
+    rows = [(n, y, m, 1000 * (i + 1) + 10 * m) for i, n in enumerate(nationalities) for y in years for m in range(1, 13)]
+    df = pd.DataFrame(rows, columns=['nationality', 'year', 'month', 'passengers'])
+    df['date'] = schema.month_start(df['year'], df['month'])
+    return df
+
+
+def test_to_arrays_places_every_row():
+    stations, nationalities, month_keys, weather_arr, passenger_arr = pair_analysis.to_arrays(
+        weather(stations=(1, 422)), passengers())
+    assert list(stations) == [1, 422]
+    assert list(nationalities) == ['A', 'B']
+    assert len(month_keys) == 24
+    assert not np.isnan(weather_arr).any()
+    assert passenger_arr[1, 0] == 2010
+
+
+def test_duplicate_station_month_raises():
+    df = weather(stations=(1, 422))
+    duplicated = pd.concat([df, df[(df['station'] == 422) & (df['year'] == 2016) & (df['month'] == 3)]])
+    with pytest.raises(ValueError, match=r"1 duplicate \(station, month\) rows, e.g. station 422 2016-03"):
+        pair_analysis.to_arrays(duplicated, passengers())
+
+
+def test_duplicate_nationality_month_raises():
+    df = passengers()
+    with pytest.raises(ValueError, match=r"duplicate \(nationality, month\) rows, e.g. nationality A 2015-01"):
+        pair_analysis.to_arrays(weather(), pd.concat([df, df.head(2)]))
+
+
+def test_table_without_nationality_is_one_group():
+    total = passengers(nationalities=('x',)).drop(columns='nationality')
+    _, nationalities, _, _, passenger_arr = pair_analysis.to_arrays(weather(), total)
+    assert list(nationalities) == [pair_analysis.TOTAL_ROW]
+    assert passenger_arr.shape == (1, 24)
+    np.testing.assert_array_equal(passenger_arr[0], total['passengers'].to_numpy(dtype=float))
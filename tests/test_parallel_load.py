@@ -0,0 +1,114 @@
+import random
+import sqlite3
+
+import pytest
+
+import load_to_azure as loader
+import parallel_load
+
+
+def weather_rows(year):
+    return [(year, m, f"{year}-{m:02d}-01", float(m), m + 5.0, m - 5.0, 10.0 * m) for m in range(1, 13)]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'load.db')
+    conn = sqlite3.connect(path)
+    loader.create_tables(conn, conn.cursor(), sqlite=True)
+    conn.close()
+    return path
+
+
+def test_with_retry_retries_transient_errors_only():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise sqlite3.OperationalError("database is locked")
+        return 'ok'
+
+    retries = []
+    assert parallel_load.with_retry(flaky, base_delay=0.001, on_retry=lambda *a: retries.append(a)) == 'ok'
+    assert len(calls) == 3
+    assert [n for _, n, _ in retries] == [1, 2]
+
+    def broken():
+        raise sqlite3.OperationalError("no such table: Weather")
+
+    with pytest.raises(sqlite3.OperationalError):
+        parallel_load.with_retry(broken, base_delay=0.001)
+
+
+def test_with_retry_gives_up_after_retries():
+    calls = []
+
+    def always_locked():
+        calls.append(1)
+        raise sqlite3.OperationalError("database is locked")
+
+    with pytest.raises(sqlite3.OperationalError):
+        parallel_load.with_retry(always_locked, retries=2, base_delay=0.001)
+    assert len(calls) == 3
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_pool_discards_a_connection_after_an_error():
+    opened = []
+
+    def factory():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    pool = parallel_load.ConnectionPool(factory, 2)
+    with pool.connection() as conn:
+        first = conn
+    with pool.connection() as conn:
+        assert conn is first            # reused
+
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            raise RuntimeError("connection dropped")
+    assert first.closed
+
+    with pool.connection() as conn:
+        assert conn is not first and not conn.closed
+    assert len(opened) == 2
+    pool.close()
+    assert opened[1].closed
+
+
+def test_retried_units_leave_no_duplicate_rows(db_path):
+    random.seed(3)
+    pool = parallel_load.ConnectionPool(lambda: parallel_load.LatencyConnection(db_path, fail_rate=0.3), 2)
+    stats = parallel_load.WorkerStats()
+    years = range(2012, 2018)
+    for year in years:
+        # batch size 4: three INSERT round-trips per unit, so failures also hit half-loaded years
+        parallel_load.load_unit(pool, 'Weather', year, weather_rows(year), stats, batch_size=4, retries=30)
+    pool.close()
+
+    assert sum(s['retries'] for s in stats.by_worker.values()) > 0
+    conn = sqlite3.connect(db_path)
+    counts = conn.execute("SELECT year, COUNT(*), COUNT(DISTINCT month) FROM Weather GROUP BY year").fetchall()
+    conn.close()
+    assert counts == [(year, 12, 12) for year in years]
+
+
+def test_reloading_a_unit_replaces_its_year(db_path):
+    pool = parallel_load.ConnectionPool(lambda: parallel_load.LatencyConnection(db_path), 1)
+    stats = parallel_load.WorkerStats()
+    parallel_load.load_unit(pool, 'Weather', 2015, weather_rows(2015), stats)
+    parallel_load.load_unit(pool, 'Weather', 2015, weather_rows(2015)[:6], stats)
+    pool.close()
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM Weather WHERE year = 2015").fetchone() == (6,)
+    conn.close()
@@ -0,0 +1,60 @@
+import os
+
+import pipeline
+
+
+def names(paths):
+    return {os.path.basename(path) for path in paths}
+
+
+def test_stage_inputs_include_imported_modules():
+    stages = {stage.name: stage for stage in pipeline.STAGES}
+    assert {'features.py', 'cleanWeather.py', 'store.py', 'schema.py'} <= names(stages['features'].inputs)
+    assert {'store.py', 'schema.py', 'cube.py', 'join.py', 'batch_stats.py'} <= names(stages['analyze'].inputs)
+    # Imported inside a function (load_to_azure imports store lazily)
+    assert 'store.py' in names(stages['load'].inputs)
+
+
+def test_analyze_outputs_are_declared():
+    stages = {stage.name: stage for stage in pipeline.STAGES}
+    assert names(stages['analyze'].outputs) == {'1_time_series.png', '2_seasonal_patterns.png',
+                                                '3_correlation_heatmap.png', '4_scatter_plots.png',
+                                                '5_regression_analysis.png', 'analysis_cube.parquet',
+                                                'analysis_output.txt'}
+    for path in stages['analyze'].outputs:
+        assert os.path.isdir(os.path.dirname(path))
+    # The database is not a file: load only has its inputs
+    assert stages['load'].outputs == []
+
+
+def test_local_imports_skip_other_packages():
+    found = names(pipeline.local_imports(os.path.join(pipeline.CODE_DIR, 'store.py')))
+    assert found == {'schema.py'}
+
+
+def test_dry_run_keeps_the_state_file(tmp_path, monkeypatch, capsys):
+    state_file = tmp_path / 'state.json'
+    monkeypatch.setattr(pipeline, 'STATE_FILE', str(state_file))
+
+    assert pipeline.run(['analyze'], dry_run=True)
+    out = capsys.readouterr().out
+    assert "[run]   clean_passengers would run" in out
+    assert "[run]   analyze would run (after clean_passengers, clean_weather)" in out
+    assert not state_file.exists()
+
+
+def test_dry_run_reports_dependants_of_changed_stages(tmp_path, monkeypatch, capsys):
+    # State where every stage is up to date, except clean_weather never ran
+    monkeypatch.setattr(pipeline, 'STATE_FILE', str(tmp_path / 'state.json'))
+    state = {}
+    for stage in pipeline.select(['analyze']):
+        if stage.name != 'clean_weather':
+            pipeline.record(stage, state)
+    pipeline.save_state(state)
+    before = (tmp_path / 'state.json').read_text()
+
+    pipeline.run(['analyze'], dry_run=True)
+    out = capsys.readouterr().out
+    assert "[ok]    clean_passengers is up to date" in out
+    assert "[run]   analyze would run (after clean_weather)" in out
+    assert (tmp_path / 'state.json').read_text() == before
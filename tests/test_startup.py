@@ -0,0 +1,37 @@
+import pytest
+
+import vg
+
+
+@pytest.mark.parametrize('command', list(vg.STARTUP))
+def test_no_denied_module_is_imported(command):
+    modules, _, denied = vg.STARTUP[command]
+    _, loaded = vg.import_time(modules)
+    assert set(modules) <= loaded
+    assert not [m for m in denied if m in loaded]
+
+
+@pytest.mark.parametrize('command', list(vg.STARTUP))
+def test_import_time_within_budget(command):
+    modules, budget, _ = vg.STARTUP[command]
+    # best of 3 fresh interpreters, like vg.py startup
+    assert min(vg.import_time(modules)[0] for _ in range(3)) <= budget
+
+
+def test_check_startup_reports_success(capsys):
+    assert vg.check_startup(repeat=1)
+    assert "Start-up within budget" in capsys.readouterr().out
+
+
+def test_check_startup_fails_over_budget(monkeypatch, capsys):
+    modules, _, denied = vg.STARTUP['load']
+    monkeypatch.setitem(vg.STARTUP, 'load', (modules, 0, denied))
+    assert not vg.check_startup(repeat=1, commands=['load'])
+    assert "FAILED" in capsys.readouterr().out
+
+
+def test_check_startup_fails_on_denied_module(monkeypatch, capsys):
+    modules, budget, denied = vg.STARTUP['load']
+    monkeypatch.setitem(vg.STARTUP, 'load', (modules, budget, denied + ['csv']))
+    assert not vg.check_startup(repeat=1, commands=['load'])
+    assert "csv" in capsys.readouterr().out
@@ -0,0 +1,81 @@
+import sqlite3
+
+import pytest
+
+import load_to_azure as loader
+import verify
+
+# Two years of weather: NULLs, negative values and .x5 values that round half away from zero
+WEATHER_ROWS = []
+for year in (2015, 2016):
+    for month in range(1, 13):
+        mean = round(-4.35 + 1.1 * month + (year - 2015) * 0.05, 2)
+        WEATHER_ROWS.append((year, month, f"{year}-{month:02d}-01", mean, round(mean + 3.25, 2),
+                             None if month == 2 else round(mean - 2.45, 2),
+                             None if (year, month) == (2016, 7) else 80.05 + month))
+WEATHER_ROWS += [(2017, 1, '2017-01-01', -0.05, 0.15, -0.25, None),
+                 (2017, 2, '2017-02-01', 0.05, -1.15, -12.35, 0.0)]
+
+PASSENGER_ROWS = [(year, month, f"{year}-{month:02d}-01", 20_000 + 137 * month + year)
+                  for year in (2015, 2016, 2017) for month in range(1, 13)]
+
+TABLES = {'Weather': (loader.SQL_INSERT_WEATHER, WEATHER_ROWS),
+          'Passengers': (loader.SQL_INSERT_PASSENGER, PASSENGER_ROWS)}
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(':memory:')
+    cursor = conn.cursor()
+    loader.create_tables(conn, cursor, sqlite=True)
+    for insert_sql, rows in TABLES.values():
+        cursor.executemany(insert_sql, rows)
+    conn.commit()
+    yield cursor
+    conn.close()
+
+
+def test_rounding_is_half_away_from_zero():
+    assert [verify.to_int(v, 'FLOAT') for v in (0.05, -0.05, 2.35, -2.35, -12.35, 0.0)] == [1, -1, 24, -24, -124, 0]
+    assert verify.to_int(None, 'FLOAT') is None
+    assert verify.to_int(float('nan'), 'FLOAT') is None
+
+
+@pytest.mark.parametrize('table', list(TABLES))
+def test_source_and_sqlite_fingerprints_agree(cursor, table):
+    by_year, by_month = verify.source_fingerprints(table, TABLES[table][1])
+    assert verify.db_fingerprints(cursor, table, sqlite=True) == by_year
+    assert verify.db_fingerprints(cursor, table, sqlite=True, by_month=True) == by_month
+    assert verify.db_fingerprints(cursor, table, sqlite=True, by_month=True, years=[2016]) == \
+        {key: fp for key, fp in by_month.items() if key[0] == 2016}
+
+
+def test_verify_table_matches(cursor, capsys):
+    by_year, by_month = verify.source_fingerprints('Weather', WEATHER_ROWS)
+    assert verify.verify_table(cursor, 'Weather', by_year, by_month, sqlite=True)
+    assert "all years match" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('column, value', [('mean_temp', 99.9), ('min_temp', None), ('precipitation', 1.0)])
+def test_one_changed_cell_points_to_its_month(cursor, capsys, column, value):
+    by_year, by_month = verify.source_fingerprints('Weather', WEATHER_ROWS)
+    cursor.execute(f"UPDATE Weather SET {column} = ? WHERE year = 2016 AND month = 7", (value,))
+
+    assert not verify.verify_table(cursor, 'Weather', by_year, by_month, sqlite=True)
+    problems = [line.strip() for line in capsys.readouterr().out.splitlines() if '❌' in line]
+    assert len(problems) == 2
+    assert problems[0].startswith("❌ 2016-07: sums differ")
+    assert problems[1].startswith("❌ 2016: sums differ")
+
+
+def test_value_moved_to_another_month_changes_the_hash(cursor, capsys):
+    # Swapping two months keeps the year's count and sums, only the row hash sees it
+    by_year, by_month = verify.source_fingerprints('Passengers', PASSENGER_ROWS)
+    cursor.execute("UPDATE Passengers SET passengers = CASE month WHEN 3 THEN ? ELSE ? END "
+                   "WHERE year = 2017 AND month IN (3, 4)", (PASSENGER_ROWS[27][3], PASSENGER_ROWS[26][3]))
+
+    assert not verify.verify_table(cursor, 'Passengers', by_year, by_month, sqlite=True)
+    out = capsys.readouterr().out
+    assert "❌ 2017-03: sums differ, row hash differs" in out
+    assert "❌ 2017-04: sums differ, row hash differs" in out
+    assert "❌ 2017: row hash differs" in out